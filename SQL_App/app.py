@@ -1,20 +1,21 @@
-import re
-
 from PyQt6.QtWidgets import (
     QWidget, QLabel, QPushButton, QLineEdit, QComboBox,
-    QTableWidget, QVBoxLayout, QHBoxLayout, QMessageBox, QTableWidgetItem,
+    QTableView, QAbstractItemView, QVBoxLayout, QHBoxLayout, QMessageBox,
     QHeaderView, QDialog, QGraphicsOpacityEffect, QGroupBox, QFormLayout,
-    QRadioButton, QCalendarWidget, QCompleter, QCheckBox
+    QRadioButton, QCalendarWidget, QCheckBox, QFileDialog, QProgressDialog
 )
-from PyQt6.QtCore import QDate, Qt, QLocale, QEvent
-from PyQt6.QtGui import QValidator, QColor
-from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
-from PyQt6.QtGui import QIcon, QTextDocument, QTextCursor
-from decimal import Decimal
+from PyQt6.QtCore import QDate, Qt, QEvent, QTimer
+from PyQt6.QtGui import QValidator
+from PyQt6.QtGui import QIcon, QPageLayout
 
-from database import fetch_expenses, fetch_unique_marcas, fetch_unique_matriculas, add_expense_to_db, delete_expense_from_db, \
-    update_expense_in_db, \
-    fetch_vehicle_by_id, init_db
+from repository import repository
+from vehicle_model import VehicleTableModel
+from async_db import database_executor
+from completion import PrefixCompleter, completion_service
+from formatting import format_cents, format_money, parse_money, parse_number
+from tax import DOCUMENT_TYPES, REGIME_MARGEM, REGIME_NORMAL, TAX_RATES, compute_tax
+from summary_view import MonthlySummaryDialog
+from diagnostics_view import DiagnosticsDialog
 
 
 # --- NOVA CLASSE AUXILIAR PARA O CAMPO DE DATA PERSONALIZADO ---
@@ -98,54 +99,10 @@ class DateLineEdit(QHBoxLayout):
         # Event filter para capturar focus in/out
         self.date_input.installEventFilter(self)
 
-        # Estilo específico para o QLineEdit interno
-        self.date_input.setStyleSheet("""
-            QLineEdit {
-                background-color: #ffffff;
-                font-size: 14px;
-                color: #333;
-                border: 1px solid #b0bfc6;
-                border-radius: 5px;
-                padding: 5px;
-            }
-            QLineEdit:hover {
-                border: 1px solid #4caf50;
-            }
-            QLineEdit:focus {
-                border: 1px solid #2a9d8f;
-                background-color: #f5f9fc;
-            }
-            QLineEdit:invalid {
-                border: 1px solid #ff6347; /* Vermelho/laranja escuro para inválido */
-            }
-            /* O estado intermediate agora tem a mesma borda que o estado normal/default */
-            QLineEdit:intermediate {
-                border: 1px solid #b0bfc6;
-            }
-        """)
-
         self.calendar_button = QPushButton("📅", parent)  # Ícone de calendário (Unicode)
         self.calendar_button.setFixedSize(30, 30)  # Tamanho fixo para o botão para que o ícone fique bem
         self.calendar_button.clicked.connect(self.show_calendar_dialog)
-        # Estilo específico para o QPushButton do calendário para anular o estilo global
-        self.calendar_button.setStyleSheet("""
-            QPushButton {
-                background-color: #4caf50; /* Um verde forte */
-                color: white;
-                border: 1px solid #3d8b40; /* Uma borda ligeiramente mais escura que o fundo */
-                border-radius: 5px;
-                font-size: 16px; /* Tamanho do ícone */
-                padding: 0px; /* Remover padding extra */
-            }
-            QPushButton:hover {
-                background-color: #45a049; /* Verde mais escuro no hover */
-                border: 1px solid #367c39;
-            }
-            QPushButton:pressed {
-                background-color: #3d8b40; /* Verde ainda mais escuro no pressed */
-                border: 1px solid #2f6932;
-            }
-        """)
+        self.calendar_button.setObjectName("calendarButton")  # Estilo próprio em styles.py
 
         self.addWidget(self.date_input)
         self.addWidget(self.calendar_button)
@@ -295,13 +252,16 @@ class DateLineEdit(QHBoxLayout):
 
 
 class AddExpenseDialog(QDialog):
+    """Formulário de adição/edição de um veículo.
+
+    A janela principal constrói-o uma vez e reutiliza-o: reset() prepara-o para cada utilização.
+    """
+
     def __init__(self, parent=None, mode="add", initial_data=None):
         super().__init__(parent)
         self.parent_window = parent
-        self.mode = mode  # "add" ou "edit"
-        self.initial_data = initial_data
+        self._session = 0  # Incrementado em cada reset(); respostas de gravações antigas são ignoradas
         self.init_ui()
-        self.apply_styles()
 
         # Conectar os sinais textChanged dos campos relevantes para atualizar estados e CÁLCULOS
         self.valorCompra.textChanged.connect(self.calculate_regime_fields)
@@ -314,6 +274,18 @@ class AddExpenseDialog(QDialog):
         self.regime_geral_radio.clicked.connect(self.calculate_regime_fields)
         self.regime_lucro_tributavel_radio.clicked.connect(self.calculate_regime_fields)
 
+        self.reset(mode, initial_data)
+
+    def reset(self, mode="add", initial_data=None):
+        """Prepara o formulário para adicionar um registo ou editar initial_data."""
+        self._session += 1
+        self.mode = mode  # "add" ou "edit"
+        self.initial_data = initial_data
+        self.saved_id = None  # id do registo inserido/atualizado, lido pela janela principal
+        self.add_button.setText("Atualizar Registo" if self.mode == "edit" else "Adicionar Registo")
+        self.add_button.setEnabled(True)
+        self.clear_fields()
+
         # Variável para armazenar o QRadioButton que estava selecionado por último de forma válida
         # Será None se nenhum estiver selecionado ou se a validação falhar
         self.last_valid_regime_radio = None
@@ -327,6 +299,24 @@ class AddExpenseDialog(QDialog):
                 self.last_valid_regime_radio = self.regime_geral_radio
             elif self.regime_lucro_tributavel_radio.isChecked():
                 self.last_valid_regime_radio = self.regime_lucro_tributavel_radio
+        self.matricula.setFocus()
+
+    def clear_fields(self):
+        for field in (self.matricula, self.marca, self.numeroQuadro, self.isv, self.nRegistoContabilidade,
+                      self.docCompra, self.valorCompra, self.docVenda, self.valorVenda):
+            field.clear()
+        self.dataCompra.setText("")
+        self.dataVenda.setText("")
+        self.tipoDocumento.setCurrentIndex(0)
+        self.taxa.setCurrentIndex(0)  # "N/A"
+        # Num grupo exclusivo o botão marcado não pode ser desmarcado diretamente
+        for radio in (self.regime_geral_radio, self.regime_lucro_tributavel_radio):
+            radio.setAutoExclusive(False)
+            radio.setChecked(False)
+            radio.setAutoExclusive(True)
+        # Por último: limpar os campos acima recalcula estes dois
+        self.valorBase.clear()
+        self.imposto.clear()
 
     def populate_fields(self):
         print("[DEBUG - AddExpenseDialog] Populating fields...")
@@ -335,35 +325,18 @@ class AddExpenseDialog(QDialog):
         self.marca.setText(self.initial_data.get("marca", ""))
         self.numeroQuadro.setText(self.initial_data.get("numeroQuadro", ""))
 
-        # --- FUNÇÃO AUXILIAR PARA FORMATAR NÚMEROS REAIS (Vazio para None/Vazio) ---
-        # NOVO: Esta função agora usa QLocale para formatação localizada (pontos de milhar, vírgula decimal)
-        def format_real_for_display(value):
-            locale = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
-            try:
-                if value is None or (isinstance(value, str) and not value.strip()):
-                    return ""
-                else:
-                    numeric_value = float(value)
-                    # Formata como moeda, mas sem o símbolo da moeda, com 2 casas decimais
-                    return locale.toString(numeric_value, 'f', 2)
-            except (ValueError, TypeError):
-                return ""
-
-        # --- FIM DA FUNÇÃO AUXILIAR ---
-
-        self.isv.setText(format_real_for_display(self.initial_data.get("isv")))
+        self.isv.setText(format_cents(self.initial_data.get("isv")))
 
         # Mantendo nRegistoContabilidade como TEXT no populate_fields conforme a sua decisão anterior
         self.nRegistoContabilidade.setText(
             str(self.initial_data.get("nRegistoContabilidade", "")) if self.initial_data.get(
                 "nRegistoContabilidade") is not None else "")
 
-        data_compra_str = self.initial_data.get("dataCompra", "")
+        data_compra_str = self.initial_data.get("dataCompra") or ""
         print(f"[DEBUG - AddExpenseDialog] dataCompra_str from DB: '{data_compra_str}'")
-        # Usar o setter do DateLineEdit que lida com QDate ou string vazia
-        # O setText do DateLineEdit vai agora fazer a conversão de `yyyy-MM-dd` para `dd-MM-yyyy`
-        self.dataCompra.setText(data_compra_str)
-        print(f"[DEBUG - AddExpenseDialog] After dataCompra.setText, field content: '{self.dataCompra.text()}'")
+        # As datas vêm sempre como 'yyyy-MM-dd' ou vazias (ver migrations._normalise_dates)
+        self.dataCompra.setDate(QDate.fromString(data_compra_str, "yyyy-MM-dd"))
+        print(f"[DEBUG - AddExpenseDialog] After dataCompra.setDate, field content: '{self.dataCompra.text()}'")
 
         self.docCompra.setText(self.initial_data.get("docCompra", ""))
         # Certifique-se de que o item selecionado existe no QComboBox
@@ -374,16 +347,15 @@ class AddExpenseDialog(QDialog):
         else:
             self.tipoDocumento.setCurrentIndex(0)  # Define o primeiro item como padrão
 
-        self.valorCompra.setText(format_real_for_display(self.initial_data.get("valorCompra")))
+        self.valorCompra.setText(format_cents(self.initial_data.get("valorCompra")))
 
-        data_venda_str = self.initial_data.get("dataVenda", "")
+        data_venda_str = self.initial_data.get("dataVenda") or ""
         print(f"[DEBUG - AddExpenseDialog] dataVenda_str from DB: '{data_venda_str}'")
-        # Usar o setter do DateLineEdit que lida com QDate ou string vazia
-        self.dataVenda.setText(data_venda_str)
-        print(f"[DEBUG - AddExpenseDialog] After dataVenda.setText, field content: '{self.dataVenda.text()}'")
+        self.dataVenda.setDate(QDate.fromString(data_venda_str, "yyyy-MM-dd"))
+        print(f"[DEBUG - AddExpenseDialog] After dataVenda.setDate, field content: '{self.dataVenda.text()}'")
 
         self.docVenda.setText(self.initial_data.get("docVenda", ""))  # Este deve ser texto, não real.
-        self.valorVenda.setText(format_real_for_display(self.initial_data.get("valorVenda")))
+        self.valorVenda.setText(format_cents(self.initial_data.get("valorVenda")))
 
         # Popula o QComboBox da taxa
         taxa_value = self.initial_data.get("taxa")
@@ -412,9 +384,9 @@ class AddExpenseDialog(QDialog):
 
         regime_salvo = self.initial_data.get("regime_fiscal", "")
         print(f"[DEBUG - AddExpenseDialog] Regime fiscal from DB: '{regime_salvo}'")
-        if regime_salvo == "Regime Normal":
+        if regime_salvo == REGIME_NORMAL:
             self.regime_geral_radio.setChecked(True)
-        elif regime_salvo == "Margem":
+        elif regime_salvo == REGIME_MARGEM:
             self.regime_lucro_tributavel_radio.setChecked(True)
         else:
             self.regime_geral_radio.setChecked(False)
@@ -426,11 +398,7 @@ class AddExpenseDialog(QDialog):
         self.setWindowTitle("MBAuto - Detalhes")
         self.setWindowModality(Qt.WindowModality.ApplicationModal)
 
-        self.db_name = "vehicles.db"
-        if not init_db(self.db_name):
-            QMessageBox.critical(self, "Erro", "Não foi possível inicializar a base de dados.")
-            self.close()
-            return
+        # A ligação à base de dados é aberta uma única vez no arranque (main.py)
 
         # Campos
         self.matricula = QLineEdit()
@@ -439,21 +407,15 @@ class AddExpenseDialog(QDialog):
         self.isv = QLineEdit()
         self.nRegistoContabilidade = QLineEdit()
 
-        marcas = fetch_unique_marcas()
-        marcasCompleter = QCompleter(marcas)
-        marcasCompleter.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.marca.setCompleter(marcasCompleter)
-
-        matriculas = fetch_unique_matriculas()
-        matriculasCompleter = QCompleter(matriculas)
-        matriculasCompleter.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.matricula.setCompleter(matriculasCompleter)
+        # Autocompletar servido pelo índice partilhado em memória (completion.py)
+        PrefixCompleter(self.marca, "marca")
+        PrefixCompleter(self.matricula, "matricula")
 
         # Substituir QDateEdit por DateLineEdit personalizado
         self.dataCompra = DateLineEdit(self)  # Passar self para a referência parent_dialog
         self.docCompra = QLineEdit()
         self.tipoDocumento = QComboBox()
-        self.tipoDocumento.addItems(["Fatura", "Fatura-Recibo", "Fatura Simplificada", "Declaração"])
+        self.tipoDocumento.addItems(DOCUMENT_TYPES)
         self.valorCompra = QLineEdit()
 
         # Substituir QDateEdit por DateLineEdit personalizado
@@ -463,7 +425,7 @@ class AddExpenseDialog(QDialog):
 
         # Taxa agora é um QComboBox
         self.taxa = QComboBox()
-        self.taxa.addItems(["N/A", "6", "13", "23"])  # Valores da dropdown
+        self.taxa.addItems(["N/A"] + TAX_RATES)  # Valores da dropdown
 
         self.valorBase = QLineEdit()
         self.imposto = QLineEdit()  # Imposto agora é um output
@@ -523,308 +485,12 @@ class AddExpenseDialog(QDialog):
         # self.dataCompra.setMinimumHeight(30)
         # self.dataVenda.setMinimumHeight(30)
 
-        btn_text = "Atualizar Registo" if self.mode == "edit" else "Adicionar Registo"
-        self.add_button = QPushButton(btn_text)
+        self.add_button = QPushButton()  # Texto definido em reset(), conforme o modo
         self.add_button.clicked.connect(self.add_record)
         main_layout.addWidget(self.add_button)
 
         self.setLayout(main_layout)
 
-    def apply_styles(self):
-        # Apenas um ajuste para o estilo do QLineEdit na classe principal,
-        # pois o DateLineEdit tem seu próprio estilo para o QLineEdit interno.
-        self.setStyleSheet("""
-    /* Base styling */
-    QWidget {
-        background-color: #e3e9f2;
-        font-family: Arial, sans-serif;
-        font-size: 14px;
-        color: #333;
-    }
-
-    /* Headings for labels */
-    QLabel {
-        font-size: 16px;
-        color: #2c3e50;
-        font-weight: bold;
-        padding: 5px;
-    }
-
-    /* Styling for input fields */
-    QLineEdit, QComboBox { /* Apply this to regular QLineEdit and QComboBox */
-        background-color: #ffffff;
-        font-size: 14px;
-        color: #333;
-        border: 1px solid #b0bfc6;
-        border-radius: 5px;
-        padding: 5px;
-    }
-    QLineEdit:hover, QComboBox:hover {
-        border: 1px solid #4caf50; /* Borda verde no hover */
-    }
-    QLineEdit:focus, QComboBox:focus {
-        border: 1px solid #2a9d8f; /* Borda verde mais escura no focus */
-        background-color: #f5f9fc;
-    }
-
-    /* Table styling */
-    QTableWidget {
-        background-color: #ffffff;
-        alternate-background-color: #f2f7fb;
-        gridline-color: #c0c9d0;
-        font-size: 14px;
-        border: 1px solid #cfd9e1;
-    }
-
-    /* A COR DE SELEÇÃO DEVE SER MAIS ESPECÍFICA PARA SOBREPÔR OUTRAS CORES */
-    QTableWidget::item:selected {
-        background-color: #d0d7de; /* Cor de seleção cinza mais clara */
-        color: #000000;
-    }
-
-    /* NOVO: Estilo para itens vendidos - será sobreposto por ::item:selected */
-    /* Este estilo aplica-se ao item individual, o que pode ser mais robusto */
-    QTableWidget::item[sold="true"] { /* Usamos uma propriedade dinâmica 'sold' */
-        background-color: #d4edda; /* Verde pastel para vendido */
-        color: #333; /* Cor do texto para contraste */
-    }
-
-
-    QHeaderView::section {
-        background-color: #4caf50;
-        color: white;
-        font-weight: bold;
-        padding: 4px;
-        border: 1px solid #cfd9e1;
-    }
-
-    /* Scroll bar styling */
-    QScrollBar:vertical {
-        width: 12px;
-        background-color: #f0f0f0;
-        border: none;
-    }
-    QScrollBar::handle:vertical {
-        background-color: #4caf50;
-        min-height: 20px;
-        border-radius: 5px;
-    }
-    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-        background: none;
-    }
-
-    /* Buttons */
-    /* Este estilo geral para QPushButton é apenas para botões fora do DateLineEdit */
-    QPushButton {
-        background-color: #4caf50;
-        color: white;
-        padding: 10px 15px;
-        border-radius: 5px;
-        font-size: 14px;
-        font-weight: bold;
-        transition: background-color 0.3s;
-    }
-    QPushButton:hover {
-        background-color: #45a049;
-    }
-    QPushButton:pressed {
-        background-color: #3d8b40;
-    }
-    QPushButton:disabled {
-        background-color: #c8c8c8;
-        color: #6e6e6e;
-    }
-
-    /* Estilo para o botão de Limpar Pesquisa (o "X") */
-    QPushButton#clearSearchButton {
-        background-color: transparent; /* Fundo transparente */
-        border: none; /* Sem borda */
-        color: #555555; /* Cor cinza escura para o 'X' */
-        padding: 0px 5px; /* Padding ajustado para ser mais compacto */
-        border-radius: 5px;
-        font-size: 18px; /* Tamanho maior para o 'X' para melhor visibilidade */
-        font-weight: bold;
-        min-width: 25px; /* Largura mínima menor */
-    }
-    QPushButton#clearSearchButton:hover {
-        background-color: #e0e0e0; /* Um cinza claro no hover */
-        border-radius: 5px; /* Manter bordas arredondadas no hover */
-    }
-    QPushButton#clearSearchButton:pressed {
-        background-color: #cccccc; /* Um cinza mais escuro no pressed */
-    }
-
-    /* NOVO: Estilo para o botão de Pesquisa (a "Lupa") */
-    QPushButton#searchButton {
-        background-color: transparent; /* Fundo transparente */
-        border: none; /* Sem borda */
-        color: #555555; /* Cor cinza escura para a 'Lupa' */
-        padding: 0px 5px; /* Padding ajustado para ser mais compacto */
-        border-radius: 5px;
-        font-size: 18px; /* Tamanho maior para a 'Lupa' */
-        font-weight: bold;
-        min-width: 25px; /* Largura mínima menor */
-    }
-    QPushButton#searchButton:hover {
-        background-color: #e0e0e0; /* Um cinza claro no hover */
-        border-radius: 5px;
-    }
-    QPushButton#searchButton:pressed {
-        background-color: #cccccc; /* Um cinza mais escuro no pressed */
-    }
-
-
-    /* Tooltip styling */
-    QToolTip {
-        background-color: #2c3e50;
-        color: #ffffff;
-        border: 1px solid #333;
-        font-size: 12px;
-        padding: 5px;
-        border-radius: 4px;
-    }
-
-    /* ESTILO PARA QRadioButton */
-    QRadioButton {
-        color: #333; /* Cor do texto mais escura para melhor legibilidade */
-        padding: 4px 0px; /* Mantém o padding */
-    }
-
-    QRadioButton::indicator {
-        width: 16px;
-        height: 16px;
-        border-radius: 8px; /* Mantém o indicador redondo */
-        border: 2px solid #555555; /* Borda mais escura para o indicador (normal) */
-        background-color: #ffffff; /* Fundo branco para o indicador (normal) */
-    }
-
-    QRadioButton::indicator:hover {
-        border: 2px solid #4caf50; /* Borda verde mais escura no hover */
-    }
-
-    QRadioButton::indicator:checked {
-        background-color: #4caf50; /* Preenchimento verde quando selecionado */
-        border: 2px solid #2a9d8f; /* Borda verde mais escura quando selecionado */
-    }
-
-    /* NOVO ESTILO: QRadioButton quando desabilitado */
-    QRadioButton:disabled {
-        color: #a0a0a0; /* Cor do texto cinzento */
-    }
-
-    QRadioButton::indicator:disabled {
-        background-color: #e0e0e0; /* Fundo cinzento claro para o indicador */
-        border: 2px solid #b0b0b0; /* Borda cinzenta mais escura */
-    }
-
-    /* Estilo para QCalendarWidget */
-    QCalendarWidget {
-        background-color: #ffffff;
-        border: 1px solid #cfd9e1;
-        border-radius: 5px;
-    }
-
-    /* Barra de navegação do calendário (onde está o mês e ano) */
-    QCalendarWidget QWidget#qt_calendar_navigationbar {
-        background-color: #e8ecf4; /* Cor de fundo que você definiu como ideal */
-        color: #333; /* Cor do texto para toda a barra - ajustado para o novo fundo */
-        border-top-left-radius: 5px;
-        border-top-right-radius: 5px;
-        border: none; /* Remover qualquer borda residual */
-    }
-
-    /* Estilo dos botões de navegação (setas) e spinbox de ano/mês */
-    QCalendarWidget QAbstractSpinBox,
-    QCalendarWidget QPushButton {
-        background-color: #e8ecf4; /* Mesma cor da barra de navegação */
-        color: #4caf50; /* Cor do texto verde */
-        border: 1px solid #b0bfc6; /* Borda cinza suave */
-        border-radius: 3px;
-        font-size: 14px; /* Ajuste para caber melhor */
-        padding: 3px 5px; /* Reduzir padding para os botões e spinbox */
-    }
-    QCalendarWidget QAbstractSpinBox:hover,
-    QCalendarWidget QPushButton:hover {
-        background-color: #dbe2ea; /* Um tom ligeiramente mais escuro no hover */
-    }
-    QCalendarWidget QAbstractSpinBox:pressed,
-    QCalendarWidget QPushButton:pressed {
-        background-color: #c9d0d9; /* Um tom ainda mais escuro no pressed */
-    }
-
-    /* Setas dentro do Spinbox */
-    QCalendarWidget QSpinBox::up-button,
-    QCalendarWidget QSpinBox::down-button {
-        subcontrol-origin: border;
-        subcontrol-position: right;
-        width: 16px;
-        border-left: 1px solid #b0bfc6; /* Borda para separar o botão */
-        background-color: #e8ecf4; /* Mesma cor da barra */
-        border-top-right-radius: 3px;
-        border-bottom-right-radius: 3px;
-    }
-    QCalendarWidget QSpinBox::up-button:hover,
-    QCalendarWidget QSpinBox::down-button:hover {
-        background-color: #dbe2ea;
-    }
-    QCalendarWidget QSpinBox::up-arrow,
-    QCalendarWidget QSpinBox::down-arrow {
-        background-color: transparent;
-        color: #4caf50; /* A cor da seta será o verde */
-    }
-
-    /* Cabeçalho da grelha do calendário (Dias da Semana - Seg, Ter, Qua, etc.) */
-    QCalendarWidget QAbstractItemView {
-        background-color: #ffffff; /* Fundo branco para toda a área dos dias */
-        selection-background-color: #a0d4a3; /* Fundo mais claro para dias selecionados */
-        selection-color: #000000; /* Cor do texto para dias selecionados */
-        outline: none; /* Remover a borda de foco */
-        border-bottom: 1px solid #e0e0e0; /* Linha de separação para o cabeçalho dos dias da semana */
-    }
-
-    QCalendarWidget QAbstractItemView QHeaderView::section {
-        background-color: #f0f0f0; /* Fundo cinza claro para a linha dos dias da semana */
-        color: #555555; /* Cor do texto para os dias da semana */
-        border: none;
-        padding: 5px;
-    }
-
-    /* Estilo para o dia normal no calendário */
-    QCalendarWidget QAbstractItemView:enabled {
-        color: #333; /* Cor do texto padrão para os números dos dias */
-    }
-
-    QCalendarWidget QAbstractItemView:enabled:hover {
-        background-color: #e6ffe6; /* Um verde muito claro no hover */
-        border-radius: 3px; /* Bordas arredondadas no hover */
-    }
-
-    QCalendarWidget QAbstractItemView:selected {
-        background-color: #2a9d8f; /* Cor do fundo do dia selecionado (verde mais escuro) */
-        color: white; /* Cor do texto do dia selecionado */
-        border-radius: 3px; /* Bordas arredondadas para seleção */
-    }
-
-    /* Para o dia de hoje - AGORA COM CIRCULO VERDE MAIS CLARO */
-    QCalendarWidget QAbstractItemView:!selected:focus { /* Dia de hoje, se não estiver selecionado */
-        background-color: #d4f7d4; /* Um verde pastel */
-        color: #000000;
-        border: 1px solid #4caf50; /* Borda verde suave */
-        border-radius: 50%; /* Faz um círculo */
-    }
-
-    /* Para a borda à volta do número do dia */
-    QCalendarWidget QCalendarView::item {
-        border-radius: 0px; /* Reset para itens normais */
-        padding: 4px; /* Padding para espaçar os números */
-    }
-
-    /* Dias desabilitados (fora do mês atual) */
-    QCalendarWidget QAbstractItemView:disabled {
-        color: #cccccc; /* Cor cinza para dias fora do mês */
-    }
-""")
-
     def get_form_data(self):
         # Esta função já estava completa e não precisa de alterações relacionadas a "vendido"
         matricula = self.matricula.text().strip()
@@ -833,17 +499,18 @@ class AddExpenseDialog(QDialog):
 
         # Funções para conversão segura de campos numéricos
         def parse_float(text):
-            locale = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
-            try:
-                # Remove espaços em branco
-                clean_text = text.strip()
-                if not clean_text:  # Se for string vazia após strip, retorna None
-                    return None
-                # Converte para float usando a localidade correta para vírgula/ponto decimal
-                return locale.toFloat(clean_text)[0]  # [0] para obter o float do tuple (float, bool)
-            except Exception as e:
-                print(f"Erro ao converter '{text}' para float: {e}")
-                return None
+            # Mesmas regras que a importação; texto inválido é gravado como vazio
+            value, ok = parse_number(text)
+            if not ok:
+                print(f"Erro ao converter '{text}' para float")
+            return value
+
+        def parse_cents(text):
+            # Valores monetários: gravados em cêntimos (ver money.py)
+            value, ok = parse_money(text)
+            if not ok:
+                print(f"Erro ao converter '{text}' para um valor monetário")
+            return value
 
         def parse_int(text):
             try:
@@ -855,7 +522,7 @@ class AddExpenseDialog(QDialog):
             except ValueError:
                 return None
 
-        isv = parse_float(self.isv.text())
+        isv = parse_cents(self.isv.text())
         n_registo_contabilidade = self.nRegistoContabilidade.text().strip()  # Manter como string
 
         # Obter data da compra do DateLineEdit
@@ -864,27 +531,27 @@ class AddExpenseDialog(QDialog):
 
         doc_compra = self.docCompra.text().strip()
         tipo_documento = self.tipoDocumento.currentText()
-        valor_compra = parse_float(self.valorCompra.text())
+        valor_compra = parse_cents(self.valorCompra.text())
 
         # Obter data da venda do DateLineEdit
         data_venda_qdate = self.dataVenda.date()
         data_venda = data_venda_qdate.toString("yyyy-MM-dd") if data_venda_qdate.isValid() else None
 
         doc_venda = self.docVenda.text().strip()  # Manter como string
-        valor_venda = parse_float(self.valorVenda.text())
+        valor_venda = parse_cents(self.valorVenda.text())
 
         # Imposto é calculado, não lido diretamente
-        imposto = parse_float(self.imposto.text())
-        valor_base = parse_float(self.valorBase.text())
+        imposto = parse_cents(self.imposto.text())
+        valor_base = parse_cents(self.valorBase.text())
 
         taxa_str = self.taxa.currentText()
         taxa = parse_float(taxa_str) if taxa_str != "N/A" else None
 
         regime_fiscal = ""
         if self.regime_geral_radio.isChecked():
-            regime_fiscal = "Regime Normal"
+            regime_fiscal = REGIME_NORMAL
         elif self.regime_lucro_tributavel_radio.isChecked():
-            regime_fiscal = "Margem"
+            regime_fiscal = REGIME_MARGEM
 
         return {
             "matricula": matricula,
@@ -914,92 +581,103 @@ class AddExpenseDialog(QDialog):
                                 "Matrícula, Marca e Valor de Compra são obrigatórios.")
             return
 
+        # A gravação corre no pool de async_db; o botão fica inativo até chegar a resposta
+        session = self._session
+        old = self.initial_data if self.mode == "edit" else None
         if self.mode == "add":
-            if add_expense_to_db(data["matricula"], data["marca"], data["numeroQuadro"], data["isv"],
-                                 data["nRegistoContabilidade"], data["dataCompra"], data["docCompra"],
-                                 data["tipoDocumento"], data["valorCompra"], data["dataVenda"],
-                                 data["docVenda"], data["valorVenda"], data["imposto"],
-                                 data["valorBase"], data["taxa"], data["regime_fiscal"]):
-                QMessageBox.information(self, "Sucesso", "Registo adicionado com sucesso!")
-                self.parent_window.load_table_data()
-                self.accept()
-            else:
-                QMessageBox.critical(self, "Erro", "Erro ao adicionar registo.")
+            self.add_button.setEnabled(False)
+            database_executor().submit(
+                repository().add_expense_to_db, data["matricula"], data["marca"], data["numeroQuadro"], data["isv"],
+                data["nRegistoContabilidade"], data["dataCompra"], data["docCompra"],
+                data["tipoDocumento"], data["valorCompra"], data["dataVenda"],
+                data["docVenda"], data["valorVenda"], data["imposto"],
+                data["valorBase"], data["taxa"], data["regime_fiscal"],
+                on_result=lambda new_id: self.record_saved(session, new_id, old, data,
+                                                           "Registo adicionado com sucesso!",
+                                                           "Erro ao adicionar registo."),
+                on_error=lambda message: self.record_saved(session, None, old, data, "", message))
         elif self.mode == "edit":
             if self.initial_data and self.initial_data.get("id") is not None:
-                if update_expense_in_db(self.initial_data["id"], data):
-                    QMessageBox.information(self, "Sucesso", "Registo atualizado com sucesso!")
-                    self.parent_window.load_table_data()
-                    self.accept()
-                else:
-                    QMessageBox.critical(self, "Erro", "Erro ao atualizar registo.")
+                self.add_button.setEnabled(False)
+                database_executor().submit(
+                    repository().update_expense_in_db, self.initial_data["id"], data,
+                    on_result=lambda updated_id: self.record_saved(session, updated_id, old, data,
+                                                                   "Registo atualizado com sucesso!",
+                                                                   "Erro ao atualizar registo."),
+                    on_error=lambda message: self.record_saved(session, None, old, data, "", message))
             else:
                 QMessageBox.critical(self, "Erro", "ID do veículo não encontrado para edição.")
 
+    def record_saved(self, session, saved_id, old, data, success_message, error_message):
+        if saved_id is not None:
+            completion_service().record_changed(old, data)
+        if session != self._session:
+            return  # O formulário já foi reaberto para outro registo
+        self.add_button.setEnabled(True)
+        if saved_id is not None:
+            QMessageBox.information(self, "Sucesso", success_message)
+            self.saved_id = saved_id
+            self.accept()
+        else:
+            QMessageBox.critical(self, "Erro", error_message)
 
-    def calculate_regime_fields(self):
-        """Calcula o Valor Base e o Imposto com base nas novas regras."""
 
-        valor_compra_text = re.sub(r'[^\d.]', '', self.valorCompra.text().replace(',', '.'))
-        valor_venda_text = re.sub(r'[^\d.]', '', self.valorVenda.text().replace(',', '.'))
+    def calculate_regime_fields(self):
+        """Calcula o Valor Base e o Imposto com base nas novas regras (ver tax.compute_tax)."""
+        valor_compra, compra_ok = parse_number(self.valorCompra.text())
+        valor_venda, venda_ok = parse_number(self.valorVenda.text())
         taxa_str = self.taxa.currentText()
-
-        try:
-            valor_compra = Decimal(valor_compra_text) if valor_compra_text else Decimal(0)
-            valor_venda = Decimal(valor_venda_text) if valor_venda_text else Decimal(0)
-            taxa = Decimal(taxa_str) if taxa_str != "N/A" else Decimal(0)
-        except Exception:
-            self.valorBase.setText("")
-            self.imposto.setText("")
-            return
-
-        valor_base = Decimal(0)
-        imposto = Decimal(0)
-
-        def format_decimal_for_display(value):
-            locale = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
-            return locale.toString(float(value.quantize(Decimal("0.01"))), 'f', 2)
+        taxa = taxa_str if taxa_str != "N/A" else None
 
         if self.regime_geral_radio.isChecked():
-            valor_base = valor_venda / (1 + taxa / 100)
-            imposto = valor_base * (taxa / Decimal(100))
+            regime = REGIME_NORMAL
         elif self.regime_lucro_tributavel_radio.isChecked():
-            margem = (valor_venda - valor_compra) / (1 + taxa / 100)
-            if margem > 0:
-                valor_base = margem
-                imposto = margem * (taxa / Decimal(100))
-            else:
-                valor_base = Decimal(0)
-                imposto = Decimal(0)
+            regime = REGIME_MARGEM
         else:
-            self.valorBase.setText("")
-            self.imposto.setText("")
-            return
+            regime = None
 
-        self.valorBase.setText(format_decimal_for_display(valor_base))
-        self.imposto.setText(format_decimal_for_display(imposto))
+        valor_base, imposto = compute_tax(regime, valor_compra, valor_venda, taxa) \
+            if compra_ok and venda_ok else (None, None)
+        self.valorBase.setText(format_money(valor_base))
+        self.imposto.setText(format_money(imposto))
 
 
 class ExpenseApp(QWidget):
+    SEARCH_DEBOUNCE_MS = 150  # Pausa na escrita antes de pesquisar na base de dados
+
     def __init__(self):
         super().__init__()
         self.init_ui()
-        self.apply_styles()
-        self.load_table_data()
         self.showMaximized()  # Definir para iniciar em tela cheia
 
+    def start_loading(self):
+        """Começa a ler os dados; chamado depois de a janela aparecer e a base de dados estar aberta."""
+        self.load_table_data()
+        completion_service()  # Índices do autocompletar lidos em segundo plano, antes do primeiro diálogo
+
     def init_ui(self):
         self.setWindowTitle("MBAuto - Gestão de Despesas de Viaturas")
         # Removido self.setGeometry, pois showMaximized() o substituirá
         # self.setGeometry(100, 100, 1000, 600)  # Maior para acomodar as colunas
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(
-            ["ID", "Matrícula", "Marca", "Valor Compra", "Doc. Venda", "Valor Venda", "Imposto", "Valor Base"])
+        # Grelha virtualizada: o modelo lê as linhas da base de dados por blocos
+        self.model = VehicleTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)  # Make table non-editable
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)  # Selects entire row
+        # Clicar num cabeçalho ordena no SQLite (VehicleTableModel.sort); o terceiro clique repõe a ordem
+        self.table.horizontalHeader().setSortIndicatorClearable(True)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.verticalHeader().setDefaultSectionSize(30)  # Altura fixa evita medir cada linha
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)  # Make table non-editable
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)  # Selects entire row
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+
+        # Indicador de leituras em curso (os blocos da grelha são lidos em segundo plano)
+        self.loading_label = QLabel("A carregar...")
+        self.loading_label.setVisible(False)
+        self.model.loadingChanged.connect(self.loading_label.setVisible)
 
         # --- CONECTAR O SINAL DE DUPLO CLIQUE ---
         self.table.doubleClicked.connect(self.show_edit_dialog)
@@ -1017,6 +695,29 @@ class ExpenseApp(QWidget):
         self.delete_button = QPushButton("Apagar Registo")
         self.print_button = QPushButton("Imprimir Tabela")
         self.print_button.clicked.connect(self.print_table)
+        self.pdf_button = QPushButton("Exportar PDF")
+        self.pdf_button.clicked.connect(self.export_pdf)
+        self.report_worker = None
+        self.report_printer = None
+        self.file_worker = None  # Importação/exportação em curso (ver file_workers.py)
+        self.import_button = QPushButton("Importar Ficheiro")
+        self.import_button.clicked.connect(self.import_vehicles)
+        self.export_button = QPushButton("Exportar")
+        self.export_button.clicked.connect(self.export_vehicles)
+        self.summary_button = QPushButton("Resumo Mensal")
+        self.summary_button.clicked.connect(self.show_summary_dialog)
+        self.diagnostics_button = QPushButton("Diagnóstico")
+        self.diagnostics_button.clicked.connect(self.show_diagnostics_dialog)
+        self.diagnostics_dialog = None
+        self.expense_dialog = None  # Formulário de adição/edição, criado na primeira utilização
+
+        # Filtros avançados (datas, valores, regime, taxa, tipo de documento), aplicados pelo SQLite
+        self.filter_button = QPushButton("Filtros")
+        self.filter_button.setCheckable(True)
+        self.filter_button.setToolTip("Filtrar por datas, valores, regime fiscal, taxa e tipo de documento")
+        self.filter_button.toggled.connect(self.toggle_filter_panel)
+        self.filter_panel = None  # Criado na primeira utilização
+        self.criteria = {}  # Critérios aplicados pela última vez (ver FilterPanel.criteria)
 
         self.checkbox_vendidos = QCheckBox("Vendidos")
         self.checkbox_stock = QCheckBox("Em stock")
@@ -1024,11 +725,18 @@ class ExpenseApp(QWidget):
         self.checkbox_stock.setChecked(True)
 
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Pesquisar por Matrícula ou Marca...")
+        self.search_input.setPlaceholderText("Pesquisar por Matrícula, Marca, Nº Quadro, Documentos...")
 
         # Conectar o sinal returnPressed para pesquisar ao pressionar Enter
         self.search_input.returnPressed.connect(self.search_expenses)
 
+        # Pesquisa enquanto se escreve: espera por uma pausa antes de ir à base de dados
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.search_expenses)
+        self.search_input.textChanged.connect(self.search_text_changed)
+
         # Botão de limpar pesquisa (X)
         self.clear_search_button = QPushButton("X")
         self.clear_search_button.setObjectName("clearSearchButton")  # Para aplicar estilo CSS específico
@@ -1046,6 +754,11 @@ class ExpenseApp(QWidget):
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.delete_button)
         button_layout.addWidget(self.print_button)
+        button_layout.addWidget(self.pdf_button)
+        button_layout.addWidget(self.import_button)
+        button_layout.addWidget(self.export_button)
+        button_layout.addWidget(self.summary_button)
+        button_layout.addWidget(self.diagnostics_button)
         button_layout.addStretch(1)  # Push buttons to the left
 
         search_layout = QHBoxLayout()
@@ -1054,6 +767,8 @@ class ExpenseApp(QWidget):
         search_layout.addWidget(self.search_button)  # Botão de pesquisa (Lupa)
         search_layout.addWidget(self.checkbox_vendidos)
         search_layout.addWidget(self.checkbox_stock)
+        search_layout.addWidget(self.filter_button)
+        search_layout.addWidget(self.loading_label)
 
         self.add_button.clicked.connect(self.show_add_dialog)
         self.delete_button.clicked.connect(self.delete_expense)
@@ -1068,498 +783,247 @@ class ExpenseApp(QWidget):
 
         self.setLayout(main_layout)
 
-    def apply_styles(self):
-        self.setStyleSheet("""
-    /* Base styling */
-    QWidget {
-        background-color: #e3e9f2;
-        font-family: Arial, sans-serif;
-        font-size: 14px;
-        color: #333;
-    }
-
-    /* Headings for labels */
-    QLabel {
-        font-size: 16px;
-        color: #2c3e50;
-        font-weight: bold;
-        padding: 5px;
-    }
-
-    /* Styling for input fields */
-    QLineEdit, QComboBox {
-        background-color: #ffffff;
-        font-size: 14px;
-        color: #333;
-        border: 1px solid #b0bfc6;
-        border-radius: 5px;
-        padding: 5px;
-    }
-    QLineEdit:hover, QComboBox:hover {
-        border: 1px solid #4caf50;
-    }
-    QLineEdit:focus, QComboBox:focus {
-        border: 1px solid #2a9d8f;
-        background-color: #f5f9fc;
-    }
-
-    /* Table styling */
-    QTableWidget {
-        background-color: #ffffff;
-        alternate-background-color: #f2f7fb;
-        gridline-color: #c0c9d0;
-        font-size: 14px;
-        border: 1px solid #cfd9e1;
-    }
-
-    /* A COR DE SELEÇÃO DEVE SER MAIS ESPECÍFICA PARA SOBREPÔR OUTRAS CORES */
-    QTableWidget::item:selected {
-        background-color: #d0d7de; /* Cor de seleção cinza mais clara */
-        color: #000000;
-    }
-
-    /* NOVO: Estilo para itens vendidos - será sobreposto por ::item:selected */
-    /* Este estilo aplica-se ao item individual, o que pode ser mais robusto */
-    QTableWidget::item[sold="true"] { /* Usamos uma propriedade dinâmica 'sold' */
-        background-color: #d4edda; /* Verde pastel para vendido */
-        color: #333; /* Cor do texto para contraste */
-    }
-
-
-    QHeaderView::section {
-        background-color: #4caf50;
-        color: white;
-        font-weight: bold;
-        padding: 4px;
-        border: 1px solid #cfd9e1;
-    }
-
-    /* Scroll bar styling */
-    QScrollBar:vertical {
-        width: 12px;
-        background-color: #f0f0f0;
-        border: none;
-    }
-    QScrollBar::handle:vertical {
-        background-color: #4caf50;
-        min-height: 20px;
-        border-radius: 5px;
-    }
-    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-        background: none;
-    }
-
-    /* Buttons */
-    QPushButton {
-        background-color: #4caf50;
-        color: white;
-        padding: 10px 15px;
-        border-radius: 5px;
-        font-size: 14px;
-        font-weight: bold;
-        transition: background-color 0.3s;
-    }
-    QPushButton:hover {
-        background-color: #45a049;
-    }
-    QPushButton:pressed {
-        background-color: #3d8b40;
-    }
-    QPushButton:disabled {
-        background-color: #c8c8c8;
-        color: #6e6e6e;
-    }
-
-    /* Estilo para o botão de Limpar Pesquisa (o "X") */
-    QPushButton#clearSearchButton {
-        background-color: transparent;
-        border: none;
-        color: #555555;
-        padding: 0px 5px;
-        border-radius: 5px;
-        font-size: 18px;
-        font-weight: bold;
-        min-width: 25px;
-    }
-    QPushButton#clearSearchButton:hover {
-        background-color: #e0e0e0;
-        border-radius: 5px;
-    }
-    QPushButton#clearSearchButton:pressed {
-        background-color: #cccccc;
-    }
-
-    /* NOVO: Estilo para o botão de Pesquisa (a "Lupa") */
-    QPushButton#searchButton {
-        background-color: transparent;
-        border: none;
-        color: #555555;
-        padding: 0px 5px;
-        border-radius: 5px;
-        font-size: 18px;
-        font-weight: bold;
-        min-width: 25px;
-    }
-    QPushButton#searchButton:hover {
-        background-color: #e0e0e0;
-        border-radius: 5px;
-    }
-    QPushButton#searchButton:pressed {
-        background-color: #cccccc;
-    }
-
-
-    /* Tooltip styling */
-    QToolTip {
-        background-color: #2c3e50;
-        color: #ffffff;
-        border: 1px solid #333;
-        font-size: 12px;
-        padding: 5px;
-        border-radius: 4px;
-    }
-
-    QCheckBox {
-        color: #333333;
-        font-weight: normal;
-        spacing: 6px;
-    }
-    
-    QCheckBox::indicator {
-        width: 14px;
-        height: 14px;
-    }
-    
-    QCheckBox::indicator:checked {
-        background-color: #4caf50;
-        border: 1px solid #388e3c;
-    }
-    
-    QCheckBox::indicator:unchecked {
-        background-color: white;
-        border: 1px solid #888;
-    }
-
-    /* ESTILO PARA QRadioButton */
-    QRadioButton {
-        color: #333;
-        padding: 4px 0px;
-    }
-
-    QRadioButton::indicator {
-        width: 16px;
-        height: 16px;
-        border-radius: 8px;
-        border: 2px solid #555555;
-        background-color: #ffffff;
-    }
-
-    QRadioButton::indicator:hover {
-        border: 2px solid #4caf50;
-    }
-
-    QRadioButton::indicator:checked {
-        background-color: #4caf50;
-        border: 2px solid #2a9d8f;
-    }
-
-    /* NOVO ESTILO: QRadioButton quando desabilitado */
-    QRadioButton:disabled {
-        color: #a0a0a0;
-    }
-
-    QRadioButton::indicator:disabled {
-        background-color: #e0e0e0;
-        border: 2px solid #b0b0b0;
-    }
-
-    /* Estilo para QCalendarWidget */
-    QCalendarWidget {
-        background-color: #ffffff;
-        border: 1px solid #cfd9e1;
-        border-radius: 5px;
-    }
-
-    /* Barra de navegação do calendário (onde está o mês e ano) */
-    QCalendarWidget QWidget#qt_calendar_navigationbar {
-        background-color: #e8ecf4;
-        color: #333;
-        border-top-left-radius: 5px;
-        border-top-right-radius: 5px;
-        border: none;
-    }
-
-    /* Estilo dos botões de navegação (setas) e spinbox de ano/mês */
-    QCalendarWidget QAbstractSpinBox,
-    QCalendarWidget QPushButton {
-        background-color: #e8ecf4;
-        color: #4caf50;
-        border: 1px solid #b0bfc6;
-        border-radius: 3px;
-        font-size: 14px;
-        padding: 3px 5px;
-    }
-    QCalendarWidget QAbstractSpinBox:hover,
-    QCalendarWidget QPushButton:hover {
-        background-color: #dbe2ea;
-    }
-    QCalendarWidget QAbstractSpinBox:pressed,
-    QCalendarWidget QPushButton:pressed {
-        background-color: #c9d0d9;
-    }
-
-    /* Setas dentro do Spinbox */
-    QCalendarWidget QSpinBox::up-button,
-    QCalendarWidget QSpinBox::down-button {
-        subcontrol-origin: border;
-        subcontrol-position: right;
-        width: 16px;
-        border-left: 1px solid #b0bfc6;
-        background-color: #e8ecf4;
-        border-top-right-radius: 3px;
-        border-bottom-right-radius: 3px;
-    }
-    QCalendarWidget QSpinBox::up-button:hover,
-    QCalendarWidget QSpinBox::down-button:hover {
-        background-color: #dbe2ea;
-    }
-    QCalendarWidget QSpinBox::up-arrow,
-    QCalendarWidget QSpinBox::down-arrow {
-        background-color: transparent;
-        color: #4caf50;
-    }
-
-    /* Cabeçalho da grelha do calendário (Dias da Semana - Seg, Ter, Qua, etc.) */
-    QCalendarWidget QAbstractItemView {
-        background-color: #ffffff;
-        selection-background-color: #a0d4a3;
-        selection-color: #000000;
-        outline: none;
-        border-bottom: 1px solid #e0e0e0;
-    }
-
-    QCalendarWidget QAbstractItemView QHeaderView::section {
-        background-color: #f0f0f0;
-        color: #555555;
-        border: none;
-        padding: 5px;
-    }
-
-    /* Estilo para o dia normal no calendário */
-    QCalendarWidget QAbstractItemView:enabled {
-        color: #333;
-    }
-
-    QCalendarWidget QAbstractItemView:enabled:hover {
-        background-color: #e6ffe6;
-        border-radius: 3px;
-    }
-
-    QCalendarWidget QAbstractItemView:selected {
-        background-color: #2a9d8f;
-        color: white;
-        border-radius: 3px;
-    }
-
-    /* Para o dia de hoje - AGORA COM CIRCULO VERDE MAIS CLARO */
-    QCalendarWidget QAbstractItemView:!selected:focus {
-        background-color: #d4f7d4;
-        color: #000000;
-        border: 1px solid #4caf50;
-        border-radius: 50%;
-    }
-
-    /* Para a borda à volta do número do dia */
-    QCalendarWidget QCalendarView::item {
-        border-radius: 0px;
-        padding: 4px;
-    }
-
-    /* Dias desabilitados (fora do mês atual) */
-    QCalendarWidget QAbstractItemView:disabled {
-        color: #cccccc;
-    }
-""")
-
     def load_table_data(self):
-        # expense agora inclui dataVenda como o último elemento
-        expenses = fetch_expenses()
-        self.table.setRowCount(0)
-
-        mostrar_vendidos = self.checkbox_vendidos.isChecked()
-        mostrar_stock = self.checkbox_stock.isChecked()
-
-        for expense in expenses:
-            data_venda = expense[8]  # Último campo: dataVenda
-            valor_venda = expense[5]
-            doc_venda = expense[4]
-
-            is_sold = bool(data_venda) or \
-                      (valor_venda is not None and str(valor_venda).strip() != "" and float(valor_venda) > 0) or \
-                      (doc_venda is not None and str(doc_venda).strip() != "")
-
-            # Aplica o filtro. Se nenhum for selecionado, mostra nada.
-            if not mostrar_vendidos and not mostrar_stock:
-                continue
-            elif is_sold and not mostrar_vendidos:
-                continue
-            elif not is_sold and not mostrar_stock:
-                continue
-
-            # A linha passou no filtro, pode ser inserida
-            row_idx = self.table.rowCount()
-            self.table.insertRow(row_idx)
-
-            for col_idx in range(8):  # 0–7 → inclui "Valor Base"
-                data = expense[col_idx]
-
-                if col_idx in [3, 5, 6, 7]:  # valorCompra, valorVenda, imposto, valorBase
-                    try:
-                        if data is None or (isinstance(data, str) and not str(data).strip()):
-                            formatted_data = ""
-                        else:
-                            locale = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
-                            formatted_data = locale.toString(float(data), 'f', 2)
-                        item = QTableWidgetItem(formatted_data)
-                    except (ValueError, TypeError):
-                        item = QTableWidgetItem(str(data))
-                else:
-                    item = QTableWidgetItem(str(data))
-
-                if is_sold:
-                    item.setBackground(QColor("#d4edda"))
+        # O modelo só lê da base de dados as linhas que a vista precisa de mostrar
+        self.search_timer.stop()
+        self.model.set_filters(show_sold=self.checkbox_vendidos.isChecked(),
+                               show_stock=self.checkbox_stock.isChecked(),
+                               search_text=self.search_input.text(), criteria=self.criteria)
+
+    def toggle_filter_panel(self, visible):
+        if self.filter_panel is None:
+            from filter_panel import FilterPanel
+
+            self.filter_panel = FilterPanel(self)
+            self.filter_panel.criteriaChanged.connect(self.apply_filters)
+            self.layout().insertWidget(2, self.filter_panel)  # Entre a pesquisa e a grelha
+        self.filter_panel.setVisible(visible)
+
+    def apply_filters(self):
+        self.criteria = self.filter_panel.criteria()
+        # Com o painel fechado os critérios continuam ativos; o botão mostra quantos são
+        self.filter_button.setText(f"Filtros ({len(self.criteria)})" if self.criteria else "Filtros")
+        self.load_table_data()
 
-                self.table.setItem(row_idx, col_idx, item)
+    def selected_vehicle_id(self):
+        """Devolve o id do veículo da linha selecionada, ou None se não houver seleção."""
+        index = self.table.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model.vehicle_id(index.row())
+
+    def prepare_expense_dialog(self, mode, initial_data=None):
+        """Devolve o formulário de adição/edição, reposto para o modo indicado."""
+        if self.expense_dialog is None:
+            self.expense_dialog = AddExpenseDialog(self, mode, initial_data)
+        else:
+            self.expense_dialog.reset(mode, initial_data)
+        return self.expense_dialog
 
     def show_add_dialog(self):
-        dialog = AddExpenseDialog(self, mode="add")
+        dialog = self.prepare_expense_dialog("add")
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_table_data()
+            # Só a nova linha é acrescentada; seleção, scroll e pesquisa mantêm-se
+            self.model.vehicle_added(dialog.saved_id)
 
     def show_edit_dialog(self):
-        selected_row = self.table.currentRow()
-        if selected_row == -1:
+        expense_id = self.selected_vehicle_id()
+        if expense_id is None:
             QMessageBox.warning(self, "No Selection", "Please select a record to edit.")
             return
 
-        expense_id = int(self.table.item(selected_row, 0).text())
-        initial_data = fetch_vehicle_by_id(expense_id)
+        # key="edit": um duplo clique noutra linha antes da resposta substitui o pedido anterior
+        database_executor().submit(repository().fetch_vehicle_by_id, expense_id, key="edit",
+                                   on_result=self.open_edit_dialog)
 
+    def open_edit_dialog(self, initial_data):
         if initial_data:
-            dialog = AddExpenseDialog(self, mode="edit", initial_data=initial_data)
+            dialog = self.prepare_expense_dialog("edit", initial_data)
             if dialog.exec() == QDialog.DialogCode.Accepted:
-                self.load_table_data()
+                self.model.vehicle_updated(dialog.saved_id)
         else:
             QMessageBox.critical(self, "Erro", "Não foi possível carregar os dados do veículo para edição.")
 
     def delete_expense(self):
-        selected_row = self.table.currentRow()
-        if selected_row == -1:
+        expense_id = self.selected_vehicle_id()  # Hidden ID column
+        if expense_id is None:
             QMessageBox.warning(self, "No Selection", "Please select an expense to delete.")
             return
 
-        expense_id = int(self.table.item(selected_row, 0).text())  # Hidden ID column
         confirm = QMessageBox.question(self, "Confirm", "Are you sure you want to delete this expense?",
                                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
 
         if confirm == QMessageBox.StandardButton.Yes:
-            if delete_expense_from_db(expense_id):
-                self.load_table_data()
-                self.table.clearSelection()  # Deselects the row after deletion
-            else:
-                QMessageBox.critical(self, "Erro", "Erro ao apagar registo.")
+            expense = self.model.row_data(self.table.currentIndex().row())
+            self.delete_button.setEnabled(False)
+            database_executor().submit(repository().delete_expense_from_db, expense_id,
+                                       on_result=lambda deleted_id: self.expense_deleted(deleted_id, expense),
+                                       on_error=lambda message: self.expense_deleted(None, expense))
+
+    def expense_deleted(self, deleted_id, expense):
+        self.delete_button.setEnabled(True)
+        if deleted_id is not None:
+            completion_service().record_changed(old={"matricula": expense[1], "marca": expense[2]})
+            self.model.vehicle_deleted(deleted_id)
+            self.table.clearSelection()  # Deselects the row after deletion
+        else:
+            QMessageBox.critical(self, "Erro", "Erro ao apagar registo.")
+
+    def search_text_changed(self, text):
+        # Uma pesquisa que estreita outra já feita ("MER" -> "MERC") é filtrada em memória,
+        # por isso aplica-se logo; as restantes esperam pelo fim da escrita
+        if self.model.can_search_from_cache(text):
+            self.load_table_data()
+        else:
+            self.search_timer.start()
 
     def search_expenses(self):
-        search_text = self.search_input.text().strip().lower()
-
-        # Fetch all data and filter in memory for simplicity
-        all_expenses = fetch_expenses()
-        self.table.setRowCount(0)
-
-        row_idx = 0
-        for expense in all_expenses:
-            # Indices: 1 for Matrícula, 2 for Marca
-            matricula = str(expense[1]).lower()
-            marca = str(expense[2]).lower()
-
-            if search_text in matricula or search_text in marca:
-                self.table.insertRow(row_idx)
-
-                # Extrair os campos relevantes para a condição "vendido"
-                data_venda = expense[8]  # dataVenda é o último elemento retornado por fetch_expenses
-                valor_venda = expense[5]  # valorVenda
-                doc_venda = expense[4]  # docVenda
-
-                # Lógica para determinar se o veículo está vendido
-                is_sold = bool(data_venda) or \
-                          (valor_venda is not None and str(valor_venda).strip() != "" and float(valor_venda) > 0) or \
-                          (doc_venda is not None and str(doc_venda).strip() != "")
-
-                sold_background_color = QColor("#d4edda")
-
-                for col_id in range(8):  # Columns 0 to 6 are visible
-                    data = expense[col_id]
-
-                    if col_id in [3, 5, 6, 7]:  # Valor Compra, Valor Venda, Imposto, valor base
-                        try:
-                            if data is None or (isinstance(data, str) and not str(data).strip()):
-                                formatted_data = ""
-                            else:
-                                locale = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
-                                formatted_data = locale.toString(float(data), 'f', 2)
-                            item = QTableWidgetItem(formatted_data)
-                        except (ValueError, TypeError):
-                            item = QTableWidgetItem(str(data))
-                    else:
-                        item = QTableWidgetItem(str(data))
-
-                    if is_sold:
-                        item.setBackground(sold_background_color)
-                        item.setData(Qt.ItemDataRole.UserRole, True)  # Set custom role data
-                    self.table.setItem(row_idx, col_id, item)
-                row_idx += 1
+        # O filtro de pesquisa é aplicado pelo modelo à medida que os blocos são lidos
+        self.load_table_data()
 
     def clear_search(self):
         """Limpa o campo de pesquisa e recarrega todos os dados da tabela."""
         self.search_input.clear()
         self.load_table_data()
 
+    def import_vehicles(self):
+        """Importa veículos de um ficheiro CSV/XLSX (ex.: folhas de cálculo dos concessionários)."""
+        path, _ = QFileDialog.getOpenFileName(self, "Importar Veículos", "",
+                                              "Folhas de cálculo (*.csv *.xlsx);;Todos os ficheiros (*)")
+        if not path:
+            return
+        if not self.can_start_file_worker():
+            return
+        from file_workers import ImportWorker
+
+        worker = ImportWorker(path, parent=self)
+        self.file_worker = worker
+
+        progress_dialog = QProgressDialog("A importar registos...", None, 0, 0, self)
+        progress_dialog.setWindowTitle("Importar Veículos")
+        progress_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.show()
+
+        worker.progress.connect(lambda processed, inserted: progress_dialog.setLabelText(
+            f"Linhas lidas: {processed}\nRegistos inseridos: {inserted}"))
+        worker.completed.connect(self.show_import_report)
+        worker.failed.connect(lambda message: QMessageBox.critical(self, "Erro na Importação", message))
+        worker.finished.connect(progress_dialog.close)
+        worker.start()
+
+    def can_start_file_worker(self):
+        if self.file_worker is not None and self.file_worker.isRunning():
+            QMessageBox.warning(self, "Importar/Exportar", "Já está a decorrer uma importação ou exportação.")
+            return False
+        return True
+
+    def show_import_report(self, report):
+        """Recarrega a grelha com os registos importados e mostra o resumo da importação."""
+        self.model.search_cache.clear()
+        self.model.reload()
+        completion_service().reload()
+
+        message = f"Registos inseridos: {report.inserted}\nLinhas rejeitadas: {len(report.rejected)}"
+        for line, reason in report.rejected[:10]:
+            message += f"\n  Linha {line}: {reason}"
+        if len(report.rejected) > 10:
+            message += f"\n  ... e mais {len(report.rejected) - 10}"
+        if report.error:
+            QMessageBox.critical(self, "Erro na Importação", f"{report.error}\n\n{message}")
+        else:
+            QMessageBox.information(self, "Importação Concluída", message)
+
+    def export_vehicles(self):
+        """Exporta todas as colunas dos veículos que passam nos filtros atuais."""
+        if not self.checkbox_vendidos.isChecked() and not self.checkbox_stock.isChecked():
+            QMessageBox.warning(self, "Exportar", "Selecione 'Vendidos' e/ou 'Em stock' para exportar.")
+            return
+
+        path, selected_filter = QFileDialog.getSaveFileName(
+            self, "Exportar Veículos", "veiculos.csv",
+            "CSV (*.csv);;Excel (*.xlsx);;Parquet (*.parquet)")
+        if not path:
+            return
+        # Acrescenta a extensão do filtro escolhido se o utilizador não a escreveu
+        extension = selected_filter[selected_filter.find("*") + 1:-1]
+        if not path.lower().endswith((".csv", ".xlsx", ".parquet")):
+            path += extension
+        if not self.can_start_file_worker():
+            return
+        from file_workers import ExportWorker
+
+        worker = ExportWorker(path, sold=self.model.sold_filter(), search_text=self.model.search_text,
+                              order_by=self.model.order_by or "id", criteria=self.model.criteria, parent=self)
+        self.file_worker = worker
+
+        progress_dialog = QProgressDialog("A exportar registos...", None, 0, 0, self)
+        progress_dialog.setWindowTitle("Exportar Veículos")
+        progress_dialog.setWindowModality(Qt.WindowModality.ApplicationModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.show()
+
+        worker.progress.connect(lambda count: progress_dialog.setLabelText(f"Registos exportados: {count}"))
+        worker.completed.connect(lambda count: QMessageBox.information(
+            self, "Exportação Concluída", f"{count} registos exportados para:\n{path}"))
+        worker.failed.connect(lambda message: QMessageBox.critical(self, "Erro na Exportação", message))
+        worker.finished.connect(progress_dialog.close)
+        worker.start()
+
+    def show_summary_dialog(self):
+        """Totais mensais de IVA e vendas, lidos da tabela de resumo (ver summary_view.py)."""
+        MonthlySummaryDialog(self).exec()
+
+    def show_diagnostics_dialog(self):
+        """Latências das consultas por operação; fica aberto enquanto se usa a aplicação."""
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
     def print_table(self):
-        # Cria o conteúdo em HTML com os dados da tabela
-        html = "<html><head><meta charset='utf-8'><style>"
-        html += "table { border-collapse: collapse; width: 100%; }"
-        html += "th, td { border: 1px solid black; padding: 8px; text-align: left; }"
-        html += "th { background-color: #4caf50; color: white; }"
-        html += "</style></head><body>"
-        html += "<h2>Registos de Veículos</h2><table>"
-
-        # Cabeçalhos
-        html += "<tr>"
-        for col in range(self.table.columnCount()):
-            if not self.table.isColumnHidden(col):
-                html += f"<th>{self.table.horizontalHeaderItem(col).text()}</th>"
-        html += "</tr>"
-
-        # Linhas da tabela
-        for row in range(self.table.rowCount()):
-            html += "<tr>"
-            for col in range(self.table.columnCount()):
-                if not self.table.isColumnHidden(col):
-                    item = self.table.item(row, col)
-                    html += f"<td>{item.text() if item else ''}</td>"
-            html += "</tr>"
-
-        html += "</table></body></html>"
-
-        # Cria o QTextDocument para impressão
-        document = QTextDocument()
-        document.setHtml(html)
-
-        # Configura a impressora
-        printer = QPrinter()
+        """Imprime os registos filtrados; o documento é gerado página a página numa thread."""
+        from PyQt6.QtPrintSupport import QPrinter, QPrintDialog  # Só carregado quando se imprime
+
+        printer = QPrinter(QPrinter.PrinterMode.HighResolution)
         printer.setOutputFormat(QPrinter.OutputFormat.NativeFormat)
+        printer.setPageOrientation(QPageLayout.Orientation.Landscape)
 
         # Abre a caixa de diálogo de impressão
         dialog = QPrintDialog(printer, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            document.print(printer)
+            self.start_report(printer=printer)
+
+    def export_pdf(self):
+        """Gera o relatório diretamente num ficheiro PDF, sem o diálogo de impressão."""
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar PDF", "veiculos.pdf", "PDF (*.pdf)")
+        if not path:
+            return
+        if not path.lower().endswith(".pdf"):
+            path += ".pdf"
+        self.start_report(pdf_path=path)
+
+    def start_report(self, printer=None, pdf_path=None):
+        if self.report_worker is not None and self.report_worker.isRunning():
+            QMessageBox.warning(self, "Relatório", "Já está a ser gerado um relatório.")
+            return
+        from report import ReportWorker
+
+        worker = ReportWorker(sold=self.model.sold_filter(), search_text=self.model.search_text,
+                              pdf_path=pdf_path, printer=printer, parent=self,
+                              order_by=self.model.order_by or "id", criteria=self.model.criteria)
+        self.report_worker = worker
+        self.report_printer = printer  # Mantém o QPrinter vivo enquanto a thread o usa
+
+        progress_dialog = QProgressDialog("A gerar o relatório...", "Cancelar", 0, 0, self)
+        progress_dialog.setWindowTitle("Relatório")
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.canceled.connect(worker.requestInterruption)
+
+        worker.progress.connect(lambda count: progress_dialog.setLabelText(f"Registos processados: {count}"))
+        worker.completed.connect(lambda count: QMessageBox.information(
+            self, "Relatório", f"Relatório concluído ({count} registos)." +
+                               (f"\n{pdf_path}" if pdf_path else "")))
+        worker.failed.connect(lambda message: QMessageBox.critical(self, "Erro no Relatório", message))
+        worker.finished.connect(progress_dialog.close)
+        worker.start()
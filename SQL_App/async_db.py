@@ -0,0 +1,133 @@
+# async_db.py
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from connection import close_thread_databases
+
+# O SQLite só aceita uma escrita de cada vez; duas threads chegam para que uma leitura
+# longa (ex.: uma pesquisa) não atrase as restantes.
+MAX_THREADS = 2
+
+
+class QueryTask(QRunnable):
+    """Uma chamada às funções de database.py executada numa thread do pool.
+
+    Funciona como um "future": cancel() retira a tarefa da fila ou, se já estiver a
+    correr, faz com que o resultado seja ignorado.
+    """
+
+    def __init__(self, executor, key, fn, args, kwargs, on_result, on_error):
+        super().__init__()
+        # O executor guarda a referência até o resultado ser entregue; sem autoDelete o
+        # objeto não é destruído pelo pool enquanto ainda pode ser cancelado
+        self.setAutoDelete(False)
+        self.executor = executor
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        self.executor.cancel(self)
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.executor.delivered.emit(self, False, str(e))
+        else:
+            self.executor.delivered.emit(self, True, result)
+
+
+class DatabaseExecutor(QObject):
+    """Executa consultas num QThreadPool e entrega os resultados na thread da interface.
+
+    Cada thread do pool usa a sua própria ligação (ver repository.py). Tarefas
+    submetidas com a mesma key substituem a anterior: uma pesquisa desatualizada é
+    cancelada e o seu resultado nunca chega aos callbacks.
+    """
+
+    # Emitido a partir das threads do pool; como o executor vive na thread da interface,
+    # o Qt entrega-o nessa thread (ligação em fila)
+    delivered = pyqtSignal(object, bool, object)
+    busyChanged = pyqtSignal(bool)
+
+    def __init__(self, max_threads=MAX_THREADS, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.pool.setExpiryTimeout(-1)  # Threads permanentes: uma ligação aberta por thread
+        self._latest = {}  # key -> tarefa mais recente
+        self._pending = set()
+        self.delivered.connect(self._deliver)
+
+    def submit(self, fn, *args, key=None, on_result=None, on_error=None, **kwargs):
+        """Agenda fn(*args, **kwargs). Devolve a QueryTask (que pode ser cancelada)."""
+        if key is not None and key in self._latest:
+            self.cancel(self._latest[key])
+        task = QueryTask(self, key, fn, args, kwargs, on_result, on_error)
+        if key is not None:
+            self._latest[key] = task
+        self._pending.add(task)
+        if len(self._pending) == 1:
+            self.busyChanged.emit(True)
+        self.pool.start(task)
+        return task
+
+    def cancel(self, task):
+        task.cancelled = True
+        self.pool.tryTake(task)  # Se ainda estiver na fila, nunca chega a correr
+        self._finish(task)
+
+    def is_busy(self):
+        return bool(self._pending)
+
+    def _finish(self, task):
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        if task in self._pending:
+            self._pending.discard(task)
+            if not self._pending:
+                self.busyChanged.emit(False)
+
+    def _deliver(self, task, ok, result):
+        if task.cancelled:
+            return
+        self._finish(task)
+        if ok:
+            if task.on_result is not None:
+                task.on_result(result)
+        elif task.on_error is not None:
+            task.on_error(result)
+        else:
+            print(f"Erro na consulta em segundo plano: {result}")
+
+    def shutdown(self):
+        """Cancela o que está na fila, espera pelas consultas em curso e fecha as ligações das threads."""
+        for task in list(self._pending):
+            self.cancel(task)
+        self.pool.waitForDone()
+        close_thread_databases()
+
+
+_executor = None
+
+
+def database_executor():
+    """Executor partilhado pela aplicação (criado na primeira utilização)."""
+    global _executor
+    if _executor is None:
+        _executor = DatabaseExecutor()
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
@@ -0,0 +1,4 @@
+# Benchmarks da aplicação. Correr a partir de SQL_App:
+#   python -m benchmarks.run          bateria completa (frotas sintéticas, resultados em JSON)
+#   python -m benchmarks.fleet        gera uma frota sintética numa base de dados
+#   python -m benchmarks.bench_formatting
@@ -0,0 +1,84 @@
+# bench_formatting.py
+#
+# Compara o custo de formatar os valores monetários de uma atualização da grelha:
+#   - um QLocale novo por célula (o que a grelha e o diálogo faziam antes);
+#   - um QLocale partilhado;
+#   - formatting.format_cents_column (locale único, formatação em Python com cache), com a
+#     cache vazia (primeira atualização) e já preenchida (atualizações seguintes).
+# Os valores são cêntimos, como vêm da base de dados (ver money.py).
+#
+# Uso: python -m benchmarks.bench_formatting [nº de linhas]
+
+import random
+import sys
+import time
+
+from PyQt6.QtCore import QLocale
+
+from formatting import LOCALE, _format_cents, format_cents_column
+
+MONEY_COLUMNS = 4  # valorCompra, valorVenda, imposto, valorBase
+
+
+def make_values(rows, seed=1):
+    rng = random.Random(seed)
+    values = []
+    for _ in range(rows * MONEY_COLUMNS):
+        choice = rng.random()
+        if choice < 0.1:
+            values.append(None)
+        elif choice < 0.6:
+            values.append(rng.randrange(50000, 9000000))  # Valores com cêntimos
+        else:
+            values.append(rng.randrange(500, 90000) * 1000)  # Valores redondos (repetem-se muito)
+    return values
+
+
+def locale_per_cell(values):
+    result = []
+    for value in values:
+        locale = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
+        result.append("" if value is None else locale.toString(value / 100, 'f', 2))
+    return result
+
+
+def shared_locale(values):
+    return ["" if value is None else LOCALE.toString(value / 100, 'f', 2) for value in values]
+
+
+def cold_column(values):
+    _format_cents.cache_clear()
+    return format_cents_column(values)
+
+
+def measure(fn, values, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else 10000
+    values = make_values(rows)
+
+    if format_cents_column(values) != shared_locale(values):
+        print("ERRO: format_cents_column não coincide com QLocale.toString")
+        return 1
+
+    print(f"{rows} linhas x {MONEY_COLUMNS} colunas monetárias ({len(values)} células)")
+    baseline = measure(locale_per_cell, values, 3)
+    for name, fn in (("QLocale por célula", locale_per_cell),
+                     ("QLocale partilhado", shared_locale),
+                     ("format_cents_column (cache vazia)", cold_column),
+                     ("format_cents_column", format_cents_column)):
+        elapsed = baseline if fn is locale_per_cell else measure(fn, values, 3)
+        print(f"  {name:<34} {elapsed * 1000:9.1f} ms   {baseline / elapsed:6.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
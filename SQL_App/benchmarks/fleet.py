@@ -0,0 +1,162 @@
+# fleet.py
+#
+# Gerador de uma frota sintética para os benchmarks: matrículas portuguesas, marcas, números
+# de quadro (VIN), datas, os dois regimes de IVA e uma mistura de veículos vendidos e em stock.
+#
+# Uso: python -m benchmarks.fleet --rows 100000 --db /tmp/frota.db [--append] [--backend qtsql]
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from queries import VEHICLE_FIELDS
+from repository import BACKENDS, close_repository, open_repository, repository
+from money import to_cents
+from tax import DOCUMENT_TYPES, REGIME_MARGEM, REGIME_NORMAL, compute_tax_cents
+
+# Marca, peso relativo na frota e prefixo do VIN (WMI)
+BRANDS = [
+    ("Renault", 12, "VF1"), ("Peugeot", 11, "VF3"), ("Citroën", 8, "VF7"), ("Volkswagen", 9, "WVW"),
+    ("Mercedes-Benz", 7, "WDD"), ("BMW", 7, "WBA"), ("Audi", 5, "WAU"), ("Seat", 5, "VSS"),
+    ("Opel", 5, "W0L"), ("Fiat", 5, "ZFA"), ("Ford", 4, "WF0"), ("Toyota", 5, "SB1"),
+    ("Nissan", 3, "SJN"), ("Dacia", 4, "UU1"), ("Kia", 3, "U5Y"), ("Hyundai", 3, "TMA"),
+    ("Skoda", 3, "TMB"), ("Volvo", 2, "YV1"), ("Mini", 1, "WMW"), ("Mazda", 1, "JMZ"),
+]
+RATES = [23, 23, 23, 23, 13, 6]
+SOLD_SHARE = 0.6
+NORMAL_SHARE = 0.35  # Os restantes com regime são de Margem
+NO_REGIME_SHARE = 0.05
+
+_PLATE_LETTERS = "ABCDEFGHIJLMNOPRSTUVXZ"
+_VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"  # Sem I, O e Q
+_FIRST_DAY = datetime.date(2015, 1, 1)
+_LAST_DAY = datetime.date(2025, 12, 31)
+
+
+class FleetGenerator:
+    """Gera registos (dicts com todas as chaves de VEHICLE_FIELDS, valores monetários em cêntimos),
+    sempre iguais para a mesma seed."""
+
+    def __init__(self, seed=1):
+        self.random = random.Random(seed)
+        self._brands = [brand for brand, _, _ in BRANDS]
+        self._brand_weights = [weight for _, weight, _ in BRANDS]
+        self._wmi = {brand: wmi for brand, _, wmi in BRANDS}
+        self._days = (_LAST_DAY - _FIRST_DAY).days
+        self._sequence = 0
+
+    def plate(self):
+        rng = self.random
+        letters = "".join(rng.choice(_PLATE_LETTERS) for _ in range(2))
+        second = "".join(rng.choice(_PLATE_LETTERS) for _ in range(2))
+        digits = f"{rng.randrange(100):02d}"
+        other = f"{rng.randrange(100):02d}"
+        # Formatos usados desde 1992: 00-00-AA, 00-AA-00, AA-00-00 e (desde 2020) AA-00-AA
+        return rng.choice([f"{digits}-{other}-{letters}", f"{digits}-{letters}-{other}",
+                           f"{letters}-{digits}-{other}", f"{letters}-{digits}-{second}"])
+
+    def vin(self, brand):
+        return self._wmi[brand] + "".join(self.random.choice(_VIN_CHARS) for _ in range(14))
+
+    def date(self, start=None, max_days=None):
+        start = start or _FIRST_DAY
+        span = max_days if max_days is not None else (_LAST_DAY - start).days
+        return start + datetime.timedelta(days=self.random.randint(0, max(span, 0)))
+
+    def record(self):
+        rng = self.random
+        self._sequence += 1
+        brand = rng.choices(self._brands, self._brand_weights)[0]
+        purchase_date = self.date(max_days=self._days - 30)
+        valor_compra = to_cents(round(rng.lognormvariate(9.4, 0.6), -1))  # ~12 000 € em média
+        sold = rng.random() < SOLD_SHARE
+
+        choice = rng.random()
+        if choice < NO_REGIME_SHARE:
+            regime, rate = "", None
+        else:
+            regime = REGIME_NORMAL if choice < NO_REGIME_SHARE + NORMAL_SHARE else REGIME_MARGEM
+            rate = rng.choice(RATES)
+
+        record = dict.fromkeys(VEHICLE_FIELDS)
+        record.update({
+            "matricula": self.plate(),
+            "marca": brand,
+            "numeroQuadro": self.vin(brand),
+            "isv": rng.randrange(0, 600000) if rng.random() < 0.3 else None,
+            "nRegistoContabilidade": f"{purchase_date.year}/{self._sequence:06d}",
+            "dataCompra": purchase_date.isoformat(),
+            "docCompra": f"FC {purchase_date.year}/{rng.randrange(1, 5000)}",
+            "tipoDocumento": rng.choice(DOCUMENT_TYPES),
+            "valorCompra": valor_compra,
+            "dataVenda": None,
+            "docVenda": "",
+            "valorVenda": None,
+            "taxa": float(rate) if rate is not None else None,
+            "regime_fiscal": regime,
+        })
+        if sold:
+            sale_date = self.date(purchase_date + datetime.timedelta(days=7), max_days=365)
+            record["dataVenda"] = min(sale_date, _LAST_DAY).isoformat()
+            record["docVenda"] = f"FT {sale_date.year}/{rng.randrange(1, 20000)}"
+            record["valorVenda"] = round(valor_compra * rng.uniform(0.95, 1.35))
+
+        valor_base, imposto = compute_tax_cents(regime, record["valorCompra"], record["valorVenda"], rate)
+        if valor_base is not None:
+            record["valorBase"] = valor_base
+            record["imposto"] = imposto
+        return record
+
+    def records(self, count):
+        for _ in range(count):
+            yield self.record()
+
+
+def vehicle_count():
+    rows = repository().execute_sql("SELECT COUNT(*) FROM vehicles")
+    return rows[0][0] if rows else 0
+
+
+def fill_database(count, seed=1, progress=None):
+    """Acrescenta count veículos sintéticos à base de dados aberta (repository.open_repository)."""
+    return repository().add_expenses_bulk(FleetGenerator(seed).records(count), progress=progress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Preenche uma base de dados com uma frota sintética.")
+    parser.add_argument("--rows", type=int, default=10000, help="número de veículos (ex.: 10000, 100000, 1000000)")
+    parser.add_argument("--db", required=True, help="ficheiro da base de dados (ex.: vehicles.db)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--append", action="store_true", help="acrescentar a uma base de dados com veículos")
+    parser.add_argument("--backend", choices=BACKENDS, default="sqlite3", help="acesso à base de dados")
+    args = parser.parse_args(argv)
+
+    application = None
+    if args.backend == "qtsql":
+        from PyQt6.QtCore import QCoreApplication
+        application = QCoreApplication(sys.argv[:1])
+    if open_repository(args.db, args.backend) is None:
+        print(f"Não foi possível abrir a base de dados '{args.db}'")
+        return 1
+    existing = vehicle_count()
+    if existing and not args.append:
+        print(f"A base de dados já tem {existing} veículos (use --append para acrescentar).")
+        close_repository()
+        return 1
+
+    start = time.perf_counter()
+    inserted = fill_database(args.rows, args.seed,
+                             progress=lambda done: print(f"\r{done}/{args.rows}", end="", flush=True))
+    print(f"\n{inserted} veículos inseridos em {time.perf_counter() - start:.1f} s")
+    close_repository()
+    del application
+    return 0 if inserted is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+# run.py
+#
+# Bateria de benchmarks da camada de dados e da interface, sem janelas (plataforma 'offscreen').
+# Para cada tamanho de frota é criada (uma vez) uma base de dados sintética com benchmarks.fleet;
+# os resultados são escritos em JSON para comparar commits.
+#
+# Uso: python -m benchmarks.run [--sizes 10000 100000 1000000] [--output resultados.json]
+#                               [--data-dir DIR] [--compare anterior.json] [--backend sqlite3]
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import PYQT_VERSION_STR, QT_VERSION_STR, Qt
+from PyQt6.QtWidgets import QApplication
+
+from app import AddExpenseDialog
+from benchmarks.fleet import FleetGenerator, fill_database, vehicle_count
+from completion import CompletionIndex
+from queries import GRID_FIELDS, VEHICLE_FIELDS, page_sql
+from report import ReportRenderer, create_pdf_writer
+from repository import BACKENDS, close_repository, open_repository, repository
+from styles import APP_STYLESHEET
+from tax import REGIME_MARGEM
+from vehicle_model import VehicleTableModel
+
+DEFAULT_SIZES = [10000]
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "sql_app_benchmarks")
+REGRESSION_THRESHOLD = 1.2  # --compare assinala medianas 20% mais lentas
+REPORT_ROWS = 1000
+# Combinações do painel de filtros medidas em filters.advanced; todas devem ser resolvidas por um índice
+FILTER_CRITERIA = [
+    {"sale_from": "2024-01-01", "sale_to": "2024-03-31"},
+    {"regime_fiscal": REGIME_MARGEM, "taxa": 23.0, "sale_from": "2024-01-01", "sale_to": "2024-12-31"},
+    {"tipoDocumento": "Fatura", "purchase_from": "2023-01-01", "purchase_to": "2023-06-30"},
+    {"min_purchase_value": 20000.0, "max_purchase_value": 25000.0},
+]
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+_BENCHMARKS = []  # (nome, função, repetições, preparação, linhas por execução, débito mínimo)
+BULK_ROWS = 5000
+BULK_MIN_ROWS_PER_S = 50000  # Débito pedido para a importação (importer.import_file)
+
+
+def benchmark(name, repeat=5, setup=None, rows=None, min_rows_per_s=None):
+    """Regista fn(context) como benchmark.
+
+    setup(context) corre uma vez antes das medições; fn pode devolver uma função de limpeza.
+    Nenhuma das duas é cronometrada. Com rows (linhas escritas por execução) o resultado
+    inclui também o débito, em linhas por segundo; com min_rows_per_s um débito abaixo deste
+    é assinalado e a execução termina com erro (ver main).
+    """
+    def register(fn):
+        _BENCHMARKS.append((name, fn, repeat, setup, rows, min_rows_per_s))
+        return fn
+    return register
+
+
+class BenchmarkContext:
+    """Dados partilhados pelos benchmarks de uma base de dados: ids, textos de pesquisa, etc."""
+
+    def __init__(self, rows, path, seed=7):
+        self.rows = rows
+        self.path = path
+        self.random = random.Random(seed)
+        self.max_id = repository().execute_sql("SELECT COALESCE(MAX(id), 0) FROM vehicles")[0][0]
+        sample = repository().fetch_vehicle_by_id(self.random_id()) or {"marca": "Renault", "matricula": "AA-00-00"}
+        self.brand = sample["marca"]
+        self.plate_fragment = sample["matricula"][:5]
+        self.generator = FleetGenerator(seed)
+
+    def random_id(self):
+        return self.random.randint(1, max(self.max_id, 1))
+
+    def delete_after(self, last_id):
+        repository().execute_sql("DELETE FROM vehicles WHERE id > :id", {"id": last_id})
+
+
+# --- Leitura da grelha ---
+
+@benchmark("fetch_expenses.first_page", repeat=20)
+def bench_first_page(context):
+    repository().fetch_expenses_page(limit=500)
+
+
+@benchmark("fetch_expenses.deep_page", repeat=20)
+def bench_deep_page(context):
+    repository().fetch_expenses_page((context.max_id - 1000,), limit=500)
+
+
+def _find_middle_key(context):
+    _, context.middle_key = repository().fetch_expenses_page(limit=context.rows // 2, order_by="-valorVenda")
+
+
+@benchmark("fetch_expenses.sorted_deep_page", repeat=20, setup=_find_middle_key)
+def bench_sorted_deep_page(context):
+    repository().fetch_expenses_page(context.middle_key, limit=500, order_by="-valorVenda")
+
+
+@benchmark("fetch_expenses.all_rows", repeat=3)
+def bench_all_rows(context):
+    repository().fetch_expenses()
+
+
+# --- Pesquisa e filtros ---
+
+@benchmark("search.brand", repeat=10)
+def bench_search_brand(context):
+    repository().search_vehicles(context.brand[:4], limit=100)
+
+
+@benchmark("search.plate_fragment", repeat=10)
+def bench_search_plate(context):
+    repository().search_vehicles(context.plate_fragment, limit=100)
+
+
+@benchmark("search.short_term", repeat=10)
+def bench_search_short(context):
+    repository().search_vehicles(context.plate_fragment[:2], limit=100)
+
+
+@benchmark("filters.toggle_sold_stock", repeat=10)
+def bench_filter_toggles(context):
+    # Mesmo caminho que as caixas "Vendidos"/"Em stock": reinicia o modelo e lê o primeiro bloco
+    model = VehicleTableModel(asynchronous=False)
+    for show_sold, show_stock in ((True, False), (False, True), (True, True)):
+        model.set_filters(show_sold=show_sold, show_stock=show_stock)
+        model.fetchMore()
+
+
+def _check_filter_plans(context):
+    # Um "SCAN vehicles" sem índice seria a tabela inteira sempre que o filtro deixa poucas linhas
+    for criteria in FILTER_CRITERIA:
+        sql, values, _ = page_sql(GRID_FIELDS, None, VehicleTableModel.CHUNK_SIZE, "id", criteria)
+        plan = [row[-1] for row in repository().execute_sql(f"EXPLAIN QUERY PLAN {sql}", values) or []]
+        if any(step.startswith("SCAN vehicles") and "INDEX" not in step for step in plan):
+            print(f"  AVISO: {criteria} percorre a tabela sem índice: {'; '.join(plan)}")
+
+
+@benchmark("filters.advanced", repeat=10, setup=_check_filter_plans)
+def bench_advanced_filters(context):
+    # Mesmo caminho que o botão "Aplicar" do painel de filtros, para cada combinação de critérios
+    model = VehicleTableModel(asynchronous=False)
+    for criteria in FILTER_CRITERIA:
+        model.set_filters(criteria=criteria)
+        model.fetchMore()
+
+
+@benchmark("grid.sort_columns", repeat=5)
+def bench_sort_columns(context):
+    # Clique em cada cabeçalho (ORDER BY no SQLite, ver VehicleTableModel.sort) e leitura do primeiro bloco
+    model = VehicleTableModel(asynchronous=False)
+    model.set_filters(show_sold=False, show_stock=True)
+    for column in range(1, model.columnCount()):
+        model.sort(column, Qt.SortOrder.DescendingOrder)
+        model.fetchMore()
+
+
+# --- Escrita ---
+
+@benchmark("insert.single", repeat=50)
+def bench_insert_single(context):
+    record = context.generator.record()
+    repository().add_expense_to_db(*(record[field] for field in VEHICLE_FIELDS))
+    return lambda: context.delete_after(context.max_id)
+
+
+def _generate_bulk_records(context):
+    # Gerar os registos (com o cálculo dos impostos) demora tanto como gravá-los: fica fora da medição
+    context.bulk_records = list(context.generator.records(BULK_ROWS))
+
+
+@benchmark(f"insert.bulk_{BULK_ROWS}", repeat=3, setup=_generate_bulk_records, rows=BULK_ROWS,
+           min_rows_per_s=BULK_MIN_ROWS_PER_S)
+def bench_insert_bulk(context):
+    # Mesmo caminho que a importação de um ficheiro (importer.import_file)
+    repository().add_expenses_bulk(context.bulk_records)
+    return lambda: context.delete_after(context.max_id)
+
+
+# --- Diálogo de edição e autocompletar ---
+
+@benchmark("fetch_vehicle_by_id", repeat=200)
+def bench_fetch_by_id(context):
+    repository().fetch_vehicle_by_id(context.random_id())
+
+
+@benchmark("completer.load_indexes", repeat=5)
+def bench_completer_load(context):
+    CompletionIndex(repository().fetch_value_counts("marca"))
+    CompletionIndex(repository().fetch_value_counts("matricula"))
+
+
+def _load_plate_index(context):
+    context.plate_index = CompletionIndex(repository().fetch_value_counts("matricula"))
+
+
+@benchmark("completer.prefix_lookup", repeat=5, setup=_load_plate_index)
+def bench_completer_lookup(context):
+    for length in range(1, 6):
+        context.plate_index.complete(context.plate_fragment[:length])
+
+
+# --- Formulário ---
+# A janela principal constrói o formulário uma vez e repõe-no em cada abertura (reset);
+# dialog.create mede o custo de o construir de novo, como era feito em cada clique.
+
+def _show_dialog(dialog):
+    dialog.show()
+    QApplication.processEvents()
+    dialog.hide()
+
+
+@benchmark("dialog.create", repeat=10)
+def bench_dialog_create(context):
+    dialog = AddExpenseDialog(mode="edit", initial_data=repository().fetch_vehicle_by_id(context.random_id()))
+    _show_dialog(dialog)
+    return dialog.deleteLater
+
+
+def _create_dialog(context):
+    context.expense_dialog = AddExpenseDialog()
+    _show_dialog(context.expense_dialog)
+
+
+@benchmark("dialog.open_edit", repeat=20, setup=_create_dialog)
+def bench_dialog_open_edit(context):
+    context.expense_dialog.reset("edit", repository().fetch_vehicle_by_id(context.random_id()))
+    _show_dialog(context.expense_dialog)
+
+
+# --- Impressão ---
+# O antigo print_table construía HTML; o relatório é agora desenhado página a página
+# (report.ReportRenderer), por isso mede-se esse caminho com as primeiras REPORT_ROWS linhas.
+
+@benchmark(f"report.render_{REPORT_ROWS}_rows", repeat=3)
+def bench_report(context):
+    path = os.path.join(tempfile.gettempdir(), "sql_app_benchmark_report.pdf")
+    writer = create_pdf_writer(path)
+    ReportRenderer().render(writer, islice(repository().iter_vehicles(), REPORT_ROWS))
+    return lambda: os.remove(path)
+
+
+# --- Arranque ---
+# main.py num processo novo sobre a base de dados do benchmark, até o primeiro bloco chegar à
+# grelha (SQL_APP_STARTUP_TIMING=exit, ver startup.py). Inclui o arranque do interpretador.
+
+@benchmark("startup.first_rows", repeat=3)
+def bench_startup(context):
+    environment = dict(os.environ, SQL_APP_STARTUP_TIMING="exit", SQL_APP_DATABASE=context.path,
+                       SQL_APP_BACKEND=repository().backend)
+    subprocess.run([sys.executable, MAIN_SCRIPT], env=environment, cwd=os.path.dirname(context.path),
+                   capture_output=True, check=True, timeout=120)
+
+
+# --- Execução ---
+
+def prepare_database(data_dir, rows, backend=None):
+    """Abre (e cria na primeira vez) a base de dados sintética com rows veículos."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"fleet_{rows}.db")
+    if open_repository(path, backend) is None:
+        raise RuntimeError(f"Não foi possível abrir '{path}'")
+    existing = vehicle_count()
+    if existing != rows:
+        if existing:
+            raise RuntimeError(f"'{path}' tem {existing} veículos em vez de {rows}; apague o ficheiro.")
+        print(f"A gerar {rows} veículos em {path}...")
+        fill_database(rows)
+        repository().execute_sql("ANALYZE")
+    return path
+
+
+def run_benchmarks(rows, path, names=None):
+    context = BenchmarkContext(rows, path)
+    results = {}
+    for name, fn, repeat, setup, written, min_rows_per_s in _BENCHMARKS:
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        if setup is not None:
+            setup(context)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cleanup = fn(context)
+            timings.append((time.perf_counter() - start) * 1000)
+            if cleanup is not None:
+                cleanup()
+        results[name] = {
+            "runs": repeat,
+            "min_ms": round(min(timings), 3),
+            "median_ms": round(statistics.median(timings), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+        }
+        throughput = flag = ""
+        if written and results[name]["median_ms"]:
+            results[name]["rows_per_s"] = round(written / results[name]["median_ms"] * 1000)
+            throughput = f", {results[name]['rows_per_s']} linhas/s"
+            if min_rows_per_s:
+                results[name]["below_target"] = results[name]["rows_per_s"] < min_rows_per_s
+                flag = f"  <-- abaixo de {min_rows_per_s} linhas/s" if results[name]["below_target"] else ""
+        print(f"  {name:<36} {results[name]['median_ms']:10.2f} ms (mediana de {repeat}{throughput}){flag}")
+    return results
+
+
+def _git_commit():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Mostra a razão entre as medianas atuais e as de baseline. Devolve o número de regressões."""
+    regressions = 0
+    for size, results in current["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size, {})
+        print(f"Comparação com {baseline.get('commit') or 'anterior'} ({size} veículos):")
+        for name, result in results.items():
+            if name not in previous or not previous[name]["median_ms"]:
+                continue
+            ratio = result["median_ms"] / previous[name]["median_ms"]
+            flag = "  <-- mais lento" if ratio > threshold else ""
+            regressions += bool(flag)
+            print(f"  {name:<36} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da aplicação (sem janelas).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="tamanhos da frota")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="pasta das bases de dados geradas")
+    parser.add_argument("--output", help="ficheiro JSON com os resultados")
+    parser.add_argument("--only", nargs="+", help="só os benchmarks com estes prefixos (ex.: search insert)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--backend", choices=BACKENDS, default="qtsql", help="acesso à base de dados")
+    args = parser.parse_args(argv)
+
+    application = QApplication(sys.argv[:1])
+    application.setStyleSheet(APP_STYLESHEET)
+    report = {
+        "commit": _git_commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "qt": QT_VERSION_STR,
+        "pyqt": PYQT_VERSION_STR,
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "sizes": {},
+    }
+    for rows in args.sizes:
+        path = prepare_database(args.data_dir, rows, args.backend)
+        print(f"{rows} veículos ({path}):")
+        report["sizes"][str(rows)] = run_benchmarks(rows, path, args.only)
+        close_repository()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Resultados gravados em {args.output}")
+
+    regressions = sum(result.get("below_target", False)
+                      for results in report["sizes"].values() for result in results.values())
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions += compare(json.load(handle), report)
+    del application
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
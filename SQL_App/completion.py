@@ -0,0 +1,165 @@
+# completion.py
+
+from bisect import bisect_left, insort
+from itertools import islice
+
+from PyQt6.QtCore import QObject, QStringListModel, Qt, pyqtSignal
+from PyQt6.QtWidgets import QCompleter
+
+from async_db import database_executor
+from queries import COMPLETION_FIELDS
+from repository import repository
+
+COMPLETION_LIMIT = 20  # Sugestões mostradas no autocompletar
+
+
+def _sort_key(value):
+    return value.casefold(), value
+
+
+def read_completion_counts():
+    return {field: repository().fetch_value_counts(field) for field in COMPLETION_FIELDS}
+
+
+class CompletionIndex:
+    """Valores distintos de um campo, ordenados sem distinguir maiúsculas (como COLLATE NOCASE).
+
+    Guarda também quantos veículos usam cada valor: um valor só sai do índice quando o
+    último veículo que o usa é alterado ou apagado.
+    """
+
+    def __init__(self, counts=()):
+        self._counts = dict(counts)  # valor -> nº de veículos
+        self._keys = sorted(_sort_key(value) for value in self._counts)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, value):
+        if not value:
+            return
+        if value in self._counts:
+            self._counts[value] += 1
+        else:
+            self._counts[value] = 1
+            insort(self._keys, _sort_key(value))
+
+    def remove(self, value):
+        count = self._counts.get(value)
+        if not count:
+            return
+        if count > 1:
+            self._counts[value] = count - 1
+            return
+        del self._counts[value]
+        del self._keys[bisect_left(self._keys, _sort_key(value))]
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """Devolve até limit valores que começam por prefix, por ordem alfabética."""
+        prefix = prefix.casefold()
+        start = bisect_left(self._keys, (prefix,))
+        matches = []
+        for folded, value in islice(self._keys, start, start + limit):
+            if not folded.startswith(prefix):
+                break
+            matches.append(value)
+        return matches
+
+
+class CompletionService(QObject):
+    """Índices de autocompletar partilhados por todos os diálogos (um por campo de COMPLETION_FIELDS).
+
+    Os índices são lidos da base de dados uma vez, em segundo plano, e depois mantidos com
+    record_changed a cada gravação ou remoção. reload() volta a lê-los (ex.: depois de importar).
+    """
+
+    loaded = pyqtSignal()
+
+    def __init__(self, asynchronous=True, parent=None):
+        super().__init__(parent)
+        self.asynchronous = asynchronous
+        self.indexes = {field: CompletionIndex() for field in COMPLETION_FIELDS}
+        self._loading = False
+        self._stale = False
+        self.reload()
+
+    def reload(self):
+        if self._loading:
+            # A leitura em curso pode já não incluir a última alteração: repete-se quando acabar
+            self._stale = True
+            return
+        if not self.asynchronous:
+            self._set_counts(read_completion_counts())
+            return
+        self._loading = True
+        database_executor().submit(read_completion_counts, on_result=self._set_counts,
+                                   on_error=self._load_failed)
+
+    def _set_counts(self, counts):
+        self._loading = False
+        if self._stale:
+            self._stale = False
+            self.reload()
+            return
+        self.indexes = {field: CompletionIndex(counts[field]) for field in COMPLETION_FIELDS}
+        self.loaded.emit()
+
+    def _load_failed(self, message):
+        self._loading = False
+        print(f"Erro ao ler os valores do autocompletar: {message}")
+
+    def record_changed(self, old=None, new=None):
+        """Atualiza os índices depois de gravar (old=None ao inserir) ou apagar (new=None) um veículo.
+
+        old/new são dicionários com pelo menos os campos de COMPLETION_FIELDS.
+        """
+        if self._loading:
+            self._stale = True
+            return
+        for field, index in self.indexes.items():
+            old_value = str(old.get(field) or "") if old else ""
+            new_value = str(new.get(field) or "") if new else ""
+            if old_value != new_value:
+                index.remove(old_value)
+                index.add(new_value)
+
+    def complete(self, field, prefix, limit=COMPLETION_LIMIT):
+        return self.indexes[field].complete(prefix, limit)
+
+
+_service = None
+
+
+def completion_service():
+    """Serviço partilhado pela aplicação (os índices são lidos na primeira utilização)."""
+    global _service
+    if _service is None:
+        _service = CompletionService()
+    return _service
+
+
+class PrefixCompleter(QCompleter):
+    """Autocompletar de um QLineEdit servido por CompletionService.
+
+    O modelo só contém as primeiras correspondências do texto escrito (COMPLETION_LIMIT),
+    calculadas no índice em memória a cada tecla; a tabela não volta a ser lida.
+    """
+
+    def __init__(self, line_edit, field, service=None, limit=COMPLETION_LIMIT):
+        super().__init__(line_edit)
+        self.service = service if service is not None else completion_service()
+        self.field = field
+        self.limit = limit
+        self.setModel(QStringListModel(self))
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        line_edit.setCompleter(self)
+        line_edit.textEdited.connect(self.update_matches)
+
+    def update_matches(self, text):
+        matches = self.service.complete(self.field, text, self.limit) if text else []
+        self.model().setStringList(matches)
+        if matches:
+            self.complete()
+        else:
+            self.popup().hide()
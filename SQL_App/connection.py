@@ -0,0 +1,134 @@
+# connection.py
+
+import itertools
+import threading
+
+from PyQt6.QtSql import QSqlDatabase, QSqlQuery
+
+from migrations import apply_migrations
+from queries import DEFAULT_PRAGMAS, OPTIMIZE_SQL  # Perfil de PRAGMAs comum aos dois backends
+
+# A aplicação usa a ligação por omissão do Qt, partilhada por todos os QSqlQuery()
+# de database.py. É aberta uma única vez no arranque (main.py).
+DEFAULT_CONNECTION = "qt_sql_default_connection"
+
+
+def open_database(db_name, pragmas=None):
+    """Abre a base de dados (se ainda não estiver aberta) e aplica as migrações pendentes.
+
+    Chamadas repetidas com o mesmo ficheiro reutilizam a ligação existente. pragmas
+    substitui entradas de DEFAULT_PRAGMAS (um valor None desativa essa entrada).
+    """
+    if QSqlDatabase.contains():
+        if _is_open(db_name):
+            return True
+        close_database()
+
+    database = QSqlDatabase.addDatabase("QSQLITE")
+    database.setDatabaseName(db_name)
+    if not database.open():
+        print(f"Erro ao abrir a base de dados: {database.lastError().text()}")
+        return False
+
+    profile = dict(DEFAULT_PRAGMAS)
+    profile.update(pragmas or {})
+    apply_pragmas(database, profile)
+
+    if not apply_migrations(database):
+        database.close()
+        return False
+    return True
+
+
+def apply_pragmas(database, pragmas):
+    """Aplica um perfil de PRAGMAs. Erros são apenas registados: a ligação continua utilizável."""
+    for name, value in pragmas.items():
+        if value is None:
+            continue
+        query = QSqlQuery(database)
+        if not query.exec(f"PRAGMA {name} = {value}"):
+            print(f"Erro ao aplicar PRAGMA {name}: {query.lastError().text()}")
+
+
+def read_pragmas(names=None, database=None):
+    """Lê os valores em vigor (por omissão, os do perfil DEFAULT_PRAGMAS)."""
+    database = database if database is not None else get_database()
+    settings = {}
+    for name in names or DEFAULT_PRAGMAS:
+        query = QSqlQuery(f"PRAGMA {name}", database)
+        settings[name] = query.value(0) if query.next() else None
+    return settings
+
+
+def _is_open(db_name):
+    # Função separada para que a referência à ligação não fique viva em open_database
+    database = QSqlDatabase.database(DEFAULT_CONNECTION, False)
+    return database.isOpen() and database.databaseName() == db_name
+
+
+# Ligações das threads de trabalho (async_db): um QSqlDatabase só pode ser usado
+# na thread que o criou, por isso cada thread clona a ligação principal.
+_thread_connections = threading.local()
+_thread_connection_names = set()
+_thread_connection_lock = threading.Lock()
+_thread_connection_ids = itertools.count(1)
+
+
+def get_database():
+    """Devolve a ligação da thread atual.
+
+    Na thread principal é a ligação partilhada (aberta por open_database); nas
+    restantes é uma cópia própria, aberta na primeira utilização.
+    """
+    if threading.current_thread() is threading.main_thread():
+        return QSqlDatabase.database()
+
+    name = getattr(_thread_connections, "name", None)
+    if name is None:
+        with _thread_connection_lock:
+            name = f"worker_{next(_thread_connection_ids)}"
+            _thread_connection_names.add(name)
+        database = QSqlDatabase.cloneDatabase(DEFAULT_CONNECTION, name)
+        if not database.open():
+            print(f"Erro ao abrir a ligação da thread: {database.lastError().text()}")
+        else:
+            # journal_mode fica gravado no ficheiro; os restantes PRAGMAs são por ligação
+            apply_pragmas(database, {key: value for key, value in DEFAULT_PRAGMAS.items()
+                                     if key != "journal_mode"})
+        _thread_connections.name = name
+        return database
+    return QSqlDatabase.database(name)
+
+
+def close_thread_database():
+    """Fecha a ligação da thread atual, se tiver uma (threads de curta duração, ex.: relatórios)."""
+    name = getattr(_thread_connections, "name", None)
+    if name is None:
+        return
+    del _thread_connections.name
+    with _thread_connection_lock:
+        _thread_connection_names.discard(name)
+    QSqlDatabase.removeDatabase(name)
+
+
+def close_thread_databases():
+    """Fecha as ligações criadas pelas threads de trabalho (depois de o pool terminar)."""
+    with _thread_connection_lock:
+        names = list(_thread_connection_names)
+        _thread_connection_names.clear()
+    for name in names:
+        # Sem QSqlDatabase.database(name): o Qt recusa devolver ligações de outra thread.
+        # Remover a ligação fecha-a.
+        QSqlDatabase.removeDatabase(name)
+
+
+def close_database():
+    if not QSqlDatabase.contains():
+        return
+    close_thread_databases()
+    database = QSqlDatabase.database()
+    if database.isOpen():
+        QSqlQuery(OPTIMIZE_SQL, database).finish()
+    database.close()
+    del database  # O Qt só remove a ligação quando não houver referências a ela
+    QSqlDatabase.removeDatabase(DEFAULT_CONNECTION)
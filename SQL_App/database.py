@@ -1,199 +1,423 @@
 # database.py
+#
+# Backend QtSql do repositório de veículos (ver repository.py): usa a ligação por omissão do Qt
+# (connection.py). O SQL é partilhado com o backend sqlite3 (queries.py).
 
-from PyQt6.QtSql import QSqlDatabase, QSqlQuery, QSqlError
+from operator import itemgetter
+
+from PyQt6.QtSql import QSqlQuery
+
+from connection import open_database, get_database
+from instrumentation import note_query, timed
+from migrations import SEARCH_COLUMNS
+from queries import (
+    BULK_BATCH_SIZE, BULK_INSERT_SQL, BULK_TRIGGERS_SQL, COMPLETION_FIELDS, DELETE_VEHICLE_SQL, EXPORT_CHUNK_SIZE,
+    EXPORT_FIELDS, FILTER_KEYS, GRID_FIELDS, INDEX_NEW_ROWS_SQL, INSERT_VEHICLE_SQL, INVALID_NEW_ROWS_SQL,
+    LAST_ID_SQL, MONTHLY_SUMMARY_FIELDS, PAGE_SIZE, SUMMARY_NEW_ROWS_SQL, TAX_CHUNK_SIZE, TAX_FIELDS, TAX_ROWS_SQL,
+    UPDATE_TAX_SQL, UPDATE_VEHICLE_SQL, VEHICLE_BY_ID_SQL, VEHICLE_FIELDS, expense_row_sql, monthly_summary_sql,
+    page_key, page_sql, search_sql, search_text_of, unique_values_sql, value_counts_sql
+)
+
+# Extrai os valores de um registo pela ordem de VEHICLE_FIELDS (todas as chaves são obrigatórias)
+_record_values = itemgetter(*VEHICLE_FIELDS)
+
+_GRID_COLUMNS = len(GRID_FIELDS)
+
+
+def _prepare(database, sql, values=None, forward_only=False):
+    query = QSqlQuery(database)
+    query.setForwardOnly(forward_only)
+    query.prepare(sql)
+    for key, value in (values or {}).items():
+        query.bindValue(f":{key}", value)
+    return query
+
+
+def _exec(query, sql=None):
+    """Executa a consulta e regista o SQL na chamada medida em curso (ver instrumentation.py)."""
+    ok = query.exec() if sql is None else query.exec(sql)
+    note_query(query.lastQuery(), ok)
+    return ok
+
+
+def _exec_batch(query):
+    ok = query.execBatch()
+    note_query(query.lastQuery(), ok)
+    return ok
+
+
+def _grid_row(query):
+    return [query.value(i) for i in range(_GRID_COLUMNS - 1)] + [bool(query.value(_GRID_COLUMNS - 1))]
 
 
 def init_db(db_name):
-    database = QSqlDatabase.addDatabase("QSQLITE")
-    database.setDatabaseName(db_name)
-    if not database.open():
-        print(f"Erro ao abrir a base de dados: {database.lastError().text()}")
-        return False
-
-    query = QSqlQuery()
-    # CERTIFIQUE-SE QUE ESTA ESTRUTURA DA TABELA TEM 'valorBase REAL'
-    query.exec("""
-        CREATE TABLE IF NOT EXISTS vehicles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            matricula TEXT,
-            marca TEXT,
-            numeroQuadro TEXT,  -- NOVO CAMPO: NUMERO DE QUADRO
-            isv REAL,
-            nRegistoContabilidade TEXT,
-            dataCompra TEXT,
-            docCompra TEXT,
-            tipoDocumento TEXT,
-            valorCompra REAL,
-            dataVenda TEXT,
-            docVenda TEXT,
-            valorVenda REAL,
-            imposto REAL,
-            valorBase REAL,  -- COLUNA 'valorBase' AQUI
-            taxa REAL,
-            regime_fiscal TEXT
-        )
-    """)
-    if query.lastError().isValid():
-        print(f"Erro na criação da tabela: {query.lastError().text()}")
-        return False
-    return True
+    """Abre a ligação partilhada e atualiza o esquema (ver connection.py/migrations.py)."""
+    return open_database(db_name)
 
 
+@timed()
 def update_expense_in_db(id, data: dict):
-    query = QSqlQuery()
-    query.prepare("""
-        UPDATE vehicles SET
-            matricula = :matricula,
-            marca = :marca,
-            numeroQuadro = :numeroQuadro,
-            isv = :isv,
-            nRegistoContabilidade = :nRegistoContabilidade,
-            dataCompra = :dataCompra,
-            docCompra = :docCompra,
-            tipoDocumento = :tipoDocumento,
-            valorCompra = :valorCompra,
-            dataVenda = :dataVenda,
-            docVenda = :docVenda,
-            valorVenda = :valorVenda,
-            imposto = :imposto,
-            valorBase = :valorBase,
-            taxa = :taxa,
-            regime_fiscal = :regime_fiscal
-        WHERE id = :id
-    """)
-
-    # Certifique-se de que os valores 'None' são tratados como QVariant() nulo
-    for key, value in data.items():
-        if value is None:
-            query.bindValue(f":{key}", None)  # QVariant() para NULL
-        else:
-            query.bindValue(f":{key}", value)
+    """Atualiza um veículo. Devolve o id atualizado, ou None em caso de erro."""
+    # Os valores None são gravados como NULL
+    query = _prepare(get_database(), UPDATE_VEHICLE_SQL, data)
     query.bindValue(":id", id)
 
-    if not query.exec():
+    if not _exec(query):
         print(f"Erro ao atualizar registo: {query.lastError().text()}")
-        return False
-    return True
+        return None
+    return id
 
 
+@timed()
 def add_expense_to_db(matricula, marca, numeroQuadro, isv, nRegistoContabilidade,
                       dataCompra, docCompra, tipoDocumento, valorCompra,
                       dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, regime_fiscal):
-    query = QSqlQuery()
-    query.prepare("""
-        INSERT INTO vehicles (matricula, marca, numeroQuadro, isv, nRegistoContabilidade,
-                              dataCompra, docCompra, tipoDocumento, valorCompra,
-                              dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, regime_fiscal)
-        VALUES (:matricula, :marca, :numeroQuadro, :isv, :nRegistoContabilidade,
-                :dataCompra, :docCompra, :tipoDocumento, :valorCompra,
-                :dataVenda, :docVenda, :valorVenda, :imposto, :valorBase, :taxa, :regime_fiscal)
-    """)
-    query.bindValue(":matricula", matricula)
-    query.bindValue(":marca", marca)
-    query.bindValue(":numeroQuadro", numeroQuadro)
-    query.bindValue(":isv", isv)
-    query.bindValue(":nRegistoContabilidade", nRegistoContabilidade)
-    query.bindValue(":dataCompra", dataCompra)
-    query.bindValue(":docCompra", docCompra)
-    query.bindValue(":tipoDocumento", tipoDocumento)
-    query.bindValue(":valorCompra", valorCompra)
-    query.bindValue(":dataVenda", dataVenda)
-    query.bindValue(":docVenda", docVenda)
-    query.bindValue(":valorVenda", valorVenda)
-    query.bindValue(":imposto", imposto)
-    query.bindValue(":valorBase", valorBase)
-    query.bindValue(":taxa", taxa)
-    query.bindValue(":regime_fiscal", regime_fiscal)
-
-    if not query.exec():
+    """Insere um veículo. Devolve o id do novo registo, ou None em caso de erro."""
+    values = dict(zip(VEHICLE_FIELDS, (matricula, marca, numeroQuadro, isv, nRegistoContabilidade,
+                                       dataCompra, docCompra, tipoDocumento, valorCompra,
+                                       dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, regime_fiscal)))
+    query = _prepare(get_database(), INSERT_VEHICLE_SQL, values)
+
+    if not _exec(query):
         print(f"Erro ao adicionar registo: {query.lastError().text()}")
-        return False
-    return True
+        return None
+    return query.lastInsertId()
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@timed(rows=lambda inserted: inserted or 0)
+def add_expenses_bulk(records, batch_size=BULK_BATCH_SIZE, progress=None):
+    """Insere muitos veículos (dicts com todas as chaves de VEHICLE_FIELDS) em lotes.
+
+    Cada lote é uma transação com a mesma instrução preparada (execBatch). Durante o lote os
+    triggers de inserção (queries.BULK_TRIGGERS) são desligados e o seu trabalho é feito no fim
+    para todas as linhas novas de uma vez: validar as datas e os valores (um lote com linhas
+    inválidas é recusado), indexá-las para a pesquisa e somá-las aos totais mensais. Isto é
+    bastante mais rápido do que linha a linha e acontece dentro da transação do lote, por isso
+    um erro não deixa o índice nem os totais dessincronizados.
 
+    progress(inseridos) é chamado depois de cada lote. Devolve o número de linhas inseridas,
+    ou None se um lote falhar (os lotes anteriores ficam gravados).
+    """
+    database = get_database()
+    insert = QSqlQuery(database)
+    insert.prepare(BULK_INSERT_SQL)
 
+    inserted = 0
+    for batch in _batched(records, batch_size):
+        database.transaction()
+
+        query = QSqlQuery(database)
+        _exec(query, LAST_ID_SQL)
+        last_id = query.value(0) if query.next() else 0
+
+        query = QSqlQuery(database)
+        ok = _exec(query, BULK_TRIGGERS_SQL)
+        triggers = []
+        while ok and query.next():
+            triggers.append((query.value(0), query.value(1)))
+        query.finish()  # Liberta a leitura de sqlite_master antes de alterar o esquema
+        ok = ok and all(_exec(QSqlQuery(database), f"DROP TRIGGER {name}") for name, _ in triggers)
+        if ok:
+            # Transpõe o lote (registos -> colunas), que é o formato pedido por execBatch
+            columns = zip(*map(_record_values, batch))
+            for position, values in enumerate(columns):
+                insert.bindValue(position, list(values))
+            ok = _exec_batch(insert)
+        error = ""
+        if ok:
+            query = _prepare(database, INVALID_NEW_ROWS_SQL, {"last_id": last_id})
+            ok = _exec(query)
+            if ok and query.next():
+                error = (f"há veículos com datas ou valores monetários inválidos "
+                         f"(ex.: matrícula {query.value(0)!r})")
+                ok = False
+            query.finish()
+        if ok:
+            ok = (_exec(_prepare(database, INDEX_NEW_ROWS_SQL, {"last_id": last_id}))
+                  and _exec(_prepare(database, SUMMARY_NEW_ROWS_SQL, {"last_id": last_id}))
+                  and all(_exec(QSqlQuery(database), sql) for _, sql in triggers))
+
+        if not ok:
+            error = error or insert.lastError().text() or database.lastError().text()
+            print(f"Erro na inserção em lote: {error}")
+            database.rollback()
+            return None
+        database.commit()
+
+        inserted += len(batch)
+        if progress is not None:
+            progress(inserted)
+    return inserted
+
+
+@timed()
 def delete_expense_from_db(id):
-    query = QSqlQuery()
-    query.prepare("DELETE FROM vehicles WHERE id = :id")
-    query.bindValue(":id", id)
-    if not query.exec():
+    """Apaga um veículo. Devolve o id apagado, ou None em caso de erro."""
+    query = _prepare(get_database(), DELETE_VEHICLE_SQL, {"id": id})
+    if not _exec(query):
         print(f"Erro ao eliminar registo: {query.lastError().text()}")
-        return False
-    return True
+        return None
+    return id
 
 
-def fetch_expenses():
-    expenses = []
-    # Adicionado dataVenda à query
-    query = QSqlQuery(
-        "SELECT id, matricula, marca, valorCompra, docVenda, valorVenda, imposto, valorBase, dataVenda FROM vehicles")
-    if not query.exec():
+@timed(rows=lambda page: len(page[0]))
+def fetch_expenses_page(after_key=None, limit=PAGE_SIZE, order_by="id", filters=None):
+    """Lê uma página de linhas da grelha por paginação por chave.
+
+    order_by: "id" ou um campo de ORDER_EXPRESSIONS, com "-" à frente para ordem descendente.
+    filters: {"sold": True/False/None, "search_text": texto} e os critérios do painel de filtros
+    (queries.CRITERIA); sold como em fetch_expenses e search_text com as regras de
+    search_vehicles (mas sem ordenar por relevância).
+    after_key é a chave devolvida pela página anterior (None para a primeira página).
+    Devolve (linhas, chave da página seguinte), com chave None quando não há mais linhas.
+    """
+    sql, values, keyed = page_sql(GRID_FIELDS, after_key, limit, order_by, filters)
+    query = _prepare(get_database(), sql, values, forward_only=True)
+    if not _exec(query):
         print(f"Erro ao buscar despesas: {query.lastError().text()}")
-        return expenses
+        return [], None
 
+    rows = []
+    sort_value = None
     while query.next():
-        expenses.append([
-            query.value(0),  # id
-            query.value(1),  # matricula
-            query.value(2),  # marca
-            query.value(3),  # valorCompra
-            query.value(4),  # docVenda
-            query.value(5),  # valorVenda
-            query.value(6),  # imposto
-            query.value(7),  # valorBase
-            query.value(8)  # dataVenda (Novo: para lógica de vendido)
-        ])
-    return expenses
+        rows.append(_grid_row(query))
+        sort_value = query.value(_GRID_COLUMNS)
+    return rows, page_key(rows, sort_value, limit, keyed)
+
+
+@timed()
+def fetch_expenses(after_id=None, limit=None, sold=None):
+    """Devolve as linhas da grelha ordenadas por id.
+
+    Com after_id/limit lê apenas um bloco (paginação por chave), usado pelo modelo da tabela.
+    sold=True devolve só os vendidos, sold=False só os que estão em stock e None todos.
+    """
+    after_key = (after_id,) if after_id is not None else None
+    rows, _ = fetch_expenses_page(after_key, limit, filters={"sold": sold})
+    return rows
+
+
+@timed()
+def fetch_expense_row(vehicle_id, sold=None, search_text="", criteria=None):
+    """Devolve a linha da grelha (formato de fetch_expenses) de um só veículo.
+
+    Devolve None se o veículo não existir ou não passar nos filtros indicados, que têm o
+    mesmo significado que em fetch_expenses/search_vehicles.
+    """
+    sql, values = expense_row_sql(sold, search_text, criteria)
+    values["id"] = vehicle_id
+    query = _prepare(get_database(), sql, values)
+
+    if not _exec(query):
+        print(f"Erro ao buscar linha do veículo: {query.lastError().text()}")
+        return None
+
+    if query.next():
+        return _grid_row(query)
+    return None
 
 
+@timed()
 def fetch_vehicle_by_id(vehicle_id):
-    query = QSqlQuery()
-    query.prepare("SELECT id, matricula, marca, numeroQuadro, isv, nRegistoContabilidade, dataCompra, docCompra, "
-                  "tipoDocumento, valorCompra, dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, "
-                  "regime_fiscal FROM vehicles WHERE id = :id")
-    query.bindValue(":id", vehicle_id)
+    query = _prepare(get_database(), VEHICLE_BY_ID_SQL, {"id": vehicle_id})
 
-    if not query.exec():
+    if not _exec(query):
         print(f"Erro ao buscar veículo por ID: {query.lastError().text()}")
         return None
 
     if query.next():
-        return {
-            "id": query.value(0),
-            "matricula": query.value(1),
-            "marca": query.value(2),
-            "numeroQuadro": query.value(3),
-            "isv": query.value(4),
-            "nRegistoContabilidade": query.value(5),
-            "dataCompra": query.value(6),
-            "docCompra": query.value(7),
-            "tipoDocumento": query.value(8),
-            "valorCompra": query.value(9),
-            "dataVenda": query.value(10),
-            "docVenda": query.value(11),
-            "valorVenda": query.value(12),
-            "imposto": query.value(13),
-            "valorBase": query.value(14),
-            "taxa": query.value(15),
-            "regime_fiscal": query.value(16)
-        }
+        return {field: query.value(i) for i, field in enumerate(EXPORT_FIELDS)}
     return None
 
 
-def fetch_unique_marcas():
-    query = QSqlQuery("SELECT DISTINCT marca FROM vehicles ORDER BY marca COLLATE NOCASE")
-    marcas = []
+def _unique_values(field):
+    query = QSqlQuery(get_database())
+    _exec(query, unique_values_sql(field))
+    values = []
     while query.next():
-        marca = query.value(0)
-        if marca:
-            marcas.append(str(marca))
-    return marcas
+        value = query.value(0)
+        if value:
+            values.append(str(value))
+    return values
+
 
+@timed()
+def fetch_unique_marcas():
+    return _unique_values("marca")
 
+
+@timed()
 def fetch_unique_matriculas():
-    query = QSqlQuery("SELECT DISTINCT matricula FROM vehicles ORDER BY matricula COLLATE NOCASE")
-    matriculas = []
+    return _unique_values("matricula")
+
+
+@timed()
+def fetch_value_counts(field):
+    """Devolve [(valor, nº de veículos)] para os valores não vazios de um campo de COMPLETION_FIELDS."""
+    query = QSqlQuery(get_database())
+    _exec(query, value_counts_sql(field))
+    counts = []
+    while query.next():
+        counts.append((str(query.value(0)), query.value(1)))
+    return counts
+
+
+@timed()
+def search_vehicles(search_text, limit=100, offset=0, sold=None, with_search_text=False, criteria=None):
+    """Pesquisa veículos no índice FTS5 e devolve as linhas da grelha por ordem de relevância.
+
+    As linhas têm o mesmo formato que as de fetch_expenses. sold filtra como em fetch_expenses
+    e criteria como os critérios de fetch_expenses_page.
+    Com with_search_text=True cada linha leva mais um elemento: o texto dos campos indexados,
+    em minúsculas e separados por '\n' (usado por search_cache para filtrar sem a base de dados).
+    """
+    results = []
+    search = search_sql(search_text, limit, offset, sold, with_search_text, criteria)
+    if search is None:
+        return results
+    query = _prepare(get_database(), *search)
+
+    if not _exec(query):
+        print(f"Erro ao pesquisar veículos: {query.lastError().text()}")
+        return results
+
+    text_columns = range(_GRID_COLUMNS, _GRID_COLUMNS + len(SEARCH_COLUMNS)) if with_search_text else ()
+    while query.next():
+        row = _grid_row(query)
+        if with_search_text:
+            row.append(search_text_of(query.value(i) for i in text_columns))
+        results.append(row)
+    return results
+
+
+@timed()
+def iter_vehicles(sold=None, search_text="", chunk_size=EXPORT_CHUNK_SIZE, database=None, order_by="id",
+                  criteria=None):
+    """Percorre a tabela 'vehicles' por blocos e devolve cada veículo como um tuplo (EXPORT_FIELDS).
+
+    Só um bloco de cada vez está em memória, seja qual for o tamanho da tabela. Os filtros
+    e order_by têm o mesmo significado que em fetch_expenses_page.
+    database permite usar outra ligação (por omissão, a da thread atual).
+    """
+    database = database if database is not None else get_database()
+    filters = {"sold": sold, "search_text": search_text, **(criteria or {})}
+    column_count = len(EXPORT_FIELDS)
+
+    after_key = None
+    while True:
+        sql, values, keyed = page_sql(EXPORT_FIELDS, after_key, chunk_size, order_by, filters)
+        query = _prepare(database, sql, values, forward_only=True)
+        if not _exec(query):
+            print(f"Erro ao exportar veículos: {query.lastError().text()}")
+            return
+
+        count = 0
+        while query.next():
+            count += 1
+            # isNull: para colunas NULL o Qt devolve '' em vez de None
+            row = tuple(None if query.isNull(i) else query.value(i) for i in range(column_count))
+            sort_value = query.value(column_count)
+            yield row
+        query.finish()
+
+        if count < chunk_size:
+            return
+        after_key = (sort_value, row[0]) if keyed else (row[0],)
+
+
+@timed(rows=len)
+def iter_tax_rows(chunk_size=TAX_CHUNK_SIZE, database=None):
+    """Percorre a tabela por blocos de até chunk_size veículos, ordenados por id.
+
+    Cada bloco é uma lista de tuplos com os valores de TAX_FIELDS.
+    """
+    query = _prepare(database if database is not None else get_database(), TAX_ROWS_SQL, forward_only=True)
+    column_count = len(TAX_FIELDS)
+
+    after_id = 0
+    while True:
+        query.bindValue(":after_id", after_id)
+        query.bindValue(":limit", chunk_size)
+        if not _exec(query):
+            print(f"Erro ao ler os impostos: {query.lastError().text()}")
+            return
+
+        chunk = []
+        while query.next():
+            # isNull: para colunas NULL o Qt devolve '' em vez de None
+            chunk.append(tuple(None if query.isNull(i) else query.value(i) for i in range(column_count)))
+        query.finish()
+
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after_id = chunk[-1][0]
+
+
+@timed(rows=lambda updated: updated or 0)
+def update_tax_values(values, database=None):
+    """Grava valorBase e imposto de vários veículos ([(id, valorBase, imposto)]) numa só transação.
+
+    Devolve o número de veículos atualizados, ou None em caso de erro (nada é gravado).
+    """
+    if not values:
+        return 0
+    database = database if database is not None else get_database()
+    query = QSqlQuery(database)
+    query.prepare(UPDATE_TAX_SQL)
+    ids, bases, impostos = zip(*values)
+    query.bindValue(0, list(bases))
+    query.bindValue(1, list(impostos))
+    query.bindValue(2, list(ids))
+
+    database.transaction()
+    if not _exec_batch(query):
+        print(f"Erro ao atualizar os impostos: {query.lastError().text()}")
+        database.rollback()
+        return None
+    database.commit()
+    return len(values)
+
+
+@timed()
+def fetch_monthly_summary(first_month=None, last_month=None):
+    """Totais das vendas por mês ('AAAA-MM'), regime fiscal e taxa, entre dois meses (inclusive).
+
+    Lê a tabela 'monthly_summary' (mantida por triggers), não a tabela 'vehicles'. Devolve tuplos
+    com os valores de MONTHLY_SUMMARY_FIELDS, por ordem de mês; None em caso de erro.
+    """
+    query = _prepare(get_database(), *monthly_summary_sql(first_month, last_month))
+    if not _exec(query):
+        print(f"Erro ao ler o resumo mensal: {query.lastError().text()}")
+        return None
+
+    column_count = len(MONTHLY_SUMMARY_FIELDS)
+    rows = []
+    while query.next():
+        rows.append(tuple(query.value(i) for i in range(column_count)))
+    return rows
+
+
+@timed()
+def execute_sql(sql, values=None):
+    """Executa uma instrução avulsa (ferramentas e benchmarks) e devolve as linhas (tuplos), ou None."""
+    query = _prepare(get_database(), sql, values)
+    if not _exec(query):
+        print(f"Erro ao executar SQL: {query.lastError().text()}")
+        return None
+    rows = []
     while query.next():
-        matricula = query.value(0)
-        if matricula:
-            matriculas.append(str(matricula))
-    return matriculas
+        rows.append(tuple(None if query.isNull(i) else query.value(i) for i in range(query.record().count())))
+    return rows
@@ -0,0 +1,96 @@
+# diagnostics_view.py
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtWidgets import (
+    QAbstractItemView, QDialog, QDoubleSpinBox, QHBoxLayout, QHeaderView, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QVBoxLayout
+)
+
+import instrumentation
+from instrumentation import configure_slow_query_log, query_stats
+from startup import marks
+
+DIAGNOSTICS_HEADERS = ["Operação", "Chamadas", "p50 (ms)", "p95 (ms)", "Máx. (ms)", "Linhas (média)",
+                       "Lentas", "Erros"]
+REFRESH_INTERVAL_MS = 1000
+
+
+class DiagnosticsDialog(QDialog):
+    """Latências das operações da base de dados (ver instrumentation.py), atualizadas a cada segundo.
+
+    O SQL da última chamada de cada operação aparece na dica da linha; por baixo da tabela ficam
+    os tempos do arranque da aplicação (ver startup.py).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnóstico da Base de Dados")
+        self.resize(900, 450)
+
+        self.threshold_input = QDoubleSpinBox()
+        self.threshold_input.setRange(1, 60000)
+        self.threshold_input.setDecimals(0)
+        self.threshold_input.setSuffix(" ms")
+        self.threshold_input.setValue(instrumentation.SLOW_QUERY_MS)
+        self.threshold_input.valueChanged.connect(lambda value: configure_slow_query_log(threshold_ms=value))
+        self.reset_button = QPushButton("Limpar")
+        self.reset_button.clicked.connect(self.reset_stats)
+
+        self.table = QTableWidget(0, len(DIAGNOSTICS_HEADERS))
+        self.table.setHorizontalHeaderLabels(DIAGNOSTICS_HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.startup_label = QLabel()
+        self.startup_label.setWordWrap(True)
+
+        options_layout = QHBoxLayout()
+        options_layout.addWidget(QLabel("Consultas lentas a partir de:"))
+        options_layout.addWidget(self.threshold_input)
+        options_layout.addWidget(QLabel(f"(registadas em {instrumentation.SLOW_QUERY_LOG})"))
+        options_layout.addStretch(1)
+        options_layout.addWidget(self.reset_button)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(options_layout)
+        layout.addWidget(self.table)
+        layout.addWidget(self.startup_label)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def reset_stats(self):
+        query_stats.reset()
+        self.refresh()
+
+    def refresh(self):
+        startup_marks = marks()
+        self.startup_label.setVisible(bool(startup_marks))
+        self.startup_label.setText("Arranque: " + ", ".join(f"{label} {elapsed:.0f} ms"
+                                                            for label, elapsed in startup_marks))
+
+        snapshot = query_stats.snapshot()
+        self.table.setRowCount(len(snapshot))
+        for row, (operation, stats) in enumerate(snapshot.items()):
+            texts = [operation, str(stats["count"]), f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}",
+                     f"{stats['max_ms']:.1f}", f"{stats['mean_rows']:.0f}", str(stats["slow"]),
+                     str(stats["errors"])]
+            for column, text in enumerate(texts):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                item.setToolTip(stats["last_sql"])
+                self.table.setItem(row, column, item)
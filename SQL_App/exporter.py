@@ -0,0 +1,131 @@
+# exporter.py
+
+import csv
+import os
+from decimal import Decimal
+
+from money import MONEY_FIELDS, to_euros
+from queries import EXPORT_FIELDS, EXPORT_CHUNK_SIZE
+from repository import repository
+
+# Cabeçalhos das colunas exportadas (os mesmos nomes que o importador reconhece)
+EXPORT_HEADERS = [
+    "ID", "Matrícula", "Marca", "Nº Quadro", "ISV",
+    "Nº Registo Contabilidade", "Data Compra", "Documento Compra",
+    "Tipo Documento", "Valor Compra", "Data Venda", "Documento Venda",
+    "Valor Venda", "Imposto", "Valor Base", "Taxa", "Regime Fiscal"
+]
+
+NUMERIC_FIELDS = {"isv", "valorCompra", "valorVenda", "imposto", "valorBase", "taxa"}
+_NUMERIC_POSITIONS = [i for i, field in enumerate(EXPORT_FIELDS) if field in NUMERIC_FIELDS]
+_MONEY_POSITIONS = [i for i, field in enumerate(EXPORT_FIELDS) if field in MONEY_FIELDS]
+
+
+def _in_euros(row):
+    """Linha da base de dados com os valores monetários em euros (Decimal exato), como são exportados."""
+    row = list(row)
+    for i in _MONEY_POSITIONS:
+        row[i] = to_euros(row[i])
+    return row
+
+
+def _csv_value(value):
+    if isinstance(value, (float, Decimal)):
+        return str(value).replace(".", ",")  # Vírgula decimal, como o Excel em pt-PT espera
+    return "" if value is None else value
+
+
+def export_csv(path, rows, progress=None):
+    with open(path, "w", newline="", encoding="utf-8-sig") as handle:
+        writer = csv.writer(handle, delimiter=";")
+        writer.writerow(EXPORT_HEADERS)
+        count = 0
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+            count += 1
+            if progress is not None and count % EXPORT_CHUNK_SIZE == 0:
+                progress(count)
+    return count
+
+
+def export_xlsx(path, rows, progress=None):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("A exportação para .xlsx requer o pacote 'openpyxl'.")
+
+    # write_only: as linhas são escritas diretamente para o ficheiro, sem ficarem em memória
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Veículos")
+    sheet.append(EXPORT_HEADERS)
+    count = 0
+    for row in rows:
+        sheet.append(list(row))
+        count += 1
+        if progress is not None and count % EXPORT_CHUNK_SIZE == 0:
+            progress(count)
+    workbook.save(path)
+    return count
+
+
+def export_parquet(path, rows, progress=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("A exportação para .parquet requer o pacote 'pyarrow'.")
+
+    def field_type(field):
+        if field == "id":
+            return pa.int64()
+        if field in MONEY_FIELDS:
+            return pa.decimal128(18, 2)  # Euros com cêntimos exatos
+        return pa.float64() if field in NUMERIC_FIELDS else pa.string()
+
+    schema = pa.schema([(field, field_type(field)) for field in EXPORT_FIELDS])
+
+    def write_chunk(writer, chunk):
+        columns = list(zip(*chunk))
+        for i in _NUMERIC_POSITIONS:
+            # Bases de dados antigas podem ter texto em colunas numéricas
+            columns[i] = [value if isinstance(value, (int, float, Decimal)) or value is None else None
+                          for value in columns[i]]
+        writer.write_batch(pa.record_batch([pa.array(column, type=schema.field(i).type)
+                                            for i, column in enumerate(columns)], schema=schema))
+
+    count = 0
+    chunk = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                write_chunk(writer, chunk)
+                count += len(chunk)
+                chunk = []
+                if progress is not None:
+                    progress(count)
+        if chunk:
+            write_chunk(writer, chunk)
+            count += len(chunk)
+    return count
+
+
+WRITERS = {
+    ".csv": export_csv,
+    ".xlsx": export_xlsx,
+    ".parquet": export_parquet,
+}
+
+
+def export_vehicles(path, sold=None, search_text="", progress=None, order_by="id", criteria=None):
+    """Exporta os veículos (todas as colunas) para CSV, XLSX ou Parquet, conforme a extensão.
+
+    Os filtros e a ordenação são os mesmos da grelha; os valores monetários são escritos em
+    euros. Devolve o número de linhas escritas.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    writer = WRITERS.get(extension)
+    if writer is None:
+        raise ValueError(f"Formato de exportação não suportado: '{extension}'")
+    rows = repository().iter_vehicles(sold=sold, search_text=search_text, order_by=order_by, criteria=criteria)
+    return writer(path, map(_in_euros, rows), progress=progress)
@@ -0,0 +1,67 @@
+# file_workers.py
+#
+# Importação e exportação de ficheiros fora da thread da interface. importer.py e exporter.py
+# não dependem do Qt (são usados também em linha de comandos); estas threads só os chamam e
+# passam o progresso e o resultado à interface por sinais.
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from repository import repository
+
+
+class ImportWorker(QThread):
+    """Importa um ficheiro CSV/XLSX (importer.import_file) numa thread própria.
+
+    progress(lidas, inseridas) é emitido depois de cada lote gravado e completed com o
+    ImportReport no fim. A ligação à base de dados da thread é fechada quando termina.
+    """
+
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+
+    def run(self):
+        from importer import import_file
+
+        try:
+            self.completed.emit(import_file(self.path, progress=self.progress.emit))
+        except Exception as e:
+            self.failed.emit(str(e) or type(e).__name__)
+        finally:
+            repository().close_thread_connection()
+
+
+class ExportWorker(QThread):
+    """Exporta os veículos filtrados (exporter.export_vehicles) numa thread própria.
+
+    progress(registos) é emitido à medida que as linhas são escritas e completed com o total
+    no fim; erros de ficheiro, de formato ou de dependências em falta chegam por failed.
+    """
+
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, sold=None, search_text="", order_by="id", criteria=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.sold = sold
+        self.search_text = search_text
+        self.order_by = order_by
+        self.criteria = criteria
+
+    def run(self):
+        from exporter import export_vehicles
+
+        try:
+            count = export_vehicles(self.path, sold=self.sold, search_text=self.search_text,
+                                    progress=self.progress.emit, order_by=self.order_by, criteria=self.criteria)
+            self.completed.emit(count)
+        except Exception as e:
+            self.failed.emit(str(e) or type(e).__name__)
+        finally:
+            repository().close_thread_connection()
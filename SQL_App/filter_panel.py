@@ -0,0 +1,129 @@
+# filter_panel.py
+
+from PyQt6.QtCore import QDate, pyqtSignal
+from PyQt6.QtWidgets import (
+    QCheckBox, QComboBox, QDateEdit, QDoubleSpinBox, QGridLayout, QGroupBox, QHBoxLayout, QLabel, QPushButton
+)
+
+from tax import DOCUMENT_TYPES, REGIME_MARGEM, REGIME_NORMAL, TAX_RATES
+
+ANY = "Todos"
+MAX_VALUE = 100_000_000
+_NO_LIMIT = "Sem limite"  # Texto de um valor a 0 (limite não usado)
+
+
+def _iso(date):
+    return date.toString("yyyy-MM-dd")
+
+
+class FilterPanel(QGroupBox):
+    """Filtros avançados da grelha: intervalos das datas e dos valores de compra e de venda,
+    regime fiscal, taxa e tipo de documento.
+
+    criteria() devolve os critérios preenchidos com as chaves de queries.CRITERIA; o SQLite
+    aplica-os todos numa só cláusula WHERE (ver VehicleTableModel.set_filters).
+    criteriaChanged é emitido ao carregar em "Aplicar" ou "Limpar".
+    """
+
+    criteriaChanged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__("Filtros", parent)
+
+        today = QDate.currentDate()
+        self.purchase_dates = self._date_range("Data Compra", today)
+        self.sale_dates = self._date_range("Data Venda", today)
+        self.purchase_values = self._value_range()
+        self.sale_values = self._value_range()
+
+        self.regime_fiscal = QComboBox()
+        self.regime_fiscal.addItems([ANY, REGIME_NORMAL, REGIME_MARGEM])
+        self.taxa = QComboBox()
+        self.taxa.addItems([ANY] + TAX_RATES)
+        self.tipoDocumento = QComboBox()
+        self.tipoDocumento.addItems([ANY] + DOCUMENT_TYPES)
+
+        self.apply_button = QPushButton("Aplicar")
+        self.apply_button.clicked.connect(self.criteriaChanged.emit)
+        self.clear_button = QPushButton("Limpar")
+        self.clear_button.clicked.connect(self.clear)
+
+        layout = QGridLayout(self)
+        for row, (enabled, first, last) in enumerate((self.purchase_dates, self.sale_dates)):
+            layout.addWidget(enabled, row, 0)
+            layout.addWidget(QLabel("De:"), row, 1)
+            layout.addWidget(first, row, 2)
+            layout.addWidget(QLabel("Até:"), row, 3)
+            layout.addWidget(last, row, 4)
+        for row, (title, (minimum, maximum)) in enumerate((("Valor Compra", self.purchase_values),
+                                                           ("Valor Venda", self.sale_values)), 2):
+            layout.addWidget(QLabel(title), row, 0)
+            layout.addWidget(QLabel("De:"), row, 1)
+            layout.addWidget(minimum, row, 2)
+            layout.addWidget(QLabel("Até:"), row, 3)
+            layout.addWidget(maximum, row, 4)
+
+        layout.addWidget(QLabel("Regime Fiscal:"), 0, 5)
+        layout.addWidget(self.regime_fiscal, 0, 6)
+        layout.addWidget(QLabel("Taxa:"), 1, 5)
+        layout.addWidget(self.taxa, 1, 6)
+        layout.addWidget(QLabel("Tipo Documento:"), 2, 5)
+        layout.addWidget(self.tipoDocumento, 2, 6)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch(1)
+        buttons.addWidget(self.clear_button)
+        buttons.addWidget(self.apply_button)
+        layout.addLayout(buttons, 3, 5, 1, 2)
+        layout.setColumnStretch(7, 1)
+
+    def _date_range(self, title, today):
+        enabled = QCheckBox(title)
+        first = QDateEdit(QDate(today.year(), 1, 1))
+        last = QDateEdit(today)
+        for edit in (first, last):
+            edit.setDisplayFormat("dd-MM-yyyy")
+            edit.setCalendarPopup(True)
+            edit.setEnabled(False)
+            enabled.toggled.connect(edit.setEnabled)
+        return enabled, first, last
+
+    def _value_range(self):
+        edits = (QDoubleSpinBox(), QDoubleSpinBox())
+        for edit in edits:
+            edit.setRange(0, MAX_VALUE)
+            edit.setDecimals(2)
+            edit.setSingleStep(1000)
+            edit.setSpecialValueText(_NO_LIMIT)
+            edit.setSuffix(" €")
+        return edits
+
+    def criteria(self):
+        """Critérios preenchidos, ex.: {"sale_from": "2024-01-01", "taxa": 23.0}."""
+        criteria = {}
+        for (enabled, first, last), prefix in ((self.purchase_dates, "purchase"), (self.sale_dates, "sale")):
+            if enabled.isChecked():
+                criteria[f"{prefix}_from"] = _iso(first.date())
+                criteria[f"{prefix}_to"] = _iso(last.date())
+        for (minimum, maximum), suffix in ((self.purchase_values, "purchase_value"),
+                                           (self.sale_values, "sale_value")):
+            if minimum.value() > 0:
+                criteria[f"min_{suffix}"] = minimum.value()
+            if maximum.value() > 0:
+                criteria[f"max_{suffix}"] = maximum.value()
+        for key, combo in (("regime_fiscal", self.regime_fiscal), ("tipoDocumento", self.tipoDocumento)):
+            if combo.currentIndex() > 0:
+                criteria[key] = combo.currentText()
+        if self.taxa.currentIndex() > 0:
+            criteria["taxa"] = float(self.taxa.currentText())
+        return criteria
+
+    def clear(self):
+        """Desliga todos os critérios e emite criteriaChanged."""
+        for enabled, _, _ in (self.purchase_dates, self.sale_dates):
+            enabled.setChecked(False)
+        for edit in self.purchase_values + self.sale_values:
+            edit.setValue(0)
+        for combo in (self.regime_fiscal, self.taxa, self.tipoDocumento):
+            combo.setCurrentIndex(0)
+        self.criteriaChanged.emit()
@@ -0,0 +1,161 @@
+# formatting.py
+
+import datetime
+import math
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+
+from PyQt6.QtCore import QLocale
+
+from money import to_cents
+
+# Única instância do locale da aplicação. A formatação de valores não passa pelo QLocale
+# (é feita em Python e guardada em cache), mas reproduz exatamente o seu resultado.
+LOCALE = QLocale(QLocale.Language.Portuguese, QLocale.Country.Portugal)
+
+_DECIMAL_POINT = LOCALE.decimalPoint()
+_GROUP_SEPARATOR = LOCALE.groupSeparator()  # Espaço não separável em pt-PT
+# Em pt-PT os milhares só são agrupados a partir de 5 dígitos ("1234,50" mas "12 345,68"):
+# comprimento de "1,234.56", o único caso agrupado pelo Python que o QLocale não agrupa
+_UNGROUPED_LENGTH = 8 if LOCALE.toString(1000.0, 'f', 0) == "1000" else 0
+_CENT = Decimal("0.01")
+
+
+# --- Formatação ---
+
+def _localise(text):
+    # text no formato do Python com agrupamento ("-1,234.56") -> formato do LOCALE
+    if "," not in text:
+        return text.replace(".", _DECIMAL_POINT)
+    if len(text) - (text[0] == "-") == _UNGROUPED_LENGTH:
+        return text.replace(",", "").replace(".", _DECIMAL_POINT)
+    return text.replace(",", _GROUP_SEPARATOR).replace(".", _DECIMAL_POINT)
+
+
+@lru_cache(maxsize=65536)
+def _format_float(number):
+    if (number * 100) % 1 == 0.5:
+        # Possível empate: o Python arredonda para par, o QLocale para longe do zero
+        number = Decimal(number).quantize(_CENT, rounding=ROUND_HALF_UP)
+    return _localise(f"{number:,.2f}")
+
+
+@lru_cache(maxsize=65536)
+def _format_cents(cents):
+    # Só aritmética inteira: não há arredondamentos
+    euros, rest = divmod(abs(cents), 100)
+    return _localise(f"{'-' if cents < 0 else ''}{euros:,}.{rest:02d}")
+
+
+def format_date(value):
+    """Converte uma data da base de dados ('AAAA-MM-DD') para DD-MM-AAAA, como nos formulários.
+
+    Valores vazios dão "".
+    """
+    if not value:
+        return ""
+    return f"{value[8:10]}-{value[5:7]}-{value[0:4]}"
+
+
+def format_money(value):
+    """Formata um valor com 2 casas decimais, como LOCALE.toString(valor, 'f', 2).
+
+    Valores vazios dão ""; valores que não são números são devolvidos como texto.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str) and not value.strip():
+        return ""
+    try:
+        return _format_float(float(value) + 0.0)  # -0.0 passa a 0.0, como no QLocale
+    except (ValueError, TypeError, OverflowError):
+        return str(value)
+
+
+def format_cents(value):
+    """Formata um valor em cêntimos (como gravado na base de dados, ver money.py) em euros com
+    2 casas decimais, igual a format_money(value / 100). Valores vazios (None ou "", como o QtSql
+    devolve NULL) dão ""."""
+    if value is None or value == "":
+        return ""
+    return _format_cents(int(value))
+
+
+def format_cents_column(values):
+    """Formata uma coluna inteira de valores em cêntimos (ex.: todas as linhas de um bloco ou de
+    uma página)."""
+    format_value = format_cents
+    return [format_value(value) for value in values]
+
+
+# --- Leitura de texto introduzido pelo utilizador ou importado ---
+# Funções em Python puro: são chamadas para cada célula e têm de ser rápidas.
+
+_NUMBER_NOISE = str.maketrans("", "", " \u00a0\u202f€")
+_THOUSANDS_ONLY = re.compile(r"^-?\d{1,3}(\.\d{3})+$")
+
+
+def parse_number(value):
+    """Converte um número em formato pt-PT ("1 234,56", "1.234,56") ou uma célula numérica em float.
+
+    Devolve (valor, ok); valores vazios dão (None, True).
+    """
+    if value is None:
+        return None, True
+    if isinstance(value, (int, float)):
+        return float(value), True
+    text = str(value).translate(_NUMBER_NOISE)
+    if not text or text == "N/A":
+        return None, True
+
+    if "," in text:
+        # Vírgula decimal: os pontos só podem ser separadores de milhares
+        text = text.replace(".", "").replace(",", ".")
+    elif _THOUSANDS_ONLY.match(text):
+        text = text.replace(".", "")
+    try:
+        number = float(text)
+    except ValueError:
+        return None, False
+    return (number, True) if math.isfinite(number) else (None, False)
+
+
+def parse_money(value):
+    """parse_number para valores monetários: devolve (valor em cêntimos, ok), ver money.to_cents."""
+    number, ok = parse_number(value)
+    return to_cents(number), ok
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    if len(text) == 10 and text[4] == "-" and text[7] == "-":
+        year, month, day = text[0:4], text[5:7], text[8:10]  # AAAA-MM-DD (formato da base de dados)
+    else:
+        digits = text.replace("-", "").replace("/", "")
+        if len(digits) != 8:
+            return None, False
+        day, month, year = digits[0:2], digits[2:4], digits[4:8]  # DD-MM-AAAA, como no DateValidator
+    if not (day.isdigit() and month.isdigit() and year.isdigit()):
+        return None, False
+    try:
+        return datetime.date(int(year), int(month), int(day)).isoformat(), True
+    except ValueError:
+        return None, False
+
+
+def parse_date(value):
+    """Converte DD-MM-AAAA (ou AAAA-MM-DD, ou uma célula de data) em 'yyyy-MM-dd'.
+
+    Devolve (valor, ok); valores vazios dão (None, True).
+    """
+    if value is None:
+        return None, True
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat(), True
+    if isinstance(value, datetime.date):
+        return value.isoformat(), True  # Sempre com 4 dígitos no ano (o strftime não os garante)
+    text = str(value).strip()
+    if not text:
+        return None, True
+    return _parse_date_text(text)
@@ -0,0 +1,202 @@
+# importer.py
+
+import csv
+import datetime
+import os
+import unicodedata
+
+from formatting import parse_date, parse_money, parse_number
+from money import MONEY_FIELDS
+from queries import VEHICLE_FIELDS, BULK_BATCH_SIZE
+from repository import repository
+from tax import REGIME_MARGEM, REGIME_NORMAL
+
+NUMERIC_FIELDS = {"isv", "valorCompra", "valorVenda", "imposto", "valorBase", "taxa"}
+DATE_FIELDS = {"dataCompra", "dataVenda"}
+REGIMES = {"", REGIME_NORMAL, REGIME_MARGEM}
+
+# Cabeçalhos aceites para cada campo, além do próprio nome da coluna
+# (comparados sem acentos, maiúsculas, espaços ou pontuação)
+HEADER_ALIASES = {
+    "matricula": ["Matrícula"],
+    "marca": ["Marca"],
+    "numeroQuadro": ["Nº Quadro", "Número de Quadro", "VIN"],
+    "isv": ["ISV"],
+    "nRegistoContabilidade": ["Nº Registo Contabilidade"],
+    "dataCompra": ["Data Compra", "Data da Compra"],
+    "docCompra": ["Documento Compra", "Doc. Compra"],
+    "tipoDocumento": ["Tipo Documento"],
+    "valorCompra": ["Valor Compra", "Valor de Compra"],
+    "dataVenda": ["Data Venda", "Data da Venda"],
+    "docVenda": ["Documento Venda", "Doc. Venda"],
+    "valorVenda": ["Valor Venda", "Valor de Venda"],
+    "imposto": ["Imposto"],
+    "valorBase": ["Valor Base"],
+    "taxa": ["Taxa"],
+    "regime_fiscal": ["Regime Fiscal"],
+}
+
+
+def _header_key(header):
+    text = unicodedata.normalize("NFKD", str(header or ""))
+    return "".join(c for c in text if c.isalnum()).lower()
+
+
+_HEADER_LOOKUP = {}
+for _field, _aliases in HEADER_ALIASES.items():
+    for _alias in [_field] + _aliases:
+        _HEADER_LOOKUP[_header_key(_alias)] = _field
+
+
+class ImportReport:
+    """Resultado de uma importação: linhas lidas, inseridas e rejeitadas (nº da linha, motivo)."""
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.rejected = []
+        self.error = None
+
+    def __repr__(self):
+        return (f"ImportReport(processed={self.processed}, inserted={self.inserted}, "
+                f"rejected={len(self.rejected)}, error={self.error!r})")
+
+
+# --- Leitura dos ficheiros ---
+
+class _ExcelSemicolon(csv.excel):
+    delimiter = ";"  # Excel em pt-PT exporta CSV com ';'
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        sample = handle.read(4096)
+        handle.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = _ExcelSemicolon
+        reader = csv.reader(handle, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield header
+        yield from reader
+
+
+def _read_xlsx(path):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("A importação de ficheiros .xlsx requer o pacote 'openpyxl'.")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """Percorre o ficheiro (CSV ou XLSX) e devolve (nº da linha, dict com os campos reconhecidos).
+
+    As linhas são lidas uma a uma; o ficheiro nunca é carregado todo para memória.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    rows = _read_xlsx(path) if extension in (".xlsx", ".xlsm") else _read_csv(path)
+
+    header = next(rows, None)
+    if header is None:
+        return
+    fields = [_HEADER_LOOKUP.get(_header_key(column)) for column in header]
+    if not any(fields):
+        raise ValueError("O ficheiro não tem nenhum cabeçalho reconhecido (ex.: 'Matrícula', 'Marca').")
+
+    for line, values in enumerate(rows, start=2):
+        if values is None or all(value in (None, "") for value in values):
+            continue
+        yield line, {field: value for field, value in zip(fields, values) if field}
+
+
+# --- Normalização (mesmas regras que AddExpenseDialog.get_form_data/DateValidator) ---
+# Os números e as datas são lidos por formatting.parse_number/parse_date; os valores monetários
+# (em euros no ficheiro) por formatting.parse_money, que os converte em cêntimos
+
+def _parse_text(value):
+    return ("" if value is None else str(value).strip()), True
+
+
+_CONVERTERS = {field: parse_money if field in MONEY_FIELDS else parse_number if field in NUMERIC_FIELDS
+               else parse_date if field in DATE_FIELDS else _parse_text for field in VEHICLE_FIELDS}
+_EMPTY_RECORD = {field: None if field in NUMERIC_FIELDS or field in DATE_FIELDS else ""
+                 for field in VEHICLE_FIELDS}
+
+
+def _is_iso_date(value):
+    try:
+        return datetime.date.fromisoformat(value).isoformat() == value
+    except (TypeError, ValueError):
+        return False
+
+
+def _database_error(record):
+    """As regras dos triggers de validação (migrations.valid_vehicle_condition), que a inserção em
+    lote só verifica no fim de cada lote: assim é recusada a linha e não o lote inteiro."""
+    for field in DATE_FIELDS:
+        if record[field] is not None and not _is_iso_date(record[field]):
+            return f"Data inválida em '{field}': {record[field]!r}"
+    for field in MONEY_FIELDS:
+        if record[field] is not None and type(record[field]) is not int:
+            return f"Valor monetário inválido em '{field}': {record[field]!r}"
+    return None
+
+
+def normalise_row(raw):
+    """Valida e converte uma linha lida do ficheiro. Devolve (registo, None) ou (None, motivo)."""
+    record = dict(_EMPTY_RECORD)
+    for field, value in raw.items():
+        value, ok = _CONVERTERS[field](value)
+        if not ok:
+            return None, f"Valor inválido em '{field}': {raw[field]!r}"
+        record[field] = value
+
+    if not record["matricula"] or not record["marca"] or record["valorCompra"] is None:
+        return None, "Matrícula, Marca e Valor de Compra são obrigatórios."
+    if record["regime_fiscal"] not in REGIMES:
+        return None, f"Regime fiscal desconhecido: {record['regime_fiscal']!r}"
+    error = _database_error(record)
+    if error is not None:
+        return None, error
+    return record, None
+
+
+def import_file(path, batch_size=BULK_BATCH_SIZE, progress=None):
+    """Importa um ficheiro CSV/XLSX para a tabela 'vehicles'.
+
+    progress(lidas, inseridas) é chamado depois de cada lote gravado.
+    """
+    report = ImportReport()
+
+    def valid_records():
+        for line, raw in read_rows(path):
+            report.processed += 1
+            record, reason = normalise_row(raw)
+            if record is None:
+                report.rejected.append((line, reason))
+            else:
+                yield record
+
+    def on_batch(inserted):
+        report.inserted = inserted
+        if progress is not None:
+            progress(report.processed, inserted)
+
+    try:
+        inserted = repository().add_expenses_bulk(valid_records(), batch_size=batch_size, progress=on_batch)
+    except (OSError, ValueError, ImportError, csv.Error) as e:
+        report.error = str(e)
+        return report
+
+    if inserted is None:
+        report.error = "Erro ao gravar um lote na base de dados."
+    return report
@@ -0,0 +1,229 @@
+# instrumentation.py
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+# Chamadas mais lentas do que isto são escritas no registo de consultas lentas.
+# Podem ser alterados com as variáveis de ambiente ou com configure_slow_query_log().
+SLOW_QUERY_MS = float(os.environ.get("SQL_APP_SLOW_QUERY_MS", 200))
+SLOW_QUERY_LOG = os.environ.get("SQL_APP_SLOW_QUERY_LOG", "slow_queries.log")
+SLOW_QUERY_LOG_BYTES = 1024 * 1024
+SLOW_QUERY_LOG_BACKUPS = 3
+
+SAMPLES_PER_OPERATION = 1000  # Latências guardadas por operação (as mais recentes)
+_MAX_SQL_LENGTH = 2000
+
+_log = None  # Criado com a primeira consulta lenta (o logging só é importado nessa altura)
+_log_lock = threading.Lock()
+_CO_GENERATOR = 0x20  # inspect.CO_GENERATOR, sem importar o inspect no arranque
+_calls = threading.local()  # Pilha das chamadas instrumentadas em curso nesta thread
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class OperationStats:
+    """Latências (ms) e linhas das chamadas recentes de uma operação."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rows = 0
+        self.slow = 0
+        self.samples = deque(maxlen=SAMPLES_PER_OPERATION)
+        self.last_sql = ""
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "slow": self.slow,
+            "mean_rows": self.rows / self.count if self.count else 0.0,
+            "p50_ms": _percentile(ordered, 0.50),
+            "p95_ms": _percentile(ordered, 0.95),
+            "max_ms": ordered[-1] if ordered else 0.0,
+            "last_sql": self.last_sql,
+        }
+
+
+class QueryStats:
+    """Estatísticas de todas as operações, partilhadas pelas threads da aplicação."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def record(self, operation, elapsed_ms, rows, sql, ok=True):
+        with self._lock:
+            stats = self._operations.get(operation)
+            if stats is None:
+                stats = self._operations[operation] = OperationStats()
+            stats.count += 1
+            stats.rows += rows
+            stats.samples.append(elapsed_ms)
+            stats.errors += not ok
+            if sql:
+                stats.last_sql = sql
+            slow = elapsed_ms >= SLOW_QUERY_MS
+            stats.slow += slow
+        if slow:
+            _log_slow_query(operation, elapsed_ms, rows, sql)
+
+    def snapshot(self):
+        """Devolve {operação: resumo} (ver OperationStats.summary), por ordem alfabética."""
+        with self._lock:
+            return {operation: self._operations[operation].summary() for operation in sorted(self._operations)}
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+
+
+query_stats = QueryStats()
+
+
+def configure_slow_query_log(threshold_ms=None, path=None):
+    """Altera o limite das consultas lentas e/ou o ficheiro do registo (rodado a cada 1 MB)."""
+    global SLOW_QUERY_MS, SLOW_QUERY_LOG
+    if threshold_ms is not None:
+        SLOW_QUERY_MS = float(threshold_ms)
+    if path is not None and path != SLOW_QUERY_LOG:
+        SLOW_QUERY_LOG = path
+        with _log_lock:
+            for handler in list(_log.handlers if _log is not None else []):
+                _log.removeHandler(handler)
+                handler.close()
+
+
+def _log_slow_query(operation, elapsed_ms, rows, sql):
+    global _log
+    with _log_lock:
+        if _log is None or not _log.handlers:
+            # O ficheiro só é criado quando aparece a primeira consulta lenta
+            import logging
+            from logging.handlers import RotatingFileHandler
+            try:
+                handler = RotatingFileHandler(SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES,
+                                              backupCount=SLOW_QUERY_LOG_BACKUPS, encoding="utf-8")
+            except OSError as e:
+                print(f"Erro ao abrir o registo de consultas lentas: {e}")
+                return
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            _log = logging.getLogger("sql_app.slow_queries")
+            _log.propagate = False
+            _log.addHandler(handler)
+            _log.setLevel(logging.INFO)
+    _log.info("%s: %.1f ms, %d linhas [%s] %s", operation, elapsed_ms, rows,
+              threading.current_thread().name, " ".join(sql.split()))
+
+
+# --- Registo das chamadas ---
+
+class _Call:
+    __slots__ = ("statements", "ok")
+
+    def __init__(self):
+        self.statements = []
+        self.ok = True
+
+
+def note_query(sql, ok):
+    """Regista o SQL (e o resultado) de uma consulta nas chamadas instrumentadas em curso.
+
+    Uma chamada dentro de outra (ex.: fetch_expenses -> fetch_expenses_page) conta para as duas.
+    """
+    stack = getattr(_calls, "stack", None)
+    if not stack:
+        return
+    for call in stack:
+        if sql and sql not in call.statements:
+            call.statements.append(sql)
+        call.ok = call.ok and ok
+
+
+def _run(call, fn, *args, **kwargs):
+    stack = getattr(_calls, "stack", None)
+    if stack is None:
+        stack = _calls.stack = []
+    stack.append(call)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        stack.pop()
+
+
+def _finish(operation, call, elapsed, rows):
+    sql = "; ".join(call.statements)[:_MAX_SQL_LENGTH]
+    query_stats.record(operation, elapsed * 1000, rows, sql, call.ok)
+
+
+def _count_rows(result):
+    if result is None or result is False:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return 1
+
+
+def timed(operation=None, rows=_count_rows):
+    """Decorador das operações do repositório (database.py, sqlite_repository.py): mede cada
+    chamada e regista-a em query_stats.
+
+    rows(resultado) devolve o número de linhas da chamada. Nos geradores (ex.: iter_vehicles)
+    só conta o tempo passado dentro do gerador, e não o de quem o percorre; aí rows(item) dá
+    as linhas de cada item produzido (por omissão uma).
+    """
+    def decorate(fn):
+        name = operation or fn.__name__
+
+        if fn.__code__.co_flags & _CO_GENERATOR:
+            item_rows = (lambda item: 1) if rows is _count_rows else rows
+
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                call = _Call()
+                elapsed = 0.0
+                produced = 0
+                generator = fn(*args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = _run(call, next, generator)
+                        except StopIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - start
+                        produced += item_rows(item)
+                        yield item
+                finally:
+                    generator.close()
+                    _finish(name, call, elapsed, produced)
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call = _Call()
+            start = time.perf_counter()
+            count = 0  # Fica a 0 se fn levantar uma exceção (não há resultado para contar)
+            try:
+                result = _run(call, fn, *args, **kwargs)
+                count = rows(result)
+                return result
+            except Exception:
+                call.ok = False
+                raise
+            finally:
+                _finish(name, call, time.perf_counter() - start, count)
+        return wrapper
+    return decorate
@@ -1,22 +1,46 @@
 # main.py
 
+import startup  # First import: startup times are measured from here (see startup.py)
+
+import os
 import sys
 from PyQt6.QtWidgets import QApplication, QMessageBox
-from database import init_db  # Import at the top as usual
+from repository import close_repository, open_repository
+from async_db import shutdown_executor
 from app import ExpenseApp
+from styles import APP_STYLESHEET
+
+DATABASE = os.environ.get("SQL_APP_DATABASE", "vehicles.db")
+
+
+def load_data(app, window):
+    # Open the database (and apply pending migrations) once the window is on screen.
+    # The data backend (qtsql or sqlite3) comes from SQL_APP_BACKEND, see repository.py
+    if open_repository(DATABASE) is None:
+        QMessageBox.critical(window, "Error", "Could not open your database")
+        app.exit(1)
+        return
+    startup.mark("base de dados aberta")
+
+    # The grid is filled in chunks by the background pool as the view asks for rows
+    startup.watch_first_rows(window.model)
+    window.start_loading()
 
 
 def main():
     # Initialize the application
     app = QApplication(sys.argv)
+    app.setStyleSheet(APP_STYLESHEET)  # Parsed once for every window and dialog
+    startup.mark("QApplication")
 
-    # Initialize Database after QApplication instance is created
-    if not init_db("vehicles.db"):
-        QMessageBox.critical(None, "Error", "Could not open your database")
-        sys.exit(1)
+    # Wait for background queries and close their connections before exiting
+    app.aboutToQuit.connect(shutdown_executor)
+    app.aboutToQuit.connect(close_repository)
 
-    # Create and show the main window
+    # Create and show the main window; nothing is read from the database until it is painted
     window = ExpenseApp()
+    startup.mark("janela criada")
+    startup.after_first_paint(window, lambda: load_data(app, window))
     window.show()
 
     # Start the application's event loop
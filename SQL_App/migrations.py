@@ -0,0 +1,596 @@
+# migrations.py
+#
+# As migrações correm tanto numa ligação QtSql (QSqlDatabase) como numa sqlite3.Connection
+# (sqlite_repository.py); o Qt só é importado no primeiro caso.
+
+import sqlite3
+
+from money import MONEY_FIELDS
+
+# Um veículo está vendido se tiver data, valor (> 0) ou documento de venda.
+SOLD_EXPRESSION = """
+    CASE WHEN COALESCE(dataVenda, '') <> ''
+           OR CAST(COALESCE(valorVenda, 0) AS REAL) > 0
+           OR TRIM(COALESCE(docVenda, '')) <> ''
+         THEN 1 ELSE 0 END
+"""
+
+# Campos de texto indexados para pesquisa (tabela FTS5 'vehicles_fts')
+SEARCH_COLUMNS = ["matricula", "marca", "numeroQuadro", "nRegistoContabilidade", "docCompra", "docVenda"]
+
+_SEARCH_COLUMN_LIST = ", ".join(SEARCH_COLUMNS)
+
+# Trigger de inserção no índice de pesquisa. A importação em massa (database.add_expenses_bulk)
+# desliga-o durante cada lote e indexa as linhas novas de uma só vez.
+SEARCH_INSERT_TRIGGER = f"""CREATE TRIGGER IF NOT EXISTS vehicles_fts_insert AFTER INSERT ON vehicles BEGIN
+        INSERT INTO vehicles_fts(rowid, {_SEARCH_COLUMN_LIST})
+        VALUES (new.id, {", ".join(f"new.{column}" for column in SEARCH_COLUMNS)});
+    END"""
+
+
+# Ordenações aceites por database.fetch_expenses_page: campo -> expressão, indexada com o id.
+# NULL passa a ''/0 para que a comparação pela chave (valor, id) não deixe linhas de fora.
+ORDER_EXPRESSIONS = {
+    "matricula": "COALESCE(matricula, '') COLLATE NOCASE",
+    "marca": "COALESCE(marca, '') COLLATE NOCASE",
+    "valorCompra": "COALESCE(valorCompra, 0)",
+    "docVenda": "COALESCE(docVenda, '') COLLATE NOCASE",
+    "valorVenda": "COALESCE(valorVenda, 0)",
+    "imposto": "COALESCE(imposto, 0)",
+    "valorBase": "COALESCE(valorBase, 0)",
+    "dataVenda": "COALESCE(dataVenda, '')",
+    "dataCompra": "COALESCE(dataCompra, '')",
+}
+
+# Ordenações com um índice próprio para o filtro "Vendidos"/"Em stock" (vendido, expressão, id).
+# Cada índice atrasa todas as inserções, por isso só as colunas mais ordenadas com o filtro ativo
+# o têm; as outras usam o índice (expressão, id) e saltam as linhas da outra classe.
+SOLD_ORDER_FIELDS = ["matricula", "marca", "dataCompra", "dataVenda", "valorVenda"]
+
+# Totais mensais das vendas (tabela 'monthly_summary'), por mês da venda, regime fiscal e taxa
+SUMMARY_FIELDS = ["valorCompra", "valorVenda", "valorBase", "imposto"]
+SUMMARY_KEY = ["mes", "regime_fiscal", "taxa"]
+
+# Datas gravadas como 'AAAA-MM-DD' ou NULL (validadas pelos triggers de _normalise_dates);
+# vendas sem data não entram nos totais
+_MONTH_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]*"
+
+DATE_FIELDS = ["dataCompra", "dataVenda"]
+DATE_BATCH_SIZE = 20000  # Veículos por transação na normalização das datas
+_ISO_DATE_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]"
+
+# Colunas de 'vehicles' (além do id e de 'vendido') depois de _store_money_in_cents, pela ordem
+# de queries.VEHICLE_FIELDS; os valores monetários (MONEY_FIELDS) são cêntimos
+_VEHICLE_COLUMNS = [
+    ("matricula", "TEXT"), ("marca", "TEXT"), ("numeroQuadro", "TEXT"), ("isv", "INTEGER"),
+    ("nRegistoContabilidade", "TEXT"), ("dataCompra", "TEXT"), ("docCompra", "TEXT"),
+    ("tipoDocumento", "TEXT"), ("valorCompra", "INTEGER"), ("dataVenda", "TEXT"), ("docVenda", "TEXT"),
+    ("valorVenda", "INTEGER"), ("imposto", "INTEGER"), ("valorBase", "INTEGER"), ("taxa", "REAL"),
+    ("regime_fiscal", "TEXT"),
+]
+
+
+def _summary_key_values(prefix):
+    # prefix: "new." / "old." nos triggers, "" numa consulta à tabela
+    return (f"substr({prefix}dataVenda, 1, 7)", f"COALESCE({prefix}regime_fiscal, '')",
+            f"CAST(COALESCE({prefix}taxa, 0) AS REAL)")
+
+
+def _summary_change(prefix, sign, money_type="REAL"):
+    """Soma (sign=1) ou subtrai (sign=-1) o veículo ("new."/"old.") aos totais do mês da venda."""
+    month, regime, rate = _summary_key_values(prefix)
+    amounts = ", ".join(f"{sign} * CAST(COALESCE({prefix}{field}, 0) AS {money_type})"
+                        for field in SUMMARY_FIELDS)
+    updates = ", ".join(f"{field} = {field} + excluded.{field}" for field in ["veiculos"] + SUMMARY_FIELDS)
+    statement = f"""INSERT INTO monthly_summary ({", ".join(SUMMARY_KEY)}, veiculos, {", ".join(SUMMARY_FIELDS)})
+                SELECT {month}, {regime}, {rate}, {sign}, {amounts}
+                WHERE {prefix}dataVenda GLOB '{_MONTH_GLOB}'
+                ON CONFLICT ({", ".join(SUMMARY_KEY)}) DO UPDATE SET {updates};"""
+    if sign < 0:
+        # Um grupo sem veículos desaparece (evita linhas a zero e acumular erros de arredondamento)
+        statement += f"""
+                DELETE FROM monthly_summary
+                WHERE mes = {month} AND regime_fiscal = {regime} AND taxa = {rate} AND veiculos = 0;"""
+    return statement
+
+
+def summary_totals_sql(condition, money_type="INTEGER"):
+    """INSERT que soma aos totais de 'monthly_summary' as vendas dos veículos que cumprem
+    condition (SQL sobre 'vehicles', ex.: "id > :last_id"), agrupadas de uma só vez.
+
+    Faz o mesmo que o trigger monthly_summary_insert para várias linhas; a inserção em lote
+    (queries.SUMMARY_NEW_ROWS_SQL) desliga o trigger e usa esta instrução no fim de cada lote.
+    """
+    month, regime, rate = _summary_key_values("")
+    sums = ", ".join(f"SUM(CAST(COALESCE({field}, 0) AS {money_type}))" for field in SUMMARY_FIELDS)
+    updates = ", ".join(f"{field} = {field} + excluded.{field}" for field in ["veiculos"] + SUMMARY_FIELDS)
+    return f"""INSERT INTO monthly_summary ({", ".join(SUMMARY_KEY)}, veiculos, {", ".join(SUMMARY_FIELDS)})
+            SELECT {month}, {regime}, {rate}, COUNT(*), {sums}
+            FROM vehicles WHERE dataVenda GLOB '{_MONTH_GLOB}' AND ({condition})
+            GROUP BY 1, 2, 3
+            ON CONFLICT ({", ".join(SUMMARY_KEY)}) DO UPDATE SET {updates}"""
+
+
+def _exec(database, sql):
+    if isinstance(database, sqlite3.Connection):
+        try:
+            database.execute(sql)
+        except sqlite3.Error as e:
+            print(f"Erro na migração: {e}")
+            return False
+        return True
+
+    from PyQt6.QtSql import QSqlQuery
+    query = QSqlQuery(database)
+    if not query.exec(sql):
+        print(f"Erro na migração: {query.lastError().text()}")
+        return False
+    return True
+
+
+def _fetch_all(database, sql):
+    """Todas as linhas (tuplos) de uma consulta sem parâmetros."""
+    if isinstance(database, sqlite3.Connection):
+        return database.execute(sql).fetchall()
+
+    from PyQt6.QtSql import QSqlQuery
+    query = QSqlQuery(database)
+    rows = []
+    if query.exec(sql):
+        while query.next():
+            rows.append(tuple(query.value(i) for i in range(query.record().count())))
+    return rows
+
+
+def _fetch_one(database, sql, values=()):
+    """Primeira linha (tuplo) de uma consulta com parâmetros posicionais, ou None."""
+    if isinstance(database, sqlite3.Connection):
+        return database.execute(sql, values).fetchone()
+
+    from PyQt6.QtSql import QSqlQuery
+    query = QSqlQuery(database)
+    query.prepare(sql)
+    for position, value in enumerate(values):
+        query.bindValue(position, value)
+    if not query.exec() or not query.next():
+        return None
+    return tuple(query.value(i) for i in range(query.record().count()))
+
+
+def _has_column(database, table, column):
+    # table_xinfo (e não table_info) para incluir também as colunas geradas
+    return _fetch_one(database, f"SELECT 1 FROM pragma_table_xinfo('{table}') WHERE name = ?", (column,)) is not None
+
+
+def _has_table(database, name):
+    return _fetch_one(database, "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)) is not None
+
+
+# --- Migrações ---
+# Cada migração é idempotente: bases de dados criadas antes do controlo de versões
+# (user_version = 0) podem já ter parte do esquema.
+
+def _create_vehicles_table(database):
+    # CERTIFIQUE-SE QUE ESTA ESTRUTURA DA TABELA TEM 'valorBase REAL'
+    return _exec(database, """
+        CREATE TABLE IF NOT EXISTS vehicles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            matricula TEXT,
+            marca TEXT,
+            numeroQuadro TEXT,  -- NOVO CAMPO: NUMERO DE QUADRO
+            isv REAL,
+            nRegistoContabilidade TEXT,
+            dataCompra TEXT,
+            docCompra TEXT,
+            tipoDocumento TEXT,
+            valorCompra REAL,
+            dataVenda TEXT,
+            docVenda TEXT,
+            valorVenda REAL,
+            imposto REAL,
+            valorBase REAL,  -- COLUNA 'valorBase' AQUI
+            taxa REAL,
+            regime_fiscal TEXT
+        )
+    """)
+
+
+def _add_missing_columns(database):
+    """Bases de dados antigas não têm 'numeroQuadro' nem 'valorBase'."""
+    for column, column_type in (("numeroQuadro", "TEXT"), ("valorBase", "REAL")):
+        if not _has_column(database, "vehicles", column):
+            if not _exec(database, f"ALTER TABLE vehicles ADD COLUMN {column} {column_type}"):
+                return False
+    return True
+
+
+def _add_sold_column(database):
+    """Coluna gerada 'vendido' e o respetivo índice.
+
+    A coluna é VIRTUAL (é a única forma que o ALTER TABLE aceita em bases de dados
+    já existentes); o valor fica persistido no índice, que é o que os filtros usam.
+    """
+    if not _has_column(database, "vehicles", "vendido"):
+        if not _exec(database, f"ALTER TABLE vehicles ADD COLUMN vendido INTEGER "
+                               f"GENERATED ALWAYS AS ({SOLD_EXPRESSION}) VIRTUAL"):
+            return False
+    return _exec(database, "CREATE INDEX IF NOT EXISTS idx_vehicles_vendido ON vehicles (vendido)")
+
+
+def _create_search_index(database):
+    """Índice de pesquisa FTS5 sobre 'vehicles' e os triggers que o mantêm atualizado.
+
+    O tokenizer 'trigram' permite pesquisar qualquer parte de uma matrícula ou documento
+    (ex.: "AB-1"), tal como a pesquisa antiga por substring, mas a partir do índice.
+    """
+    columns = _SEARCH_COLUMN_LIST
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    index_exists = _has_table(database, "vehicles_fts")
+
+    statements = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS vehicles_fts USING fts5(
+                {columns}, content='vehicles', content_rowid='id', tokenize='trigram'
+            )""",
+        SEARCH_INSERT_TRIGGER,
+        f"""CREATE TRIGGER IF NOT EXISTS vehicles_fts_delete AFTER DELETE ON vehicles BEGIN
+                INSERT INTO vehicles_fts(vehicles_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS vehicles_fts_update AFTER UPDATE ON vehicles BEGIN
+                INSERT INTO vehicles_fts(vehicles_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO vehicles_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+    ]
+    if not index_exists:
+        # Bases de dados já existentes: indexar as linhas que já lá estão
+        statements.append("INSERT INTO vehicles_fts(vehicles_fts) VALUES ('rebuild')")
+
+    return all(_exec(database, statement) for statement in statements)
+
+
+def _limit_search_update_trigger(database):
+    """O índice de pesquisa só é atualizado quando muda um dos campos indexados.
+
+    Antes, qualquer UPDATE (ex.: recalcular os impostos de toda a tabela) voltava a indexar a linha.
+    """
+    columns = _SEARCH_COLUMN_LIST
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    return (_exec(database, "DROP TRIGGER IF EXISTS vehicles_fts_update")
+            and _exec(database, f"""CREATE TRIGGER vehicles_fts_update AFTER UPDATE OF {columns} ON vehicles BEGIN
+                INSERT INTO vehicles_fts(vehicles_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO vehicles_fts(rowid, {columns}) VALUES (new.id, {new_values});
+            END"""))
+
+
+def _create_monthly_summary(database, money_type="REAL"):
+    """Tabela 'monthly_summary' com os totais das vendas de cada mês, mantida por triggers.
+
+    Os relatórios por período leem uma linha por mês/regime/taxa em vez de percorrer 'vehicles'.
+    Veículos sem taxa contam como taxa 0. money_type é o tipo dos totais (INTEGER desde que os
+    valores são gravados em cêntimos, ver _store_money_in_cents).
+    """
+    money_columns = ", ".join(f"{field} {money_type} NOT NULL DEFAULT 0" for field in SUMMARY_FIELDS)
+    watched = ", ".join(["dataVenda", "regime_fiscal", "taxa"] + SUMMARY_FIELDS)
+
+    statements = [
+        f"""CREATE TABLE IF NOT EXISTS monthly_summary (
+                mes TEXT NOT NULL,
+                regime_fiscal TEXT NOT NULL,
+                taxa REAL NOT NULL,
+                veiculos INTEGER NOT NULL DEFAULT 0,
+                {money_columns},
+                PRIMARY KEY ({", ".join(SUMMARY_KEY)})
+            ) WITHOUT ROWID""",
+        "DELETE FROM monthly_summary",
+        summary_totals_sql("1", money_type),
+        f"""CREATE TRIGGER IF NOT EXISTS monthly_summary_insert AFTER INSERT ON vehicles BEGIN
+                {_summary_change("new.", 1, money_type)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS monthly_summary_delete AFTER DELETE ON vehicles BEGIN
+                {_summary_change("old.", -1, money_type)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS monthly_summary_update AFTER UPDATE OF {watched} ON vehicles BEGIN
+                {_summary_change("old.", -1, money_type)}
+                {_summary_change("new.", 1, money_type)}
+            END""",
+    ]
+    return all(_exec(database, statement) for statement in statements)
+
+
+def _create_order_indexes(database):
+    """Um índice (expressão, id) por ordenação de ORDER_EXPRESSIONS, para a paginação por chave."""
+    return all(_exec(database, f"CREATE INDEX IF NOT EXISTS idx_vehicles_order_{field} "
+                               f"ON vehicles ({expression}, id)")
+               for field, expression in ORDER_EXPRESSIONS.items())
+
+
+def _create_sold_order_indexes(database):
+    """Índice da ordenação por data de compra e um índice (vendido, expressão, id) por ordenação
+    de SOLD_ORDER_FIELDS, para que ordenar com o filtro "Vendidos"/"Em stock" não percorra as
+    linhas da outra classe.
+
+    Numa base de dados nova o primeiro já foi criado por _create_order_indexes.
+    """
+    indexes = {"idx_vehicles_order_dataCompra": f"{ORDER_EXPRESSIONS['dataCompra']}, id"}
+    indexes.update((f"idx_vehicles_sold_order_{field}", f"vendido, {ORDER_EXPRESSIONS[field]}, id")
+                   for field in SOLD_ORDER_FIELDS)
+    statements = [f"CREATE INDEX IF NOT EXISTS {name} ON vehicles ({columns})" for name, columns in indexes.items()]
+    if _has_table(database, "sqlite_stat1"):
+        # Com estatísticas (ANALYZE) só dos índices antigos, o planeador escolhe os novos mesmo
+        # quando não servem a ordenação (ex.: vendido = ? ORDER BY id)
+        statements += [f"ANALYZE {name}" for name in indexes]
+    return all(_exec(database, statement) for statement in statements)
+
+
+def _create_filter_indexes(database):
+    """Índices compostos dos critérios do painel de filtros (queries.CRITERIA): regime fiscal e
+    taxa com a data de venda, tipo de documento com a data de compra. Os intervalos de datas e
+    de valores usam os índices da ordenação.
+
+    A seguir, ANALYZE de toda a tabela: estes campos têm poucos valores distintos e, sem
+    estatísticas, o planeador usaria os índices novos mesmo quando percorrer a tabela por id é
+    mais rápido (ex.: só o regime fiscal, ordenado por id).
+    """
+    return all(_exec(database, statement) for statement in (
+        f"CREATE INDEX IF NOT EXISTS idx_vehicles_filter_regime "
+        f"ON vehicles (regime_fiscal, taxa, {ORDER_EXPRESSIONS['dataVenda']}, id)",
+        f"CREATE INDEX IF NOT EXISTS idx_vehicles_filter_document "
+        f"ON vehicles (tipoDocumento, {ORDER_EXPRESSIONS['dataCompra']}, id)",
+        "ANALYZE vehicles",
+    ))
+
+
+def _calendar_date(value):
+    # Com um modificador, date() acerta dias impossíveis ('2024-02-30' passa a '2024-03-01');
+    # sem ele devolvia o valor tal como está
+    return f"date({value}, '+0 days')"
+
+
+def _valid_date(column):
+    """Condição SQL: column é NULL ou uma data 'AAAA-MM-DD' que existe no calendário.
+
+    Nunca dá NULL: date() devolve NULL para meses e dias fora do intervalo ('2024-13-45'), e
+    com '=' a condição ficava NULL, que um WHERE NOT ou um trigger WHEN NOT deixavam passar.
+    """
+    return f"({column} IS NULL OR ({column} GLOB '{_ISO_DATE_GLOB}' AND {_calendar_date(column)} IS {column}))"
+
+
+def _normalised_date(column):
+    """Expressão SQL com o valor de column em 'AAAA-MM-DD', ou NULL se não for uma data.
+
+    Aceita as formas que formatting.parse_date lê (AAAA-MM-DD, DD-MM-AAAA, DD/MM/AAAA) e ainda
+    AAAA/MM/DD e datas com hora ("AAAA-MM-DD HH:MM:SS").
+    """
+    text = f"trim({column})"
+    candidate = f"""CASE
+            WHEN {text} GLOB '[0-9][0-9][0-9][0-9][-/][0-9][0-9][-/][0-9][0-9]*'
+                THEN replace(substr({text}, 1, 10), '/', '-')
+            WHEN {text} GLOB '[0-9][0-9][-/][0-9][0-9][-/][0-9][0-9][0-9][0-9]'
+                THEN substr({text}, 7, 4) || '-' || substr({text}, 4, 2) || '-' || substr({text}, 1, 2)
+        END"""
+    # Só fica a data se existir no calendário (ver _calendar_date)
+    return f"(SELECT value FROM (SELECT {candidate} AS value) WHERE {_calendar_date('value')} = value)"
+
+
+def _normalise_dates(database):
+    """Converte as datas de compra e de venda para 'AAAA-MM-DD' (ou NULL) e passa a validá-las.
+
+    Bases de dados antigas ou importadas à mão podem ter "" ou outros formatos, que ficavam
+    fora dos intervalos de datas e dos totais mensais. A conversão percorre a tabela por
+    blocos de DATE_BATCH_SIZE ids, cada um gravado na sua transação (numa tabela grande não
+    prende a base de dados nem faz crescer o WAL durante toda a migração), e só reescreve as
+    linhas com a data fora do formato; os triggers de 'monthly_summary' acertam os totais.
+    Se a migração falhar a meio, os blocos já gravados ficam convertidos e voltar a corrê-la
+    só trata os restantes. Valores que não são datas passam a NULL e são listados. Os
+    triggers criados no fim recusam datas inválidas (o equivalente a um CHECK, que o SQLite
+    não deixa acrescentar a uma tabela existente).
+    """
+    lost = _fetch_all(database, " UNION ALL ".join(
+        f"SELECT id, '{field}', {field} FROM vehicles "
+        f"WHERE TRIM(COALESCE({field}, '')) <> '' AND {_normalised_date(field)} IS NULL"
+        for field in DATE_FIELDS))
+    for vehicle_id, field, value in lost:
+        print(f"Data inválida removida: veículo {vehicle_id}, {field} = {value!r}")
+
+    last_id = (_fetch_one(database, "SELECT COALESCE(MAX(id), 0) FROM vehicles") or (0,))[0]
+    for first_id in range(0, last_id, DATE_BATCH_SIZE):
+        # Uma coluna de cada vez: alterar só dataCompra não dispara os triggers dos totais de vendas
+        for field in DATE_FIELDS:
+            if not _exec(database, f"UPDATE vehicles SET {field} = {_normalised_date(field)} "
+                                   f"WHERE id > {first_id} AND id <= {first_id + DATE_BATCH_SIZE} "
+                                   f"AND NOT {_valid_date(field)}"):
+                return False
+        if not _commit_batch(database):
+            return False
+
+    return _create_date_triggers(database)
+
+
+def _commit_batch(database):
+    """Grava o que a migração em curso já fez e abre uma nova transação (ver apply_migrations)."""
+    if isinstance(database, sqlite3.Connection):
+        return _exec(database, "COMMIT") and _exec(database, "BEGIN")
+    return database.commit() and database.transaction()
+
+
+def _create_check_triggers(database, name, fields, valid, message):
+    """Triggers que recusam (RAISE ABORT) inserções e alterações em que algum dos campos não
+    cumpre valid("new.campo"): o equivalente a um CHECK numa tabela já existente."""
+    check = " AND ".join(valid(f"new.{field}") for field in fields)
+    return all(_exec(database, statement) for statement in (
+        f"""CREATE TRIGGER IF NOT EXISTS vehicles_{name}_insert BEFORE INSERT ON vehicles
+            WHEN NOT ({check}) BEGIN
+                SELECT RAISE(ABORT, '{message}');
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS vehicles_{name}_update BEFORE UPDATE OF {", ".join(fields)} ON vehicles
+            WHEN NOT ({check}) BEGIN
+                SELECT RAISE(ABORT, '{message}');
+            END""",
+    ))
+
+
+def _create_date_triggers(database):
+    return _create_check_triggers(database, "dates", DATE_FIELDS, _valid_date, "Data inválida (formato AAAA-MM-DD)")
+
+
+# Caracteres ignorados num valor monetário gravado como texto (os mesmos que formatting.parse_number)
+_MONEY_TEXT_NOISE = (" ", "\u00a0", "\u202f", "€")
+
+
+def _euros_to_cents(number):
+    # O primeiro ROUND elimina o erro de representação do REAL (0.285 * 100 = 28.499999999999996);
+    # o segundo arredonda ao cêntimo com meio cêntimo para longe do zero, como money.to_cents
+    return f"CAST(ROUND(ROUND({number} * 100, 6)) AS INTEGER)"
+
+
+def _cents(column):
+    """Expressão SQL com o valor em euros de column em cêntimos (INTEGER), ou NULL se não for um número.
+
+    Bases de dados antigas têm colunas declaradas TEXT (ex.: 'imposto'), com valores como
+    '2300.0'; o texto numérico também é convertido, com as regras de formatting.parse_number:
+    espaços e '€' são ignorados e, havendo vírgula, esta é a decimal e os pontos separam os
+    milhares ("1.234,56").
+    """
+    text = f"trim({column})"
+    for noise in _MONEY_TEXT_NOISE:
+        text = f"replace({text}, '{noise}', '')"
+    # t: texto sem espaços; n: com ponto decimal; u: n sem o sinal
+    number = "CASE WHEN instr(t, ',') THEN replace(replace(t, '.', ''), ',', '.') ELSE t END"
+    parsed = f"""(SELECT {_euros_to_cents("CAST(n AS REAL)")}
+            FROM (SELECT n, CASE WHEN substr(n, 1, 1) IN ('+', '-') THEN substr(n, 2) ELSE n END AS u
+                  FROM (SELECT {number} AS n FROM (SELECT {text} AS t)))
+            WHERE u GLOB '*[0-9]*' AND NOT u GLOB '*[^0-9.]*' AND NOT u GLOB '*.*.*')"""
+    return (f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN {_euros_to_cents(column)} "
+            f"WHEN typeof({column}) = 'text' THEN {parsed} END")
+
+
+def _valid_cents(column):
+    """Condição SQL: column é NULL ou um inteiro (cêntimos)."""
+    return f"typeof({column}) IN ('integer', 'null')"
+
+
+def valid_vehicle_condition(prefix=""):
+    """Condição SQL verificada pelos triggers de validação, para a linha prefix ("new." ou ""):
+    datas 'AAAA-MM-DD' ou NULL e valores monetários em cêntimos inteiros ou NULL."""
+    return " AND ".join([_valid_date(f"{prefix}{field}") for field in DATE_FIELDS]
+                        + [_valid_cents(f"{prefix}{field}") for field in MONEY_FIELDS])
+
+
+def _store_money_in_cents(database):
+    """Passa os valores monetários (MONEY_FIELDS) de REAL em euros para INTEGER em cêntimos.
+
+    Com REAL as somas acumulavam erros de arredondamento e cada agregação convertia floats;
+    em cêntimos os totais de 'monthly_summary' e as comparações dos filtros são aritmética
+    inteira exata. O SQLite não muda o tipo de uma coluna, por isso 'vehicles' é reconstruída
+    (cópia para uma tabela nova com os mesmos ids, que fica com o nome da antiga) e os
+    índices, triggers e 'monthly_summary' são recriados pelas migrações que os criaram. O
+    índice de pesquisa fica como está: os ids não mudam. Valores que não são números passam
+    a NULL e são listados. Os triggers criados no fim recusam valores que não sejam inteiros.
+    """
+    lost = _fetch_all(database, " UNION ALL ".join(
+        f"SELECT id, '{field}', {field} FROM vehicles "
+        f"WHERE TRIM(COALESCE({field}, '')) <> '' AND {_cents(field)} IS NULL"
+        for field in MONEY_FIELDS))
+    for vehicle_id, field, value in lost:
+        print(f"Valor inválido removido: veículo {vehicle_id}, {field} = {value!r}")
+
+    columns = ", ".join(field for field, _ in _VEHICLE_COLUMNS)
+    values = ", ".join(_cents(field) if field in MONEY_FIELDS else field for field, _ in _VEHICLE_COLUMNS)
+    definitions = ",\n                ".join(f"{field} {column_type}" for field, column_type in _VEHICLE_COLUMNS)
+    sequence = _fetch_one(database, "SELECT seq FROM sqlite_sequence WHERE name = 'vehicles'")
+    statements = [
+        f"""CREATE TABLE vehicles_cents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {definitions},
+                vendido INTEGER GENERATED ALWAYS AS ({SOLD_EXPRESSION}) VIRTUAL
+            )""",
+        f"INSERT INTO vehicles_cents (id, {columns}) SELECT id, {values} FROM vehicles ORDER BY id",
+        "DROP TABLE vehicles",
+        "ALTER TABLE vehicles_cents RENAME TO vehicles",
+        "DROP TABLE IF EXISTS monthly_summary",
+    ]
+    if sequence:
+        # Mantém o último id atribuído (pode ser maior que o MAX(id) se os últimos foram apagados)
+        statements.append(f"UPDATE sqlite_sequence SET seq = MAX(seq, {int(sequence[0])}) WHERE name = 'vehicles'")
+    if not all(_exec(database, statement) for statement in statements):
+        return False
+
+    return (_add_sold_column(database)
+            and _create_search_index(database)
+            and _limit_search_update_trigger(database)
+            and _create_monthly_summary(database, money_type="INTEGER")
+            and _create_order_indexes(database)
+            and _create_sold_order_indexes(database)
+            and _create_filter_indexes(database)
+            and _create_date_triggers(database)
+            and _create_check_triggers(database, "money", MONEY_FIELDS, _valid_cents,
+                                       "Valor monetário inválido (cêntimos inteiros)"))
+
+
+def _drop_redundant_indexes(database):
+    """Remove os índices (vendido, expressão, id) das ordenações fora de SOLD_ORDER_FIELDS e o
+    índice só de 'vendido', que os índices compostos (começados por 'vendido') já cobrem.
+
+    São 5 índices a menos para atualizar em cada inserção (ex.: importação em massa). Os índices
+    (expressão, id) ficam: são eles que servem a grelha sem filtro, a vista por omissão.
+    """
+    names = ["idx_vehicles_vendido"] + [f"idx_vehicles_sold_order_{field}" for field in ORDER_EXPRESSIONS
+                                        if field not in SOLD_ORDER_FIELDS]
+    return all(_exec(database, f"DROP INDEX IF EXISTS {name}") for name in names)
+
+
+def _revalidate_dates(database):
+    """Volta a validar as datas com _valid_date corrigida.
+
+    A condição anterior dava NULL (e não falso) para datas com o formato certo mas fora do
+    calendário ('2023-13-45', '2024-00-10'): a migração 10 deixava-as ficar e os triggers
+    aceitavam-nas (com linhas como '2024-00' em 'monthly_summary'). Os triggers são recriados
+    e essas datas passam a NULL; os triggers de 'monthly_summary' retiram-nas dos totais.
+    """
+    return (all(_exec(database, f"DROP TRIGGER IF EXISTS vehicles_dates_{event}") for event in ("insert", "update"))
+            and _normalise_dates(database))
+
+
+# Lista ordenada: a migração na posição i leva a base de dados à versão i + 1.
+# Novas alterações ao esquema são acrescentadas no fim; nunca alterar as existentes.
+MIGRATIONS = [
+    _create_vehicles_table,
+    _add_missing_columns,
+    _add_sold_column,
+    _create_search_index,
+    _limit_search_update_trigger,
+    _create_monthly_summary,
+    _create_order_indexes,
+    _create_sold_order_indexes,
+    _create_filter_indexes,
+    _normalise_dates,
+    _store_money_in_cents,
+    _drop_redundant_indexes,
+    _revalidate_dates,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(database):
+    row = _fetch_one(database, "PRAGMA user_version")
+    return row[0] if row else 0
+
+
+def apply_migrations(database):
+    """Aplica as migrações em falta, cada uma na sua transação, e atualiza PRAGMA user_version."""
+    # Numa sqlite3.Connection as transações são explícitas (isolation_level=None)
+    begin = database.transaction if not isinstance(database, sqlite3.Connection) \
+        else lambda: _exec(database, "BEGIN")
+    current = schema_version(database)
+    for version in range(current + 1, SCHEMA_VERSION + 1):
+        migration = MIGRATIONS[version - 1]
+        begin()
+        if not migration(database) or not _exec(database, f"PRAGMA user_version = {version}"):
+            database.rollback()
+            print(f"Erro ao aplicar a migração {version} ({migration.__name__})")
+            return False
+        database.commit()
+        print(f"Base de dados migrada para a versão {version} ({migration.__name__})")
+    return True
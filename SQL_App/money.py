@@ -0,0 +1,38 @@
+# money.py
+#
+# Valores monetários: gravados na base de dados como INTEGER em cêntimos, para que as somas e
+# as comparações no SQLite sejam exatas e feitas com inteiros. Dentro da aplicação circulam em
+# cêntimos; a conversão de e para euros é feita nas pontas (formulário, importação, exportação,
+# cálculo dos impostos e critérios dos filtros) com as funções deste módulo. Não depende do Qt.
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Colunas de 'vehicles' em cêntimos
+MONEY_FIELDS = ["isv", "valorCompra", "valorVenda", "imposto", "valorBase"]
+
+_CENT = Decimal("0.01")
+
+
+def to_cents(value):
+    """Converte euros (int, float, Decimal ou texto como "1234.5") em cêntimos (int).
+
+    Arredonda ao cêntimo com meio cêntimo para longe do zero, como o formulário. None e ""
+    dão None; valores que não são números finitos levantam ValueError.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value * 100
+    try:
+        number = value if isinstance(value, Decimal) else Decimal(str(value))
+        return int(number.quantize(_CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, ValueError) as e:
+        raise ValueError(f"Valor monetário inválido: {value!r}") from e
+
+
+def to_euros(cents):
+    """Converte cêntimos em euros (Decimal exato com 2 casas). None dá None."""
+    if cents is None:
+        return None
+    return Decimal(int(cents)).scaleb(-2)
+
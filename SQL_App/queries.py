@@ -0,0 +1,313 @@
+# queries.py
+#
+# Colunas e SQL partilhados pelos dois backends de dados: QtSql (database.py) e sqlite3
+# (sqlite_repository.py). Não depende do Qt. Os parâmetros são sempre nomeados (":nome");
+# os valores vêm em dicionários sem os dois pontos.
+
+from migrations import (
+    ORDER_EXPRESSIONS, SEARCH_COLUMNS, SUMMARY_FIELDS, SUMMARY_KEY, summary_totals_sql, valid_vehicle_condition
+)
+from money import MONEY_FIELDS, to_cents
+
+# Perfil de PRAGMAs aplicado sempre que uma ligação é aberta. A ordem conta: journal_mode
+# tem de ser definido antes de qualquer transação (incluindo as migrações).
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",  # leituras não bloqueiam enquanto se grava
+    "synchronous": "NORMAL",  # seguro com WAL; evita um fsync por commit
+    "cache_size": -64000,  # valores negativos são KiB (~64 MB de cache de páginas)
+    "mmap_size": 268435456,  # 256 MB lidos por memory-map
+    "temp_store": "MEMORY",  # tabelas temporárias e ordenações em memória
+    "busy_timeout": 5000,  # ms à espera de um lock antes de falhar
+}
+# Corrido antes de fechar as ligações: atualiza as estatísticas do planeador (ANALYZE) das
+# tabelas consultadas que cresceram muito ou têm índices ainda sem estatísticas
+OPTIMIZE_SQL = "PRAGMA optimize"
+
+# Colunas editáveis de 'vehicles', pela ordem usada nas inserções
+VEHICLE_FIELDS = ["matricula", "marca", "numeroQuadro", "isv", "nRegistoContabilidade",
+                  "dataCompra", "docCompra", "tipoDocumento", "valorCompra",
+                  "dataVenda", "docVenda", "valorVenda", "imposto", "valorBase", "taxa", "regime_fiscal"]
+
+BULK_BATCH_SIZE = 5000
+
+# Colunas da grelha, pela ordem das linhas devolvidas por fetch_expenses_page ("vendido" é sempre a última)
+GRID_FIELDS = ["id", "matricula", "marca", "valorCompra", "docVenda", "valorVenda", "imposto", "valorBase",
+               "dataVenda", "dataCompra", "vendido"]
+PAGE_SIZE = 500
+
+# Critérios do painel de filtros avançados (filter_panel.py): chave -> (campo, operador).
+# Os intervalos são inclusivos e comparam a expressão de ORDER_EXPRESSIONS do campo, para
+# usar os mesmos índices da ordenação; as datas são 'AAAA-MM-DD' e os valores são em euros
+# (convertidos para cêntimos, como estão gravados).
+CRITERIA = {
+    "purchase_from": ("dataCompra", ">="),
+    "purchase_to": ("dataCompra", "<="),
+    "sale_from": ("dataVenda", ">="),
+    "sale_to": ("dataVenda", "<="),
+    "min_purchase_value": ("valorCompra", ">="),
+    "max_purchase_value": ("valorCompra", "<="),
+    "min_sale_value": ("valorVenda", ">="),
+    "max_sale_value": ("valorVenda", "<="),
+    "regime_fiscal": ("regime_fiscal", "="),
+    "taxa": ("taxa", "="),
+    "tipoDocumento": ("tipoDocumento", "="),
+}
+# Limite superior de uma data -> limite inferior do mesmo intervalo
+_DATE_RANGES = {"purchase_to": "purchase_from", "sale_to": "sale_from"}
+FILTER_KEYS = ("sold", "search_text") + tuple(CRITERIA)
+
+# Campos com autocompletar (índice em memória de completion.py)
+COMPLETION_FIELDS = ("marca", "matricula")
+
+# Todas as colunas de um veículo, pela ordem da tabela (usadas na exportação)
+EXPORT_FIELDS = ["id"] + VEHICLE_FIELDS
+EXPORT_CHUNK_SIZE = 2000
+
+# Campos lidos pela verificação dos impostos (tax_audit.py)
+TAX_FIELDS = ["id", "regime_fiscal", "valorCompra", "valorVenda", "taxa", "valorBase", "imposto"]
+TAX_CHUNK_SIZE = 5000
+
+# Colunas devolvidas por fetch_monthly_summary
+MONTHLY_SUMMARY_FIELDS = SUMMARY_KEY + ["veiculos"] + SUMMARY_FIELDS
+
+
+# --- Escrita ---
+
+UPDATE_VEHICLE_SQL = (f"UPDATE vehicles SET {', '.join(f'{field} = :{field}' for field in VEHICLE_FIELDS)} "
+                      f"WHERE id = :id")
+INSERT_VEHICLE_SQL = (f"INSERT INTO vehicles ({', '.join(VEHICLE_FIELDS)}) "
+                      f"VALUES ({', '.join(f':{field}' for field in VEHICLE_FIELDS)})")
+# Versão posicional, para as inserções em lote (valores pela ordem de VEHICLE_FIELDS)
+BULK_INSERT_SQL = (f"INSERT INTO vehicles ({', '.join(VEHICLE_FIELDS)}) "
+                   f"VALUES ({', '.join('?' for _ in VEHICLE_FIELDS)})")
+DELETE_VEHICLE_SQL = "DELETE FROM vehicles WHERE id = :id"
+LAST_ID_SQL = "SELECT COALESCE(MAX(id), 0) FROM vehicles"
+# A inserção em lote desliga os triggers de inserção de 'vehicles' (índice de pesquisa, totais
+# mensais e validação das datas e dos valores), que corriam linha a linha, e faz o mesmo
+# trabalho no fim de cada lote, de uma só vez para as linhas novas (id > :last_id). Os triggers
+# são lidos de sqlite_master no início do lote e recriados tal como estavam.
+BULK_TRIGGERS = ["vehicles_fts_insert", "monthly_summary_insert", "vehicles_dates_insert", "vehicles_money_insert"]
+BULK_TRIGGERS_SQL = (f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                     f"AND name IN ({', '.join(repr(name) for name in BULK_TRIGGERS)})")
+INVALID_NEW_ROWS_SQL = (f"SELECT matricula FROM vehicles WHERE id > :last_id "
+                        f"AND NOT ({valid_vehicle_condition()}) LIMIT 1")
+INDEX_NEW_ROWS_SQL = (f"INSERT INTO vehicles_fts(rowid, {', '.join(SEARCH_COLUMNS)}) "
+                      f"SELECT id, {', '.join(SEARCH_COLUMNS)} FROM vehicles WHERE id > :last_id")
+SUMMARY_NEW_ROWS_SQL = summary_totals_sql("id > :last_id")
+UPDATE_TAX_SQL = "UPDATE vehicles SET valorBase = ?, imposto = ? WHERE id = ?"
+
+
+# --- Leitura ---
+
+VEHICLE_BY_ID_SQL = f"SELECT {', '.join(EXPORT_FIELDS)} FROM vehicles WHERE id = :id"
+TAX_ROWS_SQL = f"SELECT {', '.join(TAX_FIELDS)} FROM vehicles WHERE id > :after_id ORDER BY id LIMIT :limit"
+
+
+def unique_values_sql(field):
+    return f"SELECT DISTINCT {field} FROM vehicles ORDER BY {field} COLLATE NOCASE"
+
+
+def value_counts_sql(field):
+    """SQL de fetch_value_counts: [(valor, nº de veículos)] dos valores não vazios do campo."""
+    if field not in COMPLETION_FIELDS:
+        raise ValueError(f"Campo sem autocompletar: {field!r}")
+    return f"SELECT {field}, COUNT(*) FROM vehicles WHERE COALESCE({field}, '') <> '' GROUP BY {field}"
+
+
+def _escape_like(term):
+    # '%' e '_' pesquisados são texto, como no search_cache (que compara literalmente)
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search_condition(search_text):
+    """Converte o texto pesquisado numa condição SQL sobre 'vehicles_fts'.
+
+    Cada palavra tem de aparecer em algum dos campos indexados. Palavras com 3 ou mais
+    caracteres usam o índice trigram (MATCH); as mais curtas não têm trigramas e são
+    comparadas com LIKE, com '%' e '_' escapados (valem como texto). Devolve
+    (condição, valores, usa_match) ou None se não houver termos.
+    """
+    terms = search_text.split()
+    if not terms:
+        return None
+
+    conditions = []
+    values = {}
+    match_terms = ['"' + term.replace('"', '""') + '"' for term in terms if len(term) >= 3]
+    if match_terms:
+        conditions.append("vehicles_fts MATCH :match")
+        values["match"] = " AND ".join(match_terms)
+
+    short_terms = [term for term in terms if len(term) < 3]
+    for i, term in enumerate(short_terms):
+        key = f"short{i}"
+        like = " OR ".join(f"vehicles_fts.{column} LIKE :{key} ESCAPE '\\'" for column in SEARCH_COLUMNS)
+        conditions.append(f"({like})")
+        values[key] = f"%{_escape_like(term)}%"
+
+    return " AND ".join(conditions), values, bool(match_terms)
+
+
+def order_expression(order_by):
+    """Devolve (expressão, descendente) para order_by ("campo" ou "-campo"); None para o id."""
+    descending = order_by.startswith("-")
+    field = order_by[1:] if descending else order_by
+    if field == "id":
+        return None, descending
+    if field not in ORDER_EXPRESSIONS:
+        raise ValueError(f"Ordenação não suportada: {order_by!r}")
+    return ORDER_EXPRESSIONS[field], descending
+
+
+def criteria_conditions(criteria, table=""):
+    """Converte os critérios do painel de filtros (ver CRITERIA) em (condições SQL, valores).
+
+    Critérios None ou "" são ignorados. table é o prefixo das colunas (ex.: "v.") quando a
+    consulta junta outras tabelas. Um intervalo de datas só com o limite superior deixa de
+    fora os veículos sem data.
+    """
+    conditions = []
+    values = {}
+    for key, value in (criteria or {}).items():
+        if value is None or value == "":
+            continue
+        if key not in CRITERIA:
+            raise ValueError(f"Critério desconhecido: {key!r}")
+        field, operator = CRITERIA[key]
+        if operator == "=":
+            conditions.append(f"{table}{field} = :{key}")
+        else:
+            expression = ORDER_EXPRESSIONS[field].replace(field, table + field)
+            conditions.append(f"{expression} {operator} :{key}")
+            if key in _DATE_RANGES and not criteria.get(_DATE_RANGES[key]):
+                conditions.append(f"{expression} > ''")
+        values[key] = to_cents(value) if field in MONEY_FIELDS else value
+    return conditions, values
+
+
+def filter_conditions(filters):
+    """Converte os filtros ({"sold": bool, "search_text": str} e os critérios de CRITERIA) em
+    (condições SQL, valores)."""
+    filters = filters or {}
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Filtros desconhecidos: {', '.join(sorted(unknown))}")
+
+    conditions, values = criteria_conditions({key: filters[key] for key in CRITERIA if key in filters})
+    sold = filters.get("sold")
+    if sold is not None:
+        conditions.append("vendido = :vendido")
+        values["vendido"] = 1 if sold else 0
+    search = build_search_condition(filters.get("search_text") or "")
+    if search is not None:
+        condition, search_values, _ = search
+        conditions.append(f"id IN (SELECT rowid FROM vehicles_fts WHERE {condition})")
+        values.update(search_values)
+    return conditions, values
+
+
+def page_sql(fields, after_key, limit, order_by, filters):
+    """SQL de uma página por chave (keyset), sem OFFSET: cada página começa diretamente no
+    índice de ordenação, por isso a página N custa o mesmo que a primeira.
+
+    A última coluna selecionada é o valor da ordenação (a chave vem dela e do id).
+    Devolve (sql, valores, ordenado_por_expressão).
+    """
+    expression, descending = order_expression(order_by)
+    conditions, values = filter_conditions(filters)
+    direction, comparison = ("DESC", "<") if descending else ("ASC", ">")
+
+    if expression is None:
+        sort_key = "id"
+        order = f"id {direction}"
+        if after_key is not None:
+            conditions.append(f"id {comparison} :after_id")
+            values["after_id"] = after_key[0]
+    else:
+        sort_key = expression
+        order = f"{expression} {direction}, id {direction}"
+        if after_key is not None:
+            # A primeira condição (redundante) é a que permite ao SQLite procurar no índice
+            conditions.append(f"{expression} {comparison}= :after_value "
+                              f"AND ({expression}, id) {comparison} (:after_value, :after_id)")
+            values["after_value"], values["after_id"] = after_key
+
+    sql = f"SELECT {', '.join(fields)}, {sort_key} FROM vehicles"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {order}"
+    if limit is not None:
+        sql += " LIMIT :limit"
+        values["limit"] = limit
+    return sql, values, expression is not None
+
+
+def page_key(rows, sort_value, limit, keyed):
+    """Chave da página seguinte (ver page_sql), ou None quando não há mais linhas."""
+    if not rows or (limit is not None and len(rows) < limit):
+        return None
+    last_id = rows[-1][0]
+    return (sort_value, last_id) if keyed else (last_id,)
+
+
+def expense_row_sql(sold=None, search_text="", criteria=None):
+    """SQL de fetch_expense_row: a linha da grelha de um veículo (:id), se passar nos filtros."""
+    sql = f"SELECT {', '.join(GRID_FIELDS)} FROM vehicles WHERE id = :id"
+    conditions, values = criteria_conditions(criteria)
+    for condition in conditions:
+        sql += f" AND {condition}"
+    if sold is not None:
+        sql += " AND vendido = :vendido"
+        values["vendido"] = 1 if sold else 0
+    if search_text.strip():
+        condition, search_values, _ = build_search_condition(search_text)
+        sql += f" AND id IN (SELECT rowid FROM vehicles_fts WHERE {condition})"
+        values.update(search_values)
+    return sql, values
+
+
+def search_sql(search_text, limit=100, offset=0, sold=None, with_search_text=False, criteria=None):
+    """SQL de search_vehicles, por ordem de relevância. Devolve (sql, valores) ou None sem termos."""
+    search = build_search_condition(search_text)
+    if search is None:
+        return None
+    condition, values, ranked = search
+
+    sql = f"SELECT {', '.join(f'v.{field}' for field in GRID_FIELDS)}"
+    if with_search_text:
+        sql += ", " + ", ".join(f"v.{column}" for column in SEARCH_COLUMNS)
+    sql += (" FROM vehicles_fts JOIN vehicles v ON v.id = vehicles_fts.rowid "
+            f"WHERE {condition}")
+    if sold is not None:
+        sql += " AND v.vendido = :vendido"
+        values["vendido"] = 1 if sold else 0
+    conditions, criteria_values = criteria_conditions(criteria, table="v.")
+    for condition in conditions:
+        sql += f" AND {condition}"
+    values.update(criteria_values)
+    # Sem MATCH não há 'rank' (bm25); nesse caso mantém-se a ordem por id
+    sql += " ORDER BY rank, v.id" if ranked else " ORDER BY v.id"
+    sql += " LIMIT :limit OFFSET :offset"
+    values["limit"] = limit
+    values["offset"] = offset
+    return sql, values
+
+
+def monthly_summary_sql(first_month=None, last_month=None):
+    """SQL de fetch_monthly_summary (meses 'AAAA-MM', inclusive; totais em cêntimos). Devolve (sql, valores)."""
+    conditions = []
+    values = {}
+    if first_month:
+        conditions.append("mes >= :first_month")
+        values["first_month"] = first_month
+    if last_month:
+        conditions.append("mes <= :last_month")
+        values["last_month"] = last_month
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return (f"SELECT {', '.join(MONTHLY_SUMMARY_FIELDS)} FROM monthly_summary {where} "
+            f"ORDER BY mes, regime_fiscal, taxa"), values
+
+
+def search_text_of(row_values):
+    """Texto dos campos indexados de uma linha, em minúsculas e separados por '\\n' (search_cache)."""
+    return "\n".join(str(value) for value in row_values).lower()
@@ -0,0 +1,188 @@
+# report.py
+
+from PyQt6.QtCore import QThread, QMarginsF, QRectF, Qt, pyqtSignal
+from PyQt6.QtGui import QPainter, QPdfWriter, QPageSize, QPageLayout, QFont, QFontMetricsF, QColor, QPen
+
+from formatting import format_cents
+from queries import EXPORT_FIELDS
+from repository import repository
+
+# Colunas do relatório (as mesmas que a grelha mostra): (título, campo, peso da largura, é valor monetário)
+REPORT_COLUMNS = [
+    ("Matrícula", "matricula", 1.2, False),
+    ("Marca", "marca", 1.4, False),
+    ("Valor Compra", "valorCompra", 1.0, True),
+    ("Doc. Venda", "docVenda", 1.2, False),
+    ("Valor Venda", "valorVenda", 1.0, True),
+    ("Imposto", "imposto", 1.0, True),
+    ("Valor Base", "valorBase", 1.0, True),
+]
+
+HEADER_BACKGROUND = QColor("#4caf50")
+GRID_COLOR = QColor("#000000")
+
+
+class ReportRenderer:
+    """Desenha a tabela de veículos página a página num QPagedPaintDevice (QPrinter ou QPdfWriter).
+
+    As linhas são consumidas de um iterador e cada página é enviada para o dispositivo assim
+    que fica completa, por isso a memória usada não depende do número de registos. O cabeçalho
+    da tabela repete-se em todas as páginas.
+    """
+
+    def __init__(self, title="Registos de Veículos", columns=REPORT_COLUMNS):
+        self.title = title
+        self.columns = columns
+        self._positions = [EXPORT_FIELDS.index(field) for _, field, _, _ in columns]
+
+    def format_row(self, row):
+        values = []
+        for position, (_, _, _, is_money) in zip(self._positions, self.columns):
+            value = row[position]
+            if value is None or value == "":
+                values.append("")
+            elif is_money:
+                values.append(format_cents(value))
+            else:
+                values.append(str(value))
+        return values
+
+    def render(self, device, rows, progress=None, is_cancelled=None):
+        """Desenha todas as linhas. Devolve o número de linhas desenhadas (None se cancelado)."""
+        painter = QPainter()
+        if not painter.begin(device):
+            raise OSError("Não foi possível iniciar a impressão/escrita do relatório.")
+
+        try:
+            body_font = QFont("Arial", 9)
+            header_font = QFont("Arial", 9, QFont.Weight.Bold)
+            title_font = QFont("Arial", 14, QFont.Weight.Bold)
+            body_metrics = QFontMetricsF(body_font, device)
+            title_metrics = QFontMetricsF(title_font, device)
+
+            page_width = device.width()
+            page_height = device.height()
+            row_height = body_metrics.height() * 1.6
+            padding = body_metrics.averageCharWidth()
+            footer_height = row_height
+
+            total_weight = sum(weight for _, _, weight, _ in self.columns)
+            widths = [page_width * weight / total_weight for _, _, weight, _ in self.columns]
+            pen = QPen(GRID_COLOR)
+            pen.setWidthF(max(1.0, device.logicalDpiX() / 150))
+            painter.setPen(pen)
+
+            page_number = 1
+            count = 0
+
+            def draw_cells(y, texts, font, background=None):
+                painter.setFont(font)
+                x = 0.0
+                for width, text in zip(widths, texts):
+                    cell = QRectF(x, y, width, row_height)
+                    if background is not None:
+                        painter.fillRect(cell, background)
+                    painter.drawRect(cell)
+                    text_rect = cell.adjusted(padding, 0, -padding, 0)
+                    elided = QFontMetricsF(font, device).elidedText(text, Qt.TextElideMode.ElideRight,
+                                                                     text_rect.width())
+                    painter.drawText(text_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, elided)
+                    x += width
+
+            def start_page(y):
+                painter.setPen(QPen(QColor("white")))
+                draw_cells(y, [title for title, _, _, _ in self.columns], header_font, HEADER_BACKGROUND)
+                painter.setPen(pen)
+                # Redesenha as linhas da grelha do cabeçalho por cima do texto branco
+                x = 0.0
+                for width in widths:
+                    painter.drawRect(QRectF(x, y, width, row_height))
+                    x += width
+                return y + row_height
+
+            def draw_footer():
+                painter.setFont(body_font)
+                painter.drawText(QRectF(0, page_height - footer_height, page_width, footer_height),
+                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                                 f"Página {page_number}")
+
+            painter.setFont(title_font)
+            title_height = title_metrics.height() * 1.8
+            painter.drawText(QRectF(0, 0, page_width, title_height),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, self.title)
+            y = start_page(title_height)
+
+            for row in rows:
+                if y + row_height > page_height - footer_height:
+                    draw_footer()
+                    device.newPage()
+                    page_number += 1
+                    y = start_page(0)
+                    if progress is not None:
+                        progress(count)
+                    if is_cancelled is not None and is_cancelled():
+                        return None
+                draw_cells(y, self.format_row(row), body_font)
+                y += row_height
+                count += 1
+
+            draw_footer()
+            return count
+        finally:
+            painter.end()
+
+
+def create_pdf_writer(path):
+    """QPdfWriter em A4 horizontal, adequado a tabelas largas."""
+    writer = QPdfWriter(path)
+    writer.setResolution(300)
+    writer.setPageLayout(QPageLayout(QPageSize(QPageSize.PageSizeId.A4), QPageLayout.Orientation.Landscape,
+                                     QMarginsF(12, 12, 12, 12), QPageLayout.Unit.Millimeter))
+    writer.setTitle("Registos de Veículos")
+    return writer
+
+
+class ReportWorker(QThread):
+    """Gera o relatório fora da thread da interface.
+
+    A thread usa a sua própria ligação à base de dados (as ligações não podem ser partilhadas
+    entre threads), fechada no fim. Indique pdf_path para escrever um PDF sem diálogo de impressão
+    ou printer para imprimir num QPrinter já configurado.
+    """
+
+    progress = pyqtSignal(int)
+    completed = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    def __init__(self, sold=None, search_text="", pdf_path=None, printer=None, parent=None, order_by="id",
+                 criteria=None):
+        super().__init__(parent)
+        self.sold = sold
+        self.search_text = search_text
+        self.order_by = order_by
+        self.criteria = criteria
+        self.pdf_path = pdf_path
+        self.printer = printer
+
+    def run(self):
+        try:
+            self._render()
+        except Exception as e:
+            # Qualquer erro (ficheiro, consulta ou desenho) chega à interface em vez de terminar a
+            # thread em silêncio com o diálogo de progresso à espera
+            self.failed.emit(str(e) or type(e).__name__)
+        finally:
+            repository().close_thread_connection()
+
+    def _render(self):
+        # Método separado para que a consulta e o QPdfWriter sejam libertados antes de fechar a ligação
+        device = self.printer if self.printer is not None else create_pdf_writer(self.pdf_path)
+        rows = repository().iter_vehicles(sold=self.sold, search_text=self.search_text, order_by=self.order_by,
+                                          criteria=self.criteria)
+        try:
+            count = ReportRenderer().render(device, rows, progress=self.progress.emit,
+                                            is_cancelled=self.isInterruptionRequested)
+        finally:
+            rows.close()
+        if count is not None:
+            self.completed.emit(count)
@@ -0,0 +1,195 @@
+# repository.py
+#
+# Repositório de veículos: a interface usada pela interface gráfica e pelas ferramentas, com dois
+# backends que executam o mesmo SQL (queries.py):
+#   "qtsql"   - database.py, sobre a ligação por omissão do QtSql (connection.py);
+#   "sqlite3" - sqlite_repository.py, só com a biblioteca padrão (não carrega o Qt).
+#
+# open_repository() escolhe o backend e repository() devolve o que está aberto.
+
+import os
+from abc import ABC, abstractmethod, update_abstractmethods
+
+from queries import BULK_BATCH_SIZE, EXPORT_CHUNK_SIZE, PAGE_SIZE, TAX_CHUNK_SIZE
+
+BACKENDS = ("qtsql", "sqlite3")
+DEFAULT_BACKEND = os.environ.get("SQL_APP_BACKEND", "qtsql")
+
+
+class VehicleRepository(ABC):
+    """Operações sobre a tabela 'vehicles'. Os resultados e os erros (mensagem impressa e
+    None/[]) são os mesmos nos dois backends; ver database.py para a descrição de cada uma.
+    Os valores monetários (money.MONEY_FIELDS) são lidos e gravados em cêntimos (int).
+
+    Cada thread usa a sua própria ligação, aberta na primeira operação.
+    """
+
+    backend = None
+
+    @abstractmethod
+    def add_expense_to_db(self, matricula, marca, numeroQuadro, isv, nRegistoContabilidade,
+                          dataCompra, docCompra, tipoDocumento, valorCompra,
+                          dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, regime_fiscal):
+        pass
+
+    @abstractmethod
+    def update_expense_in_db(self, id, data):
+        pass
+
+    @abstractmethod
+    def delete_expense_from_db(self, id):
+        pass
+
+    @abstractmethod
+    def add_expenses_bulk(self, records, batch_size=BULK_BATCH_SIZE, progress=None):
+        pass
+
+    @abstractmethod
+    def fetch_expenses_page(self, after_key=None, limit=PAGE_SIZE, order_by="id", filters=None):
+        pass
+
+    @abstractmethod
+    def fetch_expenses(self, after_id=None, limit=None, sold=None):
+        pass
+
+    @abstractmethod
+    def fetch_expense_row(self, vehicle_id, sold=None, search_text="", criteria=None):
+        pass
+
+    @abstractmethod
+    def fetch_vehicle_by_id(self, vehicle_id):
+        pass
+
+    @abstractmethod
+    def fetch_unique_marcas(self):
+        pass
+
+    @abstractmethod
+    def fetch_unique_matriculas(self):
+        pass
+
+    @abstractmethod
+    def fetch_value_counts(self, field):
+        pass
+
+    @abstractmethod
+    def search_vehicles(self, search_text, limit=100, offset=0, sold=None, with_search_text=False,
+                        criteria=None):
+        pass
+
+    @abstractmethod
+    def iter_vehicles(self, sold=None, search_text="", chunk_size=EXPORT_CHUNK_SIZE, order_by="id",
+                      criteria=None):
+        pass
+
+    @abstractmethod
+    def iter_tax_rows(self, chunk_size=TAX_CHUNK_SIZE):
+        pass
+
+    @abstractmethod
+    def update_tax_values(self, values):
+        pass
+
+    @abstractmethod
+    def fetch_monthly_summary(self, first_month=None, last_month=None):
+        pass
+
+    @abstractmethod
+    def execute_sql(self, sql, values=None):
+        pass
+
+    @abstractmethod
+    def close_thread_connection(self):
+        """Fecha a ligação da thread atual (threads de curta duração, ex.: relatórios)."""
+
+    @abstractmethod
+    def close(self):
+        pass
+
+
+# Operações que o backend QtSql vai buscar diretamente a database.py
+_OPERATIONS = [name for name, value in vars(VehicleRepository).items()
+               if callable(value) and not name.startswith("_") and not name.startswith("close")]
+
+
+class QtSqlRepository(VehicleRepository):
+    """Backend QtSql: as funções de database.py sobre a ligação por omissão do Qt.
+
+    Precisa de uma QCoreApplication/QApplication criada antes (para carregar o driver QSQLITE).
+    """
+
+    backend = "qtsql"
+
+    def __init__(self, db_name, pragmas=None):
+        import database
+        from connection import open_database
+
+        self.db_name = db_name
+        self.opened = open_database(db_name, pragmas)
+        for name in _OPERATIONS:
+            setattr(self, name, getattr(database, name))
+
+    def close_thread_connection(self):
+        from connection import close_thread_database
+        close_thread_database()
+
+    def close(self):
+        from connection import close_database
+        close_database()
+
+
+def _database_operation(name):
+    # Implementação da classe: cada instância liga logo a função de database.py (ver __init__),
+    # mas a ABC precisa de ver as operações definidas na própria classe
+    def operation(self, *args, **kwargs):
+        import database
+        return getattr(database, name)(*args, **kwargs)
+
+    operation.__name__ = name
+    return operation
+
+
+for _name in _OPERATIONS:
+    setattr(QtSqlRepository, _name, _database_operation(_name))
+update_abstractmethods(QtSqlRepository)
+
+
+_repository = None
+
+
+def open_repository(db_name, backend=None, pragmas=None):
+    """Abre a base de dados com o backend indicado (por omissão DEFAULT_BACKEND, que pode ser
+    escolhido com a variável de ambiente SQL_APP_BACKEND) e aplica as migrações pendentes.
+
+    Fecha o repositório que estiver aberto. Devolve o repositório, ou None em caso de erro.
+    """
+    global _repository
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend!r} (disponíveis: {', '.join(BACKENDS)})")
+    close_repository()
+
+    if backend == "sqlite3":
+        from sqlite_repository import SqliteRepository
+        opened = SqliteRepository(db_name, pragmas)
+    else:
+        opened = QtSqlRepository(db_name, pragmas)
+    if not opened.opened:
+        opened.close()
+        return None
+    _repository = opened
+    return _repository
+
+
+def repository():
+    """Devolve o repositório aberto por open_repository."""
+    if _repository is None:
+        raise RuntimeError("Nenhuma base de dados aberta (ver repository.open_repository)")
+    return _repository
+
+
+def close_repository():
+    global _repository
+    if _repository is not None:
+        _repository.close()
+        _repository = None
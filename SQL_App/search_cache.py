@@ -0,0 +1,99 @@
+# search_cache.py
+
+from collections import OrderedDict
+
+from queries import GRID_FIELDS
+
+# Pesquisas com mais resultados do que isto não ficam em cache (são lidas por blocos)
+SEARCH_CACHE_MAX_ROWS = 20000
+SEARCH_CACHE_MAX_ENTRIES = 16
+
+_GRID_COLUMNS = len(GRID_FIELDS)
+
+
+def search_terms(search_text):
+    return search_text.lower().split()
+
+
+def is_cacheable(search_text):
+    """Só se guardam pesquisas com algum termo de 3 ou mais caracteres (as que usam o índice
+    trigram); termos curtos devolvem quase toda a tabela."""
+    return any(len(term) >= 3 for term in search_terms(search_text))
+
+
+def _narrows(terms, cached_terms):
+    # Cada termo da pesquisa em cache aparece dentro de algum termo da nova pesquisa, por isso
+    # qualquer veículo que passe na nova pesquisa também passou na antiga ("MER" -> "MERC")
+    return all(any(cached in term for term in terms) for cached in cached_terms)
+
+
+class SearchCache:
+    """Resultados completos de pesquisas recentes, por (texto, filtros).
+
+    filters é um valor imutável que identifica os restantes filtros da grelha (venda e
+    critérios do painel de filtros); só pesquisas com os mesmos filtros se aproveitam.
+
+    Uma pesquisa que estreita outra já em cache é resolvida filtrando essa lista em memória,
+    com as mesmas regras que queries.build_search_condition (cada termo tem de aparecer
+    num dos campos indexados, sem distinguir maiúsculas). A lista filtrada mantém a ordem
+    de relevância da pesquisa de onde partiu. clear() deve ser chamado sempre que os dados mudam.
+    """
+
+    def __init__(self, max_entries=SEARCH_CACHE_MAX_ENTRIES, max_rows=SEARCH_CACHE_MAX_ROWS):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries = OrderedDict()  # (termos, filters) -> (linhas, textos) (LRU)
+
+    def clear(self):
+        self._entries.clear()
+
+    def store(self, search_text, filters, rows):
+        """Guarda o resultado completo de search_vehicles(..., with_search_text=True).
+
+        Devolve as linhas no formato da grelha, ou None se o resultado for grande demais.
+        """
+        if len(rows) > self.max_rows:
+            return None
+        grid_rows = [row[:_GRID_COLUMNS] for row in rows]
+        self._put((tuple(search_terms(search_text)), filters), grid_rows, [row[_GRID_COLUMNS] for row in rows])
+        return list(grid_rows)
+
+    def lookup(self, search_text, filters):
+        """Devolve uma cópia das linhas que respondem à pesquisa, ou None se não estiver em cache."""
+        terms = search_terms(search_text)
+        key = (tuple(terms), filters)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return list(entry[0])
+
+        base = self._find_base(terms, filters)
+        if base is None:
+            return None
+        base_rows, base_texts = self._entries[base]
+        rows, texts = [], []
+        for row, text in zip(base_rows, base_texts):
+            if all(term in text for term in terms):
+                rows.append(row)
+                texts.append(text)
+        self._put(key, rows, texts)
+        return list(rows)
+
+    def can_answer(self, search_text, filters):
+        terms = search_terms(search_text)
+        return (tuple(terms), filters) in self._entries or self._find_base(terms, filters) is not None
+
+    def _find_base(self, terms, filters):
+        """A pesquisa em cache mais restrita (menos linhas) que contém a pedida."""
+        best = None
+        for key, (rows, _) in self._entries.items():
+            if key[1] == filters and _narrows(terms, key[0]):
+                if best is None or len(rows) < len(self._entries[best][0]):
+                    best = key
+        return best
+
+    def _put(self, key, rows, texts):
+        self._entries[key] = (rows, texts)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
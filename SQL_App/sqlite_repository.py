@@ -0,0 +1,344 @@
+# sqlite_repository.py
+#
+# Backend sqlite3 do repositório de veículos (ver repository.py): só usa a biblioteca padrão,
+# por isso as ferramentas sem janelas (tax_audit.py, benchmarks) não precisam de carregar o Qt.
+# Executa o mesmo SQL que database.py (queries.py) e devolve os mesmos valores.
+
+import sqlite3
+import threading
+from operator import itemgetter
+
+from instrumentation import note_query, timed
+from migrations import apply_migrations
+from queries import (
+    BULK_BATCH_SIZE, BULK_INSERT_SQL, BULK_TRIGGERS_SQL, DEFAULT_PRAGMAS, DELETE_VEHICLE_SQL, EXPORT_CHUNK_SIZE,
+    EXPORT_FIELDS, GRID_FIELDS, INDEX_NEW_ROWS_SQL, INSERT_VEHICLE_SQL, INVALID_NEW_ROWS_SQL, LAST_ID_SQL,
+    OPTIMIZE_SQL, PAGE_SIZE, SUMMARY_NEW_ROWS_SQL, TAX_CHUNK_SIZE, TAX_ROWS_SQL, UPDATE_TAX_SQL, UPDATE_VEHICLE_SQL,
+    VEHICLE_BY_ID_SQL, VEHICLE_FIELDS, expense_row_sql, monthly_summary_sql, page_key, page_sql, search_sql,
+    search_text_of, unique_values_sql, value_counts_sql
+)
+from repository import VehicleRepository
+
+_record_values = itemgetter(*VEHICLE_FIELDS)
+_GRID_COLUMNS = len(GRID_FIELDS)
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Fábricas de linhas ---
+# Nas linhas da grelha e nos formulários o QtSql devolve '' para NULL; o mesmo acontece aqui para
+# que a interface não dependa do backend. iter_vehicles/iter_tax_rows mantêm None, como em database.py.
+
+def _text_or_value(value):
+    return "" if value is None else value
+
+
+def _grid_row(cursor, row):
+    """Linha da grelha (formato de fetch_expenses); as colunas a mais ficam no fim da lista."""
+    values = [_text_or_value(value) for value in row]
+    values[_GRID_COLUMNS - 1] = bool(row[_GRID_COLUMNS - 1])
+    return values
+
+
+def _vehicle_dict(cursor, row):
+    return {column[0]: _text_or_value(value) for column, value in zip(cursor.description, row)}
+
+
+def _run(connection, sql, values=(), many=False, row_factory=None):
+    """Executa uma instrução e regista-a na chamada medida em curso (instrumentation.py)."""
+    try:
+        cursor = connection.cursor()
+        cursor.row_factory = row_factory
+        if many:
+            cursor.executemany(sql, values)
+        else:
+            cursor.execute(sql, values)
+    except sqlite3.Error:
+        note_query(sql, False)
+        raise
+    note_query(sql, True)
+    return cursor
+
+
+class SqliteRepository(VehicleRepository):
+    """Backend sqlite3: uma ligação por thread, em modo autocommit (isolation_level=None).
+
+    As escritas com mais de uma instrução usam transações explícitas (BEGIN/COMMIT).
+    """
+
+    backend = "sqlite3"
+
+    def __init__(self, db_name, pragmas=None):
+        self.db_name = db_name
+        self.pragmas = dict(DEFAULT_PRAGMAS)
+        self.pragmas.update(pragmas or {})
+        self._local = threading.local()
+        self._connections = set()
+        self._lock = threading.Lock()
+        try:
+            connection = self._connect(self.pragmas)
+        except sqlite3.Error as e:
+            print(f"Erro ao abrir a base de dados: {e}")
+            self.opened = False
+            return
+        self._local.connection = connection
+        self.opened = apply_migrations(connection)
+
+    def _connect(self, pragmas):
+        # check_same_thread=False só para que close() possa fechar as ligações das outras threads;
+        # cada ligação continua a ser usada apenas pela thread que a abriu
+        connection = sqlite3.connect(self.db_name, isolation_level=None, check_same_thread=False)
+        for name, value in pragmas.items():
+            if value is None:
+                continue
+            try:
+                connection.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.Error as e:
+                print(f"Erro ao aplicar PRAGMA {name}: {e}")
+        with self._lock:
+            self._connections.add(connection)
+        return connection
+
+    def connection(self):
+        """Devolve a ligação da thread atual, aberta na primeira utilização."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # journal_mode fica gravado no ficheiro; os restantes PRAGMAs são por ligação
+            connection = self._connect({key: value for key, value in self.pragmas.items()
+                                        if key != "journal_mode"})
+            self._local.connection = connection
+        return connection
+
+    def _execute(self, sql, values=(), error="Erro ao executar SQL", row_factory=None):
+        """Uma instrução isolada. Devolve o cursor, ou None em caso de erro (depois de o imprimir)."""
+        try:
+            return _run(self.connection(), sql, values, row_factory=row_factory)
+        except sqlite3.Error as e:
+            print(f"{error}: {e}")
+            return None
+
+    def _in_transaction(self, statements, error):
+        """Executa statements(connection) numa transação explícita. Devolve False em caso de erro."""
+        connection = None
+        try:
+            connection = self.connection()
+            connection.execute("BEGIN")
+            statements(connection)
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"{error}: {e}")
+            if connection is not None and connection.in_transaction:
+                connection.execute("ROLLBACK")
+            return False
+        return True
+
+    # --- Escrita ---
+
+    @timed()
+    def update_expense_in_db(self, id, data):
+        values = dict(data)
+        values["id"] = id
+        if self._execute(UPDATE_VEHICLE_SQL, values, "Erro ao atualizar registo") is None:
+            return None
+        return id
+
+    @timed()
+    def add_expense_to_db(self, matricula, marca, numeroQuadro, isv, nRegistoContabilidade,
+                          dataCompra, docCompra, tipoDocumento, valorCompra,
+                          dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, regime_fiscal):
+        values = dict(zip(VEHICLE_FIELDS, (matricula, marca, numeroQuadro, isv, nRegistoContabilidade,
+                                           dataCompra, docCompra, tipoDocumento, valorCompra,
+                                           dataVenda, docVenda, valorVenda, imposto, valorBase, taxa, regime_fiscal)))
+        cursor = self._execute(INSERT_VEHICLE_SQL, values, "Erro ao adicionar registo")
+        return cursor.lastrowid if cursor is not None else None
+
+    @timed(rows=lambda inserted: inserted or 0)
+    def add_expenses_bulk(self, records, batch_size=BULK_BATCH_SIZE, progress=None):
+        """Como database.add_expenses_bulk, com executemany: cada lote é uma transação."""
+        def insert_batch(connection):
+            last_id = _run(connection, LAST_ID_SQL).fetchone()[0]
+            triggers = _run(connection, BULK_TRIGGERS_SQL).fetchall()
+            for name, _ in triggers:
+                _run(connection, f"DROP TRIGGER {name}")
+            _run(connection, BULK_INSERT_SQL, map(_record_values, batch), many=True)
+            invalid = _run(connection, INVALID_NEW_ROWS_SQL, {"last_id": last_id}).fetchone()
+            if invalid is not None:
+                raise sqlite3.IntegrityError(f"há veículos com datas ou valores monetários inválidos "
+                                             f"(ex.: matrícula {invalid[0]!r})")
+            _run(connection, INDEX_NEW_ROWS_SQL, {"last_id": last_id})
+            _run(connection, SUMMARY_NEW_ROWS_SQL, {"last_id": last_id})
+            for _, sql in triggers:
+                _run(connection, sql)
+
+        inserted = 0
+        for batch in _batched(records, batch_size):
+            if not self._in_transaction(insert_batch, "Erro na inserção em lote"):
+                return None
+            inserted += len(batch)
+            if progress is not None:
+                progress(inserted)
+        return inserted
+
+    @timed()
+    def delete_expense_from_db(self, id):
+        if self._execute(DELETE_VEHICLE_SQL, {"id": id}, "Erro ao eliminar registo") is None:
+            return None
+        return id
+
+    @timed(rows=lambda updated: updated or 0)
+    def update_tax_values(self, values):
+        if not values:
+            return 0
+        updates = [(base, imposto, vehicle_id) for vehicle_id, base, imposto in values]
+        if not self._in_transaction(lambda connection: _run(connection, UPDATE_TAX_SQL, updates, many=True),
+                                   "Erro ao atualizar os impostos"):
+            return None
+        return len(values)
+
+    # --- Leitura ---
+
+    @timed(rows=lambda page: len(page[0]))
+    def fetch_expenses_page(self, after_key=None, limit=PAGE_SIZE, order_by="id", filters=None):
+        sql, values, keyed = page_sql(GRID_FIELDS, after_key, limit, order_by, filters)
+        cursor = self._execute(sql, values, "Erro ao buscar despesas", _grid_row)
+        if cursor is None:
+            return [], None
+        rows = cursor.fetchall()
+        # A última coluna é o valor da ordenação (ver queries.page_sql); a linha fica só com a grelha
+        sort_value = rows[-1][_GRID_COLUMNS] if rows else None
+        for row in rows:
+            del row[_GRID_COLUMNS:]
+        return rows, page_key(rows, sort_value, limit, keyed)
+
+    @timed()
+    def fetch_expenses(self, after_id=None, limit=None, sold=None):
+        after_key = (after_id,) if after_id is not None else None
+        rows, _ = self.fetch_expenses_page(after_key, limit, filters={"sold": sold})
+        return rows
+
+    @timed()
+    def fetch_expense_row(self, vehicle_id, sold=None, search_text="", criteria=None):
+        sql, values = expense_row_sql(sold, search_text, criteria)
+        values["id"] = vehicle_id
+        cursor = self._execute(sql, values, "Erro ao buscar linha do veículo", _grid_row)
+        return cursor.fetchone() if cursor is not None else None
+
+    @timed()
+    def fetch_vehicle_by_id(self, vehicle_id):
+        cursor = self._execute(VEHICLE_BY_ID_SQL, {"id": vehicle_id}, "Erro ao buscar veículo por ID",
+                               _vehicle_dict)
+        return cursor.fetchone() if cursor is not None else None
+
+    def _unique_values(self, field):
+        cursor = self._execute(unique_values_sql(field))
+        return [str(value) for value, in cursor if value] if cursor is not None else []
+
+    @timed()
+    def fetch_unique_marcas(self):
+        return self._unique_values("marca")
+
+    @timed()
+    def fetch_unique_matriculas(self):
+        return self._unique_values("matricula")
+
+    @timed()
+    def fetch_value_counts(self, field):
+        cursor = self._execute(value_counts_sql(field))
+        return [(str(value), count) for value, count in cursor] if cursor is not None else []
+
+    @timed()
+    def search_vehicles(self, search_text, limit=100, offset=0, sold=None, with_search_text=False,
+                        criteria=None):
+        search = search_sql(search_text, limit, offset, sold, with_search_text, criteria)
+        if search is None:
+            return []
+        cursor = self._execute(*search, "Erro ao pesquisar veículos", _grid_row)
+        if cursor is None:
+            return []
+        rows = cursor.fetchall()
+        if with_search_text:
+            for row in rows:
+                row[_GRID_COLUMNS:] = [search_text_of(row[_GRID_COLUMNS:])]
+        return rows
+
+    @timed()
+    def iter_vehicles(self, sold=None, search_text="", chunk_size=EXPORT_CHUNK_SIZE, order_by="id",
+                      criteria=None):
+        filters = {"sold": sold, "search_text": search_text, **(criteria or {})}
+        column_count = len(EXPORT_FIELDS)
+
+        after_key = None
+        while True:
+            sql, values, keyed = page_sql(EXPORT_FIELDS, after_key, chunk_size, order_by, filters)
+            cursor = self._execute(sql, values, "Erro ao exportar veículos")
+            if cursor is None:
+                return
+
+            count = 0
+            for count, record in enumerate(cursor, 1):
+                row = record[:column_count]
+                sort_value = record[column_count]
+                yield row
+
+            if count < chunk_size:
+                return
+            after_key = (sort_value, row[0]) if keyed else (row[0],)
+
+    @timed(rows=len)
+    def iter_tax_rows(self, chunk_size=TAX_CHUNK_SIZE):
+        after_id = 0
+        while True:
+            cursor = self._execute(TAX_ROWS_SQL, {"after_id": after_id, "limit": chunk_size},
+                                   "Erro ao ler os impostos")
+            if cursor is None:
+                return
+            chunk = cursor.fetchall()
+
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            after_id = chunk[-1][0]
+
+    @timed()
+    def fetch_monthly_summary(self, first_month=None, last_month=None):
+        cursor = self._execute(*monthly_summary_sql(first_month, last_month), "Erro ao ler o resumo mensal")
+        return cursor.fetchall() if cursor is not None else None
+
+    @timed()
+    def execute_sql(self, sql, values=None):
+        cursor = self._execute(sql, values or {})
+        return cursor.fetchall() if cursor is not None else None
+
+    # --- Ligações ---
+
+    def close_thread_connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            return
+        del self._local.connection
+        with self._lock:
+            self._connections.discard(connection)
+        connection.close()
+
+    def close(self):
+        """Fecha todas as ligações (depois de as threads de trabalho terminarem)."""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            try:
+                connection.execute(OPTIMIZE_SQL)
+            except sqlite3.Error as e:
+                print(f"Erro ao otimizar a base de dados: {e}")
+            connection.close()
+        self._local = threading.local()
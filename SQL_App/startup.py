@@ -0,0 +1,74 @@
+# startup.py
+#
+# Medição do arranque: marcas de tempo (ms) desde a importação deste módulo, que é o primeiro
+# import de main.py, até à primeira pintura da janela e ao primeiro bloco de linhas na grelha.
+#
+# As marcas aparecem no diálogo de diagnóstico. Com SQL_APP_STARTUP_TIMING=1 são também
+# impressas quando chega o primeiro bloco; com SQL_APP_STARTUP_TIMING=exit a aplicação sai a
+# seguir (usado pelo benchmark de arranque em benchmarks/run.py).
+
+import os
+import time
+
+_START = time.perf_counter()  # Antes de importar o Qt
+
+from PyQt6.QtCore import QCoreApplication, QEvent, QObject, QTimer  # noqa: E402
+
+STARTUP_TIMING = os.environ.get("SQL_APP_STARTUP_TIMING", "")
+
+_marks = []
+
+
+def mark(label):
+    """Regista o instante atual com o nome indicado."""
+    _marks.append((label, (time.perf_counter() - _START) * 1000))
+
+
+def marks():
+    """[(nome, ms desde o início)] pela ordem em que foram registadas."""
+    return list(_marks)
+
+
+def startup_report():
+    return "\n".join(f"{label}: {elapsed:.0f} ms" for label, elapsed in _marks)
+
+
+class _FirstPaintFilter(QObject):
+    """Filtro de eventos que deteta a primeira pintura de uma janela."""
+
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            mark("primeira pintura")
+            # Só depois de a pintura acabar (e a janela aparecer no ecrã)
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
+def after_first_paint(widget, callback):
+    """Chama callback() no ciclo de eventos logo a seguir à primeira pintura de widget."""
+    _FirstPaintFilter(widget, callback)
+
+
+def watch_first_rows(model):
+    """Regista a marca "primeiro bloco" quando a primeira leitura do modelo da grelha termina."""
+    def loading_changed(loading):
+        if loading:
+            return
+        model.loadingChanged.disconnect(loading_changed)
+        # loadingChanged(False) é emitido antes de as linhas entrarem no modelo
+        QTimer.singleShot(0, first_rows)
+
+    def first_rows():
+        mark("primeiro bloco")
+        if STARTUP_TIMING:
+            print(startup_report(), flush=True)
+        if STARTUP_TIMING == "exit":
+            QCoreApplication.quit()
+
+    model.loadingChanged.connect(loading_changed)
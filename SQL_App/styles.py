@@ -0,0 +1,333 @@
+# styles.py
+#
+# Folha de estilo de toda a aplicação. É aplicada uma única vez à QApplication (main.py), por isso
+# as janelas e os diálogos não voltam a interpretá-la sempre que são criados.
+
+APP_STYLESHEET = """
+/* Base styling */
+QWidget {
+    background-color: #e3e9f2;
+    font-family: Arial, sans-serif;
+    font-size: 14px;
+    color: #333;
+}
+
+/* Headings for labels */
+QLabel {
+    font-size: 16px;
+    color: #2c3e50;
+    font-weight: bold;
+    padding: 5px;
+}
+
+/* Styling for input fields */
+QLineEdit, QComboBox {
+    background-color: #ffffff;
+    font-size: 14px;
+    color: #333;
+    border: 1px solid #b0bfc6;
+    border-radius: 5px;
+    padding: 5px;
+}
+QLineEdit:hover, QComboBox:hover {
+    border: 1px solid #4caf50;
+}
+QLineEdit:focus, QComboBox:focus {
+    border: 1px solid #2a9d8f;
+    background-color: #f5f9fc;
+}
+
+/* Table styling */
+QTableView {
+    background-color: #ffffff;
+    alternate-background-color: #f2f7fb;
+    gridline-color: #c0c9d0;
+    font-size: 14px;
+    border: 1px solid #cfd9e1;
+}
+
+/* A COR DE SELEÇÃO DEVE SER MAIS ESPECÍFICA PARA SOBREPÔR OUTRAS CORES */
+QTableView::item:selected {
+    background-color: #d0d7de; /* Cor de seleção cinza mais clara */
+    color: #000000;
+}
+
+/* NOVO: Estilo para itens vendidos - será sobreposto por ::item:selected */
+/* Este estilo aplica-se ao item individual, o que pode ser mais robusto */
+QTableView::item[sold="true"] { /* Usamos uma propriedade dinâmica 'sold' */
+    background-color: #d4edda; /* Verde pastel para vendido */
+    color: #333; /* Cor do texto para contraste */
+}
+
+
+QHeaderView::section {
+    background-color: #4caf50;
+    color: white;
+    font-weight: bold;
+    padding: 4px;
+    border: 1px solid #cfd9e1;
+}
+
+/* Scroll bar styling */
+QScrollBar:vertical {
+    width: 12px;
+    background-color: #f0f0f0;
+    border: none;
+}
+QScrollBar::handle:vertical {
+    background-color: #4caf50;
+    min-height: 20px;
+    border-radius: 5px;
+}
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+    background: none;
+}
+
+/* Buttons */
+QPushButton {
+    background-color: #4caf50;
+    color: white;
+    padding: 10px 15px;
+    border-radius: 5px;
+    font-size: 14px;
+    font-weight: bold;
+}
+QPushButton:hover {
+    background-color: #45a049;
+}
+QPushButton:pressed {
+    background-color: #3d8b40;
+}
+QPushButton:disabled {
+    background-color: #c8c8c8;
+    color: #6e6e6e;
+}
+
+/* Estilo para o botão de Limpar Pesquisa (o "X") */
+QPushButton#clearSearchButton {
+    background-color: transparent;
+    border: none;
+    color: #555555;
+    padding: 0px 5px;
+    border-radius: 5px;
+    font-size: 18px;
+    font-weight: bold;
+    min-width: 25px;
+}
+QPushButton#clearSearchButton:hover {
+    background-color: #e0e0e0;
+    border-radius: 5px;
+}
+QPushButton#clearSearchButton:pressed {
+    background-color: #cccccc;
+}
+
+/* NOVO: Estilo para o botão de Pesquisa (a "Lupa") */
+QPushButton#searchButton {
+    background-color: transparent;
+    border: none;
+    color: #555555;
+    padding: 0px 5px;
+    border-radius: 5px;
+    font-size: 18px;
+    font-weight: bold;
+    min-width: 25px;
+}
+QPushButton#searchButton:hover {
+    background-color: #e0e0e0;
+    border-radius: 5px;
+}
+QPushButton#searchButton:pressed {
+    background-color: #cccccc;
+}
+
+
+/* Tooltip styling */
+QToolTip {
+    background-color: #2c3e50;
+    color: #ffffff;
+    border: 1px solid #333;
+    font-size: 12px;
+    padding: 5px;
+    border-radius: 4px;
+}
+
+QCheckBox {
+    color: #333333;
+    font-weight: normal;
+    spacing: 6px;
+}
+
+QCheckBox::indicator {
+    width: 14px;
+    height: 14px;
+}
+
+QCheckBox::indicator:checked {
+    background-color: #4caf50;
+    border: 1px solid #388e3c;
+}
+
+QCheckBox::indicator:unchecked {
+    background-color: white;
+    border: 1px solid #888;
+}
+
+/* ESTILO PARA QRadioButton */
+QRadioButton {
+    color: #333;
+    padding: 4px 0px;
+}
+
+QRadioButton::indicator {
+    width: 16px;
+    height: 16px;
+    border-radius: 8px;
+    border: 2px solid #555555;
+    background-color: #ffffff;
+}
+
+QRadioButton::indicator:hover {
+    border: 2px solid #4caf50;
+}
+
+QRadioButton::indicator:checked {
+    background-color: #4caf50;
+    border: 2px solid #2a9d8f;
+}
+
+/* NOVO ESTILO: QRadioButton quando desabilitado */
+QRadioButton:disabled {
+    color: #a0a0a0;
+}
+
+QRadioButton::indicator:disabled {
+    background-color: #e0e0e0;
+    border: 2px solid #b0b0b0;
+}
+
+/* Estilo para QCalendarWidget */
+QCalendarWidget {
+    background-color: #ffffff;
+    border: 1px solid #cfd9e1;
+    border-radius: 5px;
+}
+
+/* Barra de navegação do calendário (onde está o mês e ano) */
+QCalendarWidget QWidget#qt_calendar_navigationbar {
+    background-color: #e8ecf4;
+    color: #333;
+    border-top-left-radius: 5px;
+    border-top-right-radius: 5px;
+    border: none;
+}
+
+/* Estilo dos botões de navegação (setas) e spinbox de ano/mês */
+QCalendarWidget QAbstractSpinBox,
+QCalendarWidget QPushButton {
+    background-color: #e8ecf4;
+    color: #4caf50;
+    border: 1px solid #b0bfc6;
+    border-radius: 3px;
+    font-size: 14px;
+    padding: 3px 5px;
+}
+QCalendarWidget QAbstractSpinBox:hover,
+QCalendarWidget QPushButton:hover {
+    background-color: #dbe2ea;
+}
+QCalendarWidget QAbstractSpinBox:pressed,
+QCalendarWidget QPushButton:pressed {
+    background-color: #c9d0d9;
+}
+
+/* Setas dentro do Spinbox */
+QCalendarWidget QSpinBox::up-button,
+QCalendarWidget QSpinBox::down-button {
+    subcontrol-origin: border;
+    subcontrol-position: right;
+    width: 16px;
+    border-left: 1px solid #b0bfc6;
+    background-color: #e8ecf4;
+    border-top-right-radius: 3px;
+    border-bottom-right-radius: 3px;
+}
+QCalendarWidget QSpinBox::up-button:hover,
+QCalendarWidget QSpinBox::down-button:hover {
+    background-color: #dbe2ea;
+}
+QCalendarWidget QSpinBox::up-arrow,
+QCalendarWidget QSpinBox::down-arrow {
+    background-color: transparent;
+    color: #4caf50;
+}
+
+/* Cabeçalho da grelha do calendário (Dias da Semana - Seg, Ter, Qua, etc.) */
+QCalendarWidget QAbstractItemView {
+    background-color: #ffffff;
+    selection-background-color: #a0d4a3;
+    selection-color: #000000;
+    outline: none;
+    border-bottom: 1px solid #e0e0e0;
+}
+
+QCalendarWidget QAbstractItemView QHeaderView::section {
+    background-color: #f0f0f0;
+    color: #555555;
+    border: none;
+    padding: 5px;
+}
+
+/* Estilo para o dia normal no calendário */
+QCalendarWidget QAbstractItemView:enabled {
+    color: #333;
+}
+
+QCalendarWidget QAbstractItemView:enabled:hover {
+    background-color: #e6ffe6;
+    border-radius: 3px;
+}
+
+QCalendarWidget QAbstractItemView:selected {
+    background-color: #2a9d8f;
+    color: white;
+    border-radius: 3px;
+}
+
+/* Para o dia de hoje - AGORA COM CIRCULO VERDE MAIS CLARO */
+QCalendarWidget QAbstractItemView:!selected:focus {
+    background-color: #d4f7d4;
+    color: #000000;
+    border: 1px solid #4caf50;
+    border-radius: 50%;
+}
+
+/* Para a borda à volta do número do dia */
+QCalendarWidget QCalendarView::item {
+    border-radius: 0px;
+    padding: 4px;
+}
+
+/* Dias desabilitados (fora do mês atual) */
+QCalendarWidget QAbstractItemView:disabled {
+    color: #cccccc;
+}
+
+/* Botão do calendário ao lado do campo de data: anula o estilo geral dos botões */
+QPushButton#calendarButton {
+    background-color: #4caf50;
+    color: white;
+    border: 1px solid #3d8b40;
+    border-radius: 5px;
+    font-size: 16px; /* Tamanho do ícone */
+    padding: 0px;
+}
+QPushButton#calendarButton:hover {
+    background-color: #45a049;
+    border: 1px solid #367c39;
+}
+QPushButton#calendarButton:pressed {
+    background-color: #3d8b40;
+    border: 1px solid #2f6932;
+}
+"""
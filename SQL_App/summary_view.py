@@ -0,0 +1,107 @@
+# summary_view.py
+
+from PyQt6.QtCore import QDate, Qt
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (
+    QAbstractItemView, QDateEdit, QDialog, QHBoxLayout, QHeaderView, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QVBoxLayout
+)
+
+from async_db import database_executor
+from formatting import format_cents, format_cents_column
+from repository import repository
+
+SUMMARY_HEADERS = ["Mês", "Regime Fiscal", "Taxa", "Veículos", "Valor Compra", "Valor Venda",
+                   "Valor Base", "Imposto"]
+_FIRST_MONEY_COLUMN = 4  # As colunas seguintes são valores monetários (SUMMARY_FIELDS)
+
+
+def _month_key(date):
+    return date.toString("yyyy-MM")
+
+
+class MonthlySummaryDialog(QDialog):
+    """Totais mensais das vendas (IVA e volume de negócios) num intervalo de meses.
+
+    Os valores vêm da tabela 'monthly_summary', por isso o custo depende do número de meses
+    e não do número de veículos.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Resumo Mensal de Vendas")
+        self.resize(900, 500)
+
+        today = QDate.currentDate()
+        self.first_month = QDateEdit(QDate(today.year(), 1, 1))
+        self.last_month = QDateEdit(today)
+        for edit in (self.first_month, self.last_month):
+            edit.setDisplayFormat("MM/yyyy")
+            edit.setCalendarPopup(True)
+
+        self.refresh_button = QPushButton("Atualizar")
+        self.refresh_button.clicked.connect(self.load_summary)
+        self.status_label = QLabel()
+
+        self.table = QTableWidget(0, len(SUMMARY_HEADERS))
+        self.table.setHorizontalHeaderLabels(SUMMARY_HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        period_layout = QHBoxLayout()
+        period_layout.addWidget(QLabel("De:"))
+        period_layout.addWidget(self.first_month)
+        period_layout.addWidget(QLabel("Até:"))
+        period_layout.addWidget(self.last_month)
+        period_layout.addWidget(self.refresh_button)
+        period_layout.addWidget(self.status_label)
+        period_layout.addStretch(1)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(period_layout)
+        layout.addWidget(self.table)
+
+        self.load_summary()
+
+    def load_summary(self):
+        self.refresh_button.setEnabled(False)
+        self.status_label.setText("A carregar...")
+        database_executor().submit(repository().fetch_monthly_summary, _month_key(self.first_month.date()),
+                                   _month_key(self.last_month.date()), key="monthly_summary",
+                                   on_result=self.show_summary, on_error=self.summary_failed)
+
+    def summary_failed(self, message):
+        self.refresh_button.setEnabled(True)
+        self.status_label.setText(f"Erro: {message}")
+
+    def show_summary(self, rows):
+        self.refresh_button.setEnabled(True)
+        if rows is None:
+            self.summary_failed("não foi possível ler o resumo mensal.")
+            return
+        self.status_label.setText("")
+
+        columns = list(zip(*rows)) if rows else [()] * len(SUMMARY_HEADERS)
+        texts = [
+            [QDate.fromString(month, "yyyy-MM").toString("MM/yyyy") for month in columns[0]],
+            [regime or "Sem regime" for regime in columns[1]],
+            [f"{rate:g}%" for rate in columns[2]],
+            [str(count) for count in columns[3]],
+        ] + [format_cents_column(column) for column in columns[_FIRST_MONEY_COLUMN:]]
+
+        # Última linha: totais do período
+        totals = ["Total", "", "", str(sum(columns[3]))] + \
+                 [format_cents(sum(column)) for column in columns[_FIRST_MONEY_COLUMN:]]
+        bold = QFont()
+        bold.setBold(True)
+
+        self.table.setRowCount(len(rows) + 1)
+        for column, column_texts in enumerate(texts):
+            alignment = Qt.AlignmentFlag.AlignRight if column >= 2 else Qt.AlignmentFlag.AlignLeft
+            for row, text in enumerate(column_texts + [totals[column]]):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(alignment | Qt.AlignmentFlag.AlignVCenter)
+                if row == len(rows):
+                    item.setFont(bold)
+                self.table.setItem(row, column, item)
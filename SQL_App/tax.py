@@ -0,0 +1,163 @@
+# tax.py
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from money import to_cents, to_euros
+
+# Regimes de IVA (valores gravados em 'regime_fiscal')
+REGIME_NORMAL = "Regime Normal"
+REGIME_MARGEM = "Margem"
+
+# Taxas de IVA (%) e tipos de documento de compra que o formulário e os filtros oferecem
+TAX_RATES = ["6", "13", "23"]
+DOCUMENT_TYPES = ["Fatura", "Fatura-Recibo", "Fatura Simplificada", "Declaração"]
+
+_CENT = Decimal("0.01")
+_ZERO = Decimal(0)
+_HUNDRED = Decimal(100)
+
+
+def to_decimal(value, money=True):
+    """Converte um valor da base de dados ou do formulário em Decimal (None e "" contam como 0).
+
+    Os valores monetários são arredondados ao cêntimo, como aparecem no formulário.
+    """
+    if value is None or value == "":
+        return _ZERO
+    number = value if isinstance(value, Decimal) else Decimal(str(value))
+    return number.quantize(_CENT, rounding=ROUND_HALF_UP) if money else number
+
+
+def compute_tax(regime, valor_compra, valor_venda, taxa):
+    """Calcula (valorBase, imposto) de um veículo, arredondados ao cêntimo.
+
+    Regime Normal: o IVA está incluído no valor de venda.
+    Margem: o IVA incide sobre a margem (venda - compra), e é 0 se não houver margem.
+    Devolve (None, None) se o regime não for nenhum destes ou se a taxa for -100% (o valor
+    base não está definido).
+    """
+    valor_compra = to_decimal(valor_compra)
+    valor_venda = to_decimal(valor_venda)
+    taxa = to_decimal(taxa, money=False)
+    if taxa == -_HUNDRED:
+        return None, None
+
+    if regime == REGIME_NORMAL:
+        valor_base = valor_venda / (1 + taxa / 100)
+        imposto = valor_base * (taxa / _HUNDRED)
+    elif regime == REGIME_MARGEM:
+        margem = (valor_venda - valor_compra) / (1 + taxa / 100)
+        if margem > 0:
+            valor_base = margem
+            imposto = margem * (taxa / _HUNDRED)
+        else:
+            valor_base = _ZERO
+            imposto = _ZERO
+    else:
+        return None, None
+    return valor_base.quantize(_CENT), imposto.quantize(_CENT)
+
+
+def compute_tax_cents(regime, compra_cents, venda_cents, taxa):
+    """compute_tax com os valores em cêntimos, como estão gravados (ver money.py).
+
+    Devolve (valorBase, imposto) em cêntimos, ou (None, None) como compute_tax.
+    """
+    valor_base, imposto = compute_tax(regime, to_euros(compra_cents), to_euros(venda_cents), taxa)
+    return to_cents(valor_base), to_cents(imposto)
+
+
+def _compute_scalar(regimes, compras, vendas, taxas):
+    bases, impostos = [], []
+    for regime, compra, venda, taxa in zip(regimes, compras, vendas, taxas):
+        valor_base, imposto = compute_tax_cents(regime, compra, venda, taxa)
+        bases.append(valor_base)
+        impostos.append(imposto)
+    return bases, impostos
+
+
+# Limites para que os produtos intermédios caibam num int64 (cêntimos e centésimas de %)
+_MAX_VECTOR_CENTS = 10 ** 12
+_MAX_VECTOR_RATE = 10 ** 6
+
+
+def _round_ratio(numerator, denominator, np):
+    """numerator / denominator arredondado ao inteiro mais próximo (empates para par).
+
+    Devolve também a máscara dos empates exatos.
+    """
+    # Com o denominador negativo o resto do divmod também é negativo e a comparação com metade
+    # do denominador deixava de funcionar: passa-se o sinal para o numerador
+    negative = denominator < 0
+    numerator = np.where(negative, -numerator, numerator)
+    denominator = np.where(negative, -denominator, denominator)
+    quotient, remainder = np.divmod(numerator, denominator)
+    twice = 2 * remainder
+    tie = twice == denominator
+    up = (twice > denominator) | (tie & (quotient % 2 == 1))
+    return quotient + up, tie
+
+
+def _compute_numpy(regimes, compras, vendas, taxas, np):
+    regimes = np.asarray(regimes, dtype=object)
+    normal = regimes == REGIME_NORMAL
+    margem = regimes == REGIME_MARGEM
+
+    def as_cents(values):
+        return np.array([0 if value is None else value for value in values], dtype=np.int64)
+
+    # Valores em cêntimos e taxa em centésimas de ponto percentual, tudo em inteiros: a divisão
+    # é exata e o arredondamento igual ao do Decimal (ROUND_HALF_EVEN no quantize)
+    compra_cents = as_cents(compras)
+    venda_cents = as_cents(vendas)
+    scaled_taxas = np.array([0.0 if value is None or value == "" else float(value) for value in taxas]) * 100
+    with np.errstate(invalid="ignore"):
+        taxa_units = np.rint(scaled_taxas).astype(np.int64)
+
+    # Linhas que o cálculo inteiro não reproduz exatamente ficam para o cálculo com Decimal:
+    # taxas com mais de 2 casas e valores enormes
+    fallback = np.abs(scaled_taxas - taxa_units) > 1e-6
+    fallback |= (np.abs(compra_cents) > _MAX_VECTOR_CENTS) | (np.abs(venda_cents) > _MAX_VECTOR_CENTS)
+    fallback |= np.abs(scaled_taxas) > _MAX_VECTOR_RATE
+    compra_cents[fallback] = 0
+    venda_cents[fallback] = 0
+    taxa_units[fallback] = 0
+    divisor = 10000 + taxa_units
+    undefined = ~(normal | margem) | (divisor == 0)  # Regime desconhecido ou taxa de -100%
+    divisor[divisor == 0] = 1
+
+    amount = np.where(normal, venda_cents, venda_cents - compra_cents)
+    base_cents, base_tie = _round_ratio(amount * 10000, divisor, np)
+    imposto_cents, imposto_tie = _round_ratio(amount * taxa_units, divisor, np)
+    # Num empate exato o Decimal pode ter arredondado o valor intermédio (28 dígitos)
+    fallback |= base_tie | imposto_tie
+
+    no_margin = margem & (np.sign(amount) * np.sign(divisor) <= 0)  # Margem <= 0
+    base_cents[no_margin] = 0
+    imposto_cents[no_margin] = 0
+
+    bases = base_cents.astype(object)
+    impostos = imposto_cents.astype(object)
+    bases[undefined] = None
+    impostos[undefined] = None
+
+    for row in np.flatnonzero(fallback & ~undefined):
+        bases[row], impostos[row] = compute_tax_cents(regimes[row], compras[row], vendas[row], taxas[row])
+    return bases.tolist(), impostos.tolist()
+
+
+def compute_tax_batch(regimes, compras, vendas, taxas):
+    """compute_tax_cents para listas de valores (uma posição por veículo). Devolve (valoresBase, impostos).
+
+    Os valores de compra e de venda e os resultados são cêntimos (int; None se o regime não
+    for reconhecido), como estão gravados na base de dados.
+    Com o pacote 'numpy' o cálculo é vetorizado; sem ele é feito veículo a veículo.
+    """
+    compras, vendas, taxas = list(compras), list(vendas), list(taxas)
+    try:
+        import numpy as np
+    except ImportError:
+        return _compute_scalar(regimes, compras, vendas, taxas)
+    if not compras:
+        return [], []
+    return _compute_numpy(list(regimes), compras, vendas, taxas, np)
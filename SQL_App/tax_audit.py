@@ -0,0 +1,103 @@
+# tax_audit.py
+#
+# Verifica (ou corrige, com --fix) o valorBase e o imposto gravados de todos os veículos,
+# recalculados com as regras de tax.compute_tax. Útil depois de uma mudança de taxa ou de regras.
+#
+# Uso: python tax_audit.py [--fix] [--db vehicles.db] [--backend sqlite3|qtsql]
+
+import argparse
+import sys
+
+from money import to_euros
+from queries import TAX_CHUNK_SIZE
+from repository import BACKENDS, close_repository, open_repository, repository
+from tax import compute_tax_batch
+
+
+class TaxAuditReport:
+    """Resultado da verificação: veículos verificados, ignorados (sem regime fiscal) e divergentes.
+
+    mismatches contém (id, valorBase gravado, imposto gravado, valorBase calculado, imposto calculado),
+    todos em cêntimos.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.skipped = 0
+        self.mismatches = []
+        self.fixed = 0
+        self.error = None
+
+    def __repr__(self):
+        return (f"TaxAuditReport(checked={self.checked}, skipped={self.skipped}, "
+                f"mismatches={len(self.mismatches)}, fixed={self.fixed}, error={self.error!r})")
+
+
+def audit_taxes(fix=False, chunk_size=TAX_CHUNK_SIZE, progress=None):
+    """Recalcula os impostos de toda a tabela, um bloco de chunk_size veículos de cada vez.
+
+    Com fix=True os valores divergentes são gravados (uma transação por bloco).
+    progress(verificados) é chamado depois de cada bloco.
+    """
+    report = TaxAuditReport()
+    for chunk in repository().iter_tax_rows(chunk_size):
+        ids, regimes, compras, vendas, taxas, stored_bases, stored_impostos = zip(*chunk)
+        bases, impostos = compute_tax_batch(regimes, compras, vendas, taxas)
+
+        corrections = []
+        for row in range(len(chunk)):
+            if bases[row] is None:
+                report.skipped += 1
+                continue
+            report.checked += 1
+            # Valores em cêntimos: a comparação é exata
+            if stored_bases[row] != bases[row] or stored_impostos[row] != impostos[row]:
+                report.mismatches.append((ids[row], stored_bases[row], stored_impostos[row],
+                                          bases[row], impostos[row]))
+                corrections.append((ids[row], bases[row], impostos[row]))
+
+        if fix and corrections:
+            updated = repository().update_tax_values(corrections)
+            if updated is None:
+                report.error = "Erro ao gravar as correções de um bloco na base de dados."
+                return report
+            report.fixed += updated
+        if progress is not None:
+            progress(report.checked + report.skipped)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica o valor base e o imposto de todos os veículos.")
+    parser.add_argument("--fix", action="store_true", help="grava os valores recalculados")
+    parser.add_argument("--db", default="vehicles.db", help="ficheiro da base de dados")
+    parser.add_argument("--backend", choices=BACKENDS, default="sqlite3",
+                        help="acesso à base de dados (por omissão sqlite3, que não precisa do Qt)")
+    args = parser.parse_args(argv)
+
+    application = None
+    if args.backend == "qtsql":
+        from PyQt6.QtCore import QCoreApplication
+        application = QCoreApplication(sys.argv[:1])  # Necessário para carregar o driver QSQLITE
+    if open_repository(args.db, args.backend) is None:
+        print(f"Não foi possível abrir a base de dados '{args.db}'")
+        return 1
+    report = audit_taxes(fix=args.fix)
+    close_repository()
+    del application
+
+    for vehicle_id, stored_base, stored_imposto, base, imposto in report.mismatches[:20]:
+        print(f"Veículo {vehicle_id}: valor base {to_euros(stored_base)} -> {to_euros(base)}, "
+              f"imposto {to_euros(stored_imposto)} -> {to_euros(imposto)}")
+    if len(report.mismatches) > 20:
+        print(f"... e mais {len(report.mismatches) - 20} veículos")
+    print(f"Verificados: {report.checked}, sem regime fiscal: {report.skipped}, "
+          f"divergentes: {len(report.mismatches)}, corrigidos: {report.fixed}")
+    if report.error:
+        print(report.error)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+# conftest.py
+#
+# Os módulos da aplicação são importados diretamente ("import migrations"), como em main.py.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
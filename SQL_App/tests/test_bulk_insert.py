@@ -0,0 +1,67 @@
+# test_bulk_insert.py
+#
+# Inserção em lote (add_expenses_bulk) no backend sqlite3: os triggers de inserção ficam
+# desligados durante cada lote e o seu trabalho é feito de uma só vez no fim.
+
+import unittest
+
+from migrations import summary_totals_sql
+from queries import BULK_TRIGGERS, VEHICLE_FIELDS
+from sqlite_repository import SqliteRepository
+
+
+def vehicle(matricula, **values):
+    record = dict.fromkeys(VEHICLE_FIELDS)
+    record.update(matricula=matricula, marca="Renault", valorCompra=1000000, regime_fiscal="Regime Normal",
+                  taxa=23.0)
+    record.update(values)
+    return record
+
+
+class BulkInsertTest(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = SqliteRepository(":memory:")
+        self.assertTrue(self.repository.opened)
+        self.database = self.repository.connection()
+
+    def tearDown(self):
+        self.repository.close()
+
+    def summary(self):
+        return self.database.execute("SELECT * FROM monthly_summary ORDER BY mes").fetchall()
+
+    def test_monthly_summary_matches_a_full_recount(self):
+        self.repository.add_expense_to_db(*vehicle("AA-00-01", dataVenda="2024-03-02", valorVenda=1230000).values())
+        records = [vehicle(f"BB-00-{i:02d}", dataVenda=f"2024-0{3 + i % 2}-10", valorVenda=100000 + i,
+                           imposto=i) for i in range(30)]
+        records.append(vehicle("CC-00-00"))  # Em stock: não conta para os totais
+        self.assertEqual(self.repository.add_expenses_bulk(records, batch_size=7), 31)
+
+        incremental = self.summary()
+        self.database.execute("DELETE FROM monthly_summary")
+        self.database.execute(summary_totals_sql("1"))
+        self.assertEqual(incremental, self.summary())
+        self.assertEqual([(row[0], row[3]) for row in incremental], [("2024-03", 16), ("2024-04", 15)])
+
+    def test_new_rows_are_searchable(self):
+        self.repository.add_expenses_bulk([vehicle("ZX-98-QW", numeroQuadro="VF1ABC")])
+        self.assertEqual(len(self.repository.search_vehicles("98-Q")), 1)
+
+    def test_batch_with_invalid_values_is_rejected(self):
+        records = [vehicle("AA-11-BB", dataVenda="2024-05-01", valorVenda=5000),
+                   vehicle("CC-22-DD", dataCompra="2024-13-45")]
+        self.assertIsNone(self.repository.add_expenses_bulk(records))
+        self.assertIsNone(self.repository.add_expenses_bulk([vehicle("EE-33-FF", valorCompra=12.5)]))
+        self.assertEqual(self.database.execute("SELECT COUNT(*) FROM vehicles").fetchone(), (0,))
+        self.assertEqual(self.summary(), [])
+
+    def test_insert_triggers_are_restored(self):
+        self.repository.add_expenses_bulk([vehicle("AA-11-BB")])
+        self.assertIsNone(self.repository.add_expenses_bulk([vehicle("CC-22-DD", dataVenda="2024-00-10")]))
+        names = {row[0] for row in self.database.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+        self.assertTrue(set(BULK_TRIGGERS) <= names)
+
+
+if __name__ == "__main__":
+    unittest.main()
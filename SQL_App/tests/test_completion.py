@@ -0,0 +1,81 @@
+# test_completion.py
+#
+# Índice em memória do autocompletar: procura por prefixo sem distinguir maiúsculas (como
+# COLLATE NOCASE) e contagem de veículos por valor, mantida a cada gravação.
+
+import unittest
+
+from completion import CompletionIndex, CompletionService
+from repository import close_repository, open_repository
+
+
+class CompletionIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CompletionIndex({"Mercedes": 3, "mercury": 1, "Renault": 2, "MAN": 1, "Mazda": 1})
+
+    def test_prefix_lookup_ignores_case(self):
+        self.assertEqual(self.index.complete("me"), ["Mercedes", "mercury"])
+        self.assertEqual(self.index.complete("MERC"), ["Mercedes", "mercury"])
+        self.assertEqual(self.index.complete("m"), ["MAN", "Mazda", "Mercedes", "mercury"])
+        self.assertEqual(self.index.complete("m", limit=2), ["MAN", "Mazda"])
+        self.assertEqual(self.index.complete("x"), [])
+        self.assertEqual(self.index.complete("mercedes-benz"), [])
+        self.assertEqual(len(self.index.complete("")), 5)
+
+    def test_value_stays_until_its_last_vehicle_is_removed(self):
+        self.index.remove("Renault")
+        self.assertEqual(self.index.complete("re"), ["Renault"])
+        self.index.remove("Renault")
+        self.assertEqual(self.index.complete("re"), [])
+        self.index.remove("Renault")  # Já não existe: ignorado
+        self.assertEqual(len(self.index), 4)
+
+    def test_add(self):
+        self.index.add("Mercedes-Benz")
+        self.index.add("")
+        self.index.add("MAN")
+        self.assertEqual(self.index.complete("merc"), ["Mercedes", "Mercedes-Benz", "mercury"])
+        self.assertEqual(len(self.index), 6)
+        self.index.remove("MAN")
+        self.assertEqual(self.index.complete("ma"), ["MAN", "Mazda"])
+
+
+class RecordChangedTest(unittest.TestCase):
+
+    def setUp(self):
+        repository = open_repository(":memory:", backend="sqlite3")
+        for matricula, marca in (("AA-11-BB", "Renault"), ("CC-22-DD", "Renault"), ("EE-33-FF", "Fiat")):
+            repository.execute_sql("INSERT INTO vehicles (matricula, marca) VALUES (?, ?)", (matricula, marca))
+        self.service = CompletionService(asynchronous=False)
+
+    def tearDown(self):
+        close_repository()
+
+    def test_reads_the_counts_from_the_database(self):
+        self.assertEqual(self.service.complete("marca", "r"), ["Renault"])
+        self.assertEqual(self.service.complete("matricula", "c"), ["CC-22-DD"])
+
+    def test_insert_update_and_delete(self):
+        self.service.record_changed(new={"marca": "Seat", "matricula": "GG-44-HH"})
+        self.assertEqual(self.service.complete("marca", "s"), ["Seat"])
+        self.assertEqual(self.service.complete("matricula", "gg"), ["GG-44-HH"])
+
+        # Mudar a marca de um dos dois Renault mantém o valor; o do único Fiat desaparece
+        self.service.record_changed(old={"marca": "Renault", "matricula": "AA-11-BB"},
+                                    new={"marca": "Fiat", "matricula": "AA-11-BB"})
+        self.service.record_changed(old={"marca": "Fiat", "matricula": "EE-33-FF"},
+                                    new={"marca": "Opel", "matricula": "EE-33-FF"})
+        self.assertEqual(self.service.complete("marca", ""), ["Fiat", "Opel", "Renault", "Seat"])
+
+        self.service.record_changed(old={"marca": "Renault", "matricula": "CC-22-DD"})
+        self.assertEqual(self.service.complete("marca", "r"), [])
+        self.assertEqual(self.service.complete("matricula", "c"), [])
+
+    def test_empty_values_are_not_indexed(self):
+        self.service.record_changed(new={"marca": None, "matricula": ""})
+        self.assertEqual(self.service.complete("marca", ""), ["Fiat", "Renault"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# test_criteria.py
+#
+# Critérios do painel de filtros (queries.criteria_conditions): intervalos inclusivos de datas
+# e valores, igualdades, e um limite superior de datas sem limite inferior, que não deve
+# incluir os veículos sem data.
+
+import unittest
+
+from queries import criteria_conditions, filter_conditions
+from sqlite_repository import SqliteRepository
+
+
+class CriteriaConditionsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.repository = SqliteRepository(":memory:")
+        cls.repository.connection().executemany(
+            "INSERT INTO vehicles (matricula, dataCompra, dataVenda, valorCompra, valorVenda, regime_fiscal, taxa) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [("A", "2024-01-10", None, 100000, None, "Regime Normal", 23.0),
+             ("B", "2024-02-01", "2024-03-15", 250050, 300000, "Regime de Margem", 23.0),
+             ("C", None, "2024-02-29", None, 150000, "Regime Normal", 6.0),
+             ("D", "2023-12-31", "2024-01-31", 99999, 99999, None, None)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repository.close()
+
+    def matching(self, criteria):
+        conditions, values = criteria_conditions(criteria)
+        sql = "SELECT matricula FROM vehicles"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return [row[0] for row in self.repository.connection().execute(sql + " ORDER BY matricula", values)]
+
+    def test_date_ranges_are_inclusive(self):
+        self.assertEqual(self.matching({"purchase_from": "2024-01-10", "purchase_to": "2024-02-01"}), ["A", "B"])
+        self.assertEqual(self.matching({"sale_from": "2024-02-29"}), ["B", "C"])
+
+    def test_upper_bound_only_excludes_vehicles_without_date(self):
+        self.assertEqual(self.matching({"sale_to": "2024-02-29"}), ["C", "D"])
+        self.assertEqual(self.matching({"purchase_to": "2024-01-31"}), ["A", "D"])
+        conditions, _ = criteria_conditions({"sale_to": "2024-02-29"})
+        self.assertEqual(len(conditions), 2)
+        conditions, _ = criteria_conditions({"sale_from": "2024-01-01", "sale_to": "2024-02-29"})
+        self.assertEqual(len(conditions), 2)  # O limite inferior já deixa de fora as datas vazias
+
+    def test_money_values_are_in_euros(self):
+        conditions, values = criteria_conditions({"min_purchase_value": "999.99", "max_purchase_value": 2500.5})
+        self.assertEqual(values, {"min_purchase_value": 99999, "max_purchase_value": 250050})
+        self.assertEqual(self.matching({"min_purchase_value": 999.99, "max_purchase_value": 2500.5}), ["A", "B", "D"])
+        # Os valores vazios comparam como 0 (a mesma expressão da ordenação)
+        self.assertEqual(self.matching({"max_sale_value": 1500}), ["A", "C", "D"])
+
+    def test_equality_criteria(self):
+        self.assertEqual(self.matching({"regime_fiscal": "Regime Normal", "taxa": 23.0}), ["A"])
+        self.assertEqual(self.matching({"taxa": 6}), ["C"])
+
+    def test_empty_criteria_are_ignored(self):
+        self.assertEqual(criteria_conditions({"sale_to": "", "taxa": None, "regime_fiscal": ""}), ([], {}))
+        self.assertEqual(criteria_conditions(None), ([], {}))
+        self.assertEqual(self.matching({"sale_from": "", "sale_to": "2024-01-31"}), ["D"])
+
+    def test_table_prefix(self):
+        conditions, _ = criteria_conditions({"sale_to": "2024-01-01", "regime_fiscal": "Regime Normal"}, table="v.")
+        self.assertTrue(all("v." in condition for condition in conditions))
+        self.assertNotIn(" dataVenda", " ".join(conditions))
+
+    def test_unknown_criteria_are_rejected(self):
+        with self.assertRaises(ValueError):
+            criteria_conditions({"marca": "Fiat"})
+        with self.assertRaises(ValueError):
+            filter_conditions({"colour": "red"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+# test_formatting.py
+#
+# A formatação dos valores é feita em Python, mas tem de dar exatamente o mesmo texto que o
+# QLocale pt-PT (separador de milhares só a partir de 5 dígitos, vírgula decimal).
+
+import random
+import unittest
+
+from formatting import LOCALE, format_cents, format_cents_column, format_money
+
+
+def qlocale_cents(cents):
+    return LOCALE.toString(cents / 100, 'f', 2)
+
+
+class FormatCentsTest(unittest.TestCase):
+
+    def test_matches_qlocale(self):
+        cases = [0, 1, -1, 5, 99, -99, 100, 123456, -123456, 999999, 1000000, -1000000, 1234567,
+                 99999999, 100000000, 123456789012, -123456789012]
+        for cents in cases:
+            with self.subTest(cents=cents):
+                self.assertEqual(format_cents(cents), qlocale_cents(cents))
+
+    def test_matches_qlocale_on_random_values(self):
+        rng = random.Random(13)
+        for cents in [rng.randrange(-10 ** digits, 10 ** digits) for digits in range(1, 14) for _ in range(200)]:
+            self.assertEqual(format_cents(cents), qlocale_cents(cents), cents)
+
+    def test_empty_values(self):
+        self.assertEqual(format_cents(None), "")
+        self.assertEqual(format_cents(""), "")
+        self.assertEqual(format_cents_column([None, 150, -5]), ["", qlocale_cents(150), qlocale_cents(-5)])
+
+    def test_format_money_matches_qlocale(self):
+        # Empates de meio cêntimo: o QLocale arredonda para longe do zero
+        for value in [0.0, -0.0, 0.005, 0.015, 2.675, -2.675, 1234.5, 12345.678, -1e9, 1e12 + 0.125]:
+            with self.subTest(value=value):
+                self.assertEqual(format_money(value), LOCALE.toString(value, 'f', 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# test_migrations.py
+#
+# Migrações aplicadas a uma base de dados com o esquema antigo (o de vehicles.db antes do
+# controlo de versões), com valores monetários gravados como texto.
+
+import sqlite3
+import unittest
+
+from migrations import SCHEMA_VERSION, apply_migrations, schema_version
+
+# Esquema original de 'vehicles': sem numeroQuadro nem valorBase, e imposto/taxa declarados TEXT
+LEGACY_SCHEMA = """
+    CREATE TABLE vehicles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        matricula TEXT,
+        marca TEXT,
+        isv REAL,
+        nRegistoContabilidade REAL,
+        dataCompra TEXT,
+        docCompra TEXT,
+        tipoDocumento TEXT,
+        valorCompra REAL,
+        dataVenda TEXT,
+        docVenda TEXT,
+        valorVenda REAL,
+        imposto TEXT,
+        taxa TEXT,
+        regime_fiscal TEXT
+    )
+"""
+
+LEGACY_ROWS = [
+    # (id, isv, valorCompra, valorVenda, imposto, dataVenda)
+    (1, 150.5, 10000.0, 12300.0, "2300.0", "2024-03-01"),
+    (2, None, 8000.0, 9840.0, "1.840,00", "2024-03-15"),
+    (3, "1 234,56 €", 5000.0, None, "", None),
+    (4, None, 0.285, 100.0, "não sei", "2024-04-02"),
+]
+
+
+class LegacyMoneyMigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.database = sqlite3.connect(":memory:", isolation_level=None)
+        self.database.execute(LEGACY_SCHEMA)
+        self.database.executemany(
+            "INSERT INTO vehicles (id, matricula, marca, isv, valorCompra, valorVenda, imposto, taxa, "
+            "regime_fiscal, dataVenda) VALUES (?, 'AA-00-00', 'Renault', ?, ?, ?, ?, '23', 'Regime Normal', ?)",
+            LEGACY_ROWS)
+        self.assertTrue(apply_migrations(self.database))
+
+    def tearDown(self):
+        self.database.close()
+
+    def money(self, vehicle_id):
+        return self.database.execute("SELECT isv, valorCompra, valorVenda, imposto FROM vehicles WHERE id = ?",
+                                     (vehicle_id,)).fetchone()
+
+    def test_schema_is_current(self):
+        self.assertEqual(schema_version(self.database), SCHEMA_VERSION)
+
+    def test_numeric_text_is_converted_to_cents(self):
+        self.assertEqual(self.money(1), (15050, 1000000, 1230000, 230000))
+        self.assertEqual(self.money(2), (None, 800000, 984000, 184000))
+        self.assertEqual(self.money(3)[0], 123456)
+
+    def test_values_round_half_away_from_zero(self):
+        self.assertEqual(self.money(4)[1], 29)
+
+    def test_only_non_numeric_values_become_null(self):
+        self.assertIsNone(self.money(3)[3])  # ""
+        self.assertIsNone(self.money(4)[3])  # "não sei"
+
+    def test_money_columns_are_integers(self):
+        types = self.database.execute(
+            "SELECT DISTINCT typeof(isv), typeof(valorCompra), typeof(valorVenda), typeof(imposto) "
+            "FROM vehicles WHERE id = 1").fetchall()
+        self.assertEqual(types, [("integer", "integer", "integer", "integer")])
+
+    def test_monthly_summary_uses_converted_values(self):
+        rows = self.database.execute(
+            "SELECT mes, veiculos, valorVenda, imposto FROM monthly_summary ORDER BY mes").fetchall()
+        self.assertEqual(rows, [("2024-03", 2, 2214000, 414000), ("2024-04", 1, 10000, 0)])
+
+    def test_fractional_money_is_rejected(self):
+        with self.assertRaises(sqlite3.DatabaseError):
+            self.database.execute("INSERT INTO vehicles (matricula, valorCompra) VALUES ('BB-11-CC', 12.5)")
+
+
+class LegacyDateMigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.database = sqlite3.connect(":memory:", isolation_level=None)
+        self.database.execute(LEGACY_SCHEMA)
+        self.database.executemany(
+            "INSERT INTO vehicles (id, dataCompra, dataVenda, valorVenda, taxa, regime_fiscal) "
+            "VALUES (?, ?, ?, 1000, '23', 'Regime Normal')",
+            [(1, "05/01/2024", "2024/03/01 10:30:00"), (2, "2024-01-10", ""), (3, "31-02-2024", "15-03-2024"),
+             (4, "2023-13-45", "2024-00-10")])
+        self.assertTrue(apply_migrations(self.database))
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_dates_are_normalised(self):
+        rows = self.database.execute("SELECT dataCompra, dataVenda FROM vehicles ORDER BY id").fetchall()
+        self.assertEqual(rows, [("2024-01-05", "2024-03-01"), ("2024-01-10", None), (None, "2024-03-15"),
+                                (None, None)])
+
+    def test_monthly_summary_counts_normalised_sales(self):
+        rows = self.database.execute("SELECT mes, veiculos FROM monthly_summary").fetchall()
+        self.assertEqual(rows, [("2024-03", 2)])
+
+    def test_triggers_reject_dates_outside_the_calendar(self):
+        for value in ("2024-13-45", "2024-00-10", "2024-02-30", "10-01-2024"):
+            with self.subTest(value=value), self.assertRaises(sqlite3.DatabaseError):
+                self.database.execute("INSERT INTO vehicles (dataCompra) VALUES (?)", (value,))
+            with self.subTest(value=value), self.assertRaises(sqlite3.DatabaseError):
+                self.database.execute("UPDATE vehicles SET dataVenda = ? WHERE id = 2", (value,))
+        self.assertEqual(self.database.execute("SELECT mes FROM monthly_summary").fetchall(), [("2024-03",)])
+
+    def test_triggers_accept_valid_dates_and_null(self):
+        self.database.execute("INSERT INTO vehicles (dataCompra, dataVenda) VALUES ('2024-02-29', NULL)")
+        self.database.execute("UPDATE vehicles SET dataVenda = '2024-04-30' WHERE id = 2")
+        self.assertEqual(self.database.execute("SELECT dataVenda FROM vehicles WHERE id = 2").fetchone(),
+                         ("2024-04-30",))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# test_pagination.py
+#
+# Paginação por chave (queries.page_sql/page_key): percorrer as páginas tem de dar as mesmas
+# linhas, pela mesma ordem, que uma única consulta sem limite, também quando o valor da
+# ordenação se repete ou é NULL.
+
+import random
+import unittest
+
+from queries import ORDER_EXPRESSIONS, page_key, page_sql
+from sqlite_repository import SqliteRepository
+
+MARCAS = [None, "", "Fiat", "fiat", "Renault", "BMW", "bmw"]
+DATES = [None, "2024-01-05", "2024-03-10", "2023-12-31"]
+VALUES = [None, 0, 150, 99999, 1000000, -500]
+
+
+class KeysetPaginationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.repository = SqliteRepository(":memory:")
+        rng = random.Random(16)
+        rows = []
+        for i in range(60):
+            sale = rng.choice(DATES)
+            rows.append((f"{rng.choice('AaBb')}{i % 7}-00-{i:02d}" if i % 9 else None, rng.choice(MARCAS),
+                         rng.choice(VALUES), rng.choice(VALUES) if sale else None, sale, rng.choice(DATES),
+                         rng.choice([None, "FT 1", "ft 1", "FT 2"]), rng.choice(VALUES), rng.choice(VALUES)))
+        cls.repository.connection().executemany(
+            "INSERT INTO vehicles (matricula, marca, valorCompra, valorVenda, dataVenda, dataCompra, docVenda, "
+            "imposto, valorBase) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.repository.close()
+
+    def all_ids(self, order_by, filters=None):
+        sql, values, _ = page_sql(["id"], None, None, order_by, filters)
+        return [row[0] for row in self.repository.connection().execute(sql, values)]
+
+    def paged_ids(self, order_by, limit, filters=None):
+        ids, key, pages = [], None, 0
+        while True:
+            rows, key = self.repository.fetch_expenses_page(key, limit, order_by, filters)
+            ids.extend(row[0] for row in rows)
+            pages += 1
+            self.assertLessEqual(pages, 100, "a paginação não termina")
+            if key is None:
+                return ids
+
+    def test_pages_match_a_single_query(self):
+        orders = ["id", "-id"] + [prefix + field for field in ORDER_EXPRESSIONS for prefix in ("", "-")]
+        for order_by in orders:
+            expected = self.all_ids(order_by)
+            self.assertEqual(sorted(expected), list(range(1, 61)))
+            for limit in (1, 4, 7, 60):
+                with self.subTest(order_by=order_by, limit=limit):
+                    self.assertEqual(self.paged_ids(order_by, limit), expected)
+
+    def test_pages_with_filters(self):
+        for filters in ({"sold": True}, {"sold": False}, {"sale_to": "2024-02-01"},
+                        {"min_purchase_value": 1, "sold": False}):
+            for order_by in ("id", "-dataVenda", "marca", "-valorCompra"):
+                with self.subTest(filters=filters, order_by=order_by):
+                    self.assertEqual(self.paged_ids(order_by, 3, filters), self.all_ids(order_by, filters))
+
+    def test_null_sorts_as_empty_value(self):
+        # NULL ordena como '' (ou 0): antes de qualquer outro valor, por id
+        connection = self.repository.connection()
+        null_ids = [row[0] for row in connection.execute(
+            "SELECT id FROM vehicles WHERE COALESCE(marca, '') = '' ORDER BY id")]
+        self.assertTrue(null_ids)
+        self.assertEqual(self.paged_ids("marca", 2)[:len(null_ids)], null_ids)
+        self.assertEqual(self.paged_ids("-marca", 2)[-len(null_ids):], null_ids[::-1])
+
+    def test_page_key(self):
+        rows = [[3, "x"], [5, "y"]]
+        self.assertEqual(page_key(rows, "Fiat", 2, True), ("Fiat", 5))
+        self.assertEqual(page_key(rows, None, 2, True), (None, 5))
+        self.assertEqual(page_key(rows, 5, 2, False), (5,))
+        self.assertIsNone(page_key(rows, "Fiat", 3, True))  # Página incompleta: é a última
+        self.assertIsNone(page_key([], None, 2, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
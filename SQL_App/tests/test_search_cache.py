@@ -0,0 +1,87 @@
+# test_search_cache.py
+#
+# Uma pesquisa que estreita outra já em cache é respondida em memória, com o mesmo resultado
+# (e pela mesma ordem) que a base de dados daria.
+
+import unittest
+
+from queries import GRID_FIELDS, search_text_of
+from search_cache import SearchCache, is_cacheable
+
+VEHICLES = [(1, "AA-11-BB", "Mercedes"), (2, "CC-22-DD", "Mercury"), (3, "EE-33-FF", "Renault"),
+            (4, "MM-44-ER", "Fiat")]
+
+
+def search(text, vehicles=VEHICLES):
+    """Linhas de search_vehicles(text, with_search_text=True) para os veículos indicados."""
+    terms = text.lower().split()
+    rows = []
+    for id, matricula, marca in vehicles:
+        searched = search_text_of([matricula, marca])
+        if all(term in searched for term in terms):
+            rows.append([id, matricula, marca] + [None] * (len(GRID_FIELDS) - 3) + [searched])
+    return rows
+
+
+def grid(rows):
+    return [row[:len(GRID_FIELDS)] for row in rows]
+
+
+class SearchCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = SearchCache(max_rows=10)
+        self.filters = (("sold", None),)
+
+    def test_narrower_search_is_filtered_in_memory(self):
+        self.assertEqual(self.cache.store("mer", self.filters, search("mer")), grid(search("mer")))
+        for text in ("merc", "MERCE", "mer cc", "cc mer", "mer 22", "merce 11-bb", "mercx"):
+            with self.subTest(text=text):
+                self.assertTrue(self.cache.can_answer(text, self.filters))
+                self.assertEqual(self.cache.lookup(text, self.filters), grid(search(text)))
+
+    def test_keeps_the_order_of_the_base_search(self):
+        reversed_rows = search("er")[::-1]  # Ordem de relevância da base de dados
+        self.cache.store("er", self.filters, reversed_rows)
+        self.assertEqual([row[0] for row in self.cache.lookup("mer", self.filters)], [2, 1])
+
+    def test_cannot_answer_wider_or_unrelated_searches(self):
+        self.cache.store("merc", self.filters, search("merc"))
+        for text in ("mer", "me", "renault", "", "ren"):
+            with self.subTest(text=text):
+                self.assertFalse(self.cache.can_answer(text, self.filters))
+                self.assertIsNone(self.cache.lookup(text, self.filters))
+        self.assertFalse(self.cache.can_answer("mercedes", (("sold", True),)))
+
+    def test_uses_the_smallest_base(self):
+        self.cache.store("er", self.filters, search("er"))
+        self.cache.store("merc", self.filters, [])  # Diferente do que "er" daria: mostra qual foi usada
+        self.assertEqual(self.cache.lookup("mercedes", self.filters), [])
+
+    def test_large_results_are_not_stored(self):
+        many = [(id, f"ZZ-{id:02d}-ZZ", "Mercedes") for id in range(11)]
+        self.assertIsNone(self.cache.store("mer", self.filters, search("mer", many)))
+        self.assertFalse(self.cache.can_answer("merc", self.filters))
+
+    def test_least_recently_used_entry_is_dropped(self):
+        self.cache = SearchCache(max_entries=3)
+        for text in ("aa-", "cc-", "ee-"):
+            self.cache.store(text, self.filters, search(text))
+        self.cache.lookup("aa-", self.filters)
+        self.cache.store("mm-", self.filters, search("mm-"))
+        self.assertTrue(self.cache.can_answer("aa-11", self.filters))
+        self.assertFalse(self.cache.can_answer("cc-22", self.filters))
+
+    def test_clear(self):
+        self.cache.store("mer", self.filters, search("mer"))
+        self.cache.clear()
+        self.assertFalse(self.cache.can_answer("mer", self.filters))
+
+    def test_only_searches_with_a_trigram_are_cacheable(self):
+        self.assertTrue(is_cacheable("a mer"))
+        self.assertFalse(is_cacheable("aa 11"))
+        self.assertFalse(is_cacheable("   "))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+# test_tax.py
+#
+# O cálculo vetorizado (numpy) tem de dar exatamente os mesmos cêntimos que o cálculo com
+# Decimal, veículo a veículo.
+
+import random
+import unittest
+
+from tax import REGIME_MARGEM, REGIME_NORMAL, _compute_numpy, _compute_scalar, compute_tax_batch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "requer o pacote 'numpy'")
+class BatchMatchesScalarTest(unittest.TestCase):
+
+    def assert_same(self, regimes, compras, vendas, taxas):
+        expected = _compute_scalar(regimes, compras, vendas, taxas)
+        actual = _compute_numpy(regimes, compras, vendas, taxas, numpy)
+        for row in range(len(regimes)):
+            with self.subTest(regime=regimes[row], compra=compras[row], venda=vendas[row], taxa=taxas[row]):
+                self.assertEqual((actual[0][row], actual[1][row]), (expected[0][row], expected[1][row]))
+
+    def test_exact_ties(self):
+        # Com taxa 100% (divisor 2) ou -300% (divisor -2) um valor ímpar dá meio cêntimo
+        cases = [(REGIME_NORMAL, 0, 1, 100), (REGIME_NORMAL, 0, 3, 100), (REGIME_NORMAL, 0, 12345, 100),
+                 (REGIME_NORMAL, 0, 7, -300), (REGIME_NORMAL, 0, -12345, 100), (REGIME_MARGEM, 100, 105, 100),
+                 (REGIME_MARGEM, 0, 12345, -300)]
+        self.assert_same(*map(list, zip(*cases)))
+
+    def test_zero_and_negative_margins(self):
+        cases = [(REGIME_MARGEM, 1000, 1000, 23), (REGIME_MARGEM, 2000, 1000, 23), (REGIME_MARGEM, 0, 0, 6),
+                 (REGIME_MARGEM, None, None, 23), (REGIME_MARGEM, 1000, 5000, -150),
+                 (REGIME_MARGEM, 5000, 1000, -150)]
+        self.assert_same(*map(list, zip(*cases)))
+
+    def test_rates_of_minus_100_and_below(self):
+        self.assertEqual(compute_tax_batch([REGIME_NORMAL] * 3, [0] * 3, [10000] * 3, [-150, -200, -300]),
+                         ([-20000, -10000, -5000], [30000, 20000, 15000]))
+        cases = [(regime, 500, 10000, rate) for regime in (REGIME_NORMAL, REGIME_MARGEM)
+                 for rate in (-100, "-100.00", -100.5, -150, -200, -250.25, -1000)]
+        self.assert_same(*map(list, zip(*cases)))
+
+    def test_random_rows(self):
+        rng = random.Random(14)
+        rates = [None, "", "0", "6", "13", "23", "23.005", "7.125", "-50", "-100", "-100.5", "-150", "-300"]
+        rows = [(rng.choice([REGIME_NORMAL, REGIME_MARGEM, None]), rng.choice([None, rng.randrange(-10 ** 6, 10 ** 7)]),
+                 rng.choice([None, rng.randrange(-10 ** 6, 10 ** 7)]), rng.choice(rates)) for _ in range(5000)]
+        regimes, compras, vendas, taxas = map(list, zip(*rows))
+        self.assertEqual(_compute_numpy(regimes, compras, vendas, taxas, numpy),
+                         _compute_scalar(regimes, compras, vendas, taxas))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,530 @@
+# vehicle_model.py
+
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QColor
+
+from async_db import database_executor
+from repository import repository
+from formatting import format_cents, format_date
+from money import MONEY_FIELDS
+from queries import GRID_FIELDS
+from search_cache import SearchCache, is_cacheable
+
+# Colunas visíveis na grelha: (título, campo de GRID_FIELDS). Todas podem ser ordenadas (ver sort)
+COLUMNS = [("ID", "id"), ("Matrícula", "matricula"), ("Marca", "marca"), ("Data Compra", "dataCompra"),
+           ("Valor Compra", "valorCompra"), ("Data Venda", "dataVenda"), ("Doc. Venda", "docVenda"),
+           ("Valor Venda", "valorVenda"), ("Imposto", "imposto"), ("Valor Base", "valorBase")]
+HEADERS = [title for title, _ in COLUMNS]
+MONEY_COLUMNS = tuple(column for column, (_, field) in enumerate(COLUMNS) if field in MONEY_FIELDS)
+DATE_COLUMNS = tuple(column for column, (_, field) in enumerate(COLUMNS) if field in ("dataCompra", "dataVenda"))
+
+_POSITIONS = [GRID_FIELDS.index(field) for _, field in COLUMNS]  # coluna -> posição na linha
+_SOLD = GRID_FIELDS.index("vendido")
+
+SOLD_BACKGROUND = QColor("#d4edda")
+
+
+def is_sold(expense):
+    """Estado de venda calculado pelo SQLite (coluna gerada 'vendido')."""
+    return expense[_SOLD]
+
+
+def read_block(search_text, sold, bookmark, limit, order_by=None, criteria=None):
+    """Lê um bloco de linhas a partir do marcador indicado (None = início).
+
+    Função independente do modelo para poder correr numa thread do pool. Com order_by
+    (ver fetch_expenses_page) o marcador é a chave da página; sem ele a ordem é por id ou,
+    numa pesquisa, por relevância. criteria são os critérios do painel de filtros
+    (queries.CRITERIA). Devolve (linhas, marcador do fim do bloco, esgotado).
+    """
+    criteria = criteria or {}
+    if order_by is not None:
+        rows, next_key = repository().fetch_expenses_page(
+            bookmark, limit, order_by=order_by, filters={"sold": sold, "search_text": search_text, **criteria})
+        return rows, next_key, next_key is None
+
+    if search_text:
+        offset = bookmark or 0
+        rows = repository().search_vehicles(search_text, limit=limit, offset=offset, sold=sold, criteria=criteria)
+        return rows, offset + len(rows), len(rows) < limit
+
+    after_key = (bookmark,) if bookmark is not None else None
+    rows, next_key = repository().fetch_expenses_page(after_key, limit, filters={"sold": sold, **criteria})
+    last_id = rows[-1][0] if rows else bookmark
+    return rows, last_id, next_key is None
+
+
+class VehicleTableModel(QAbstractTableModel):
+    """Modelo virtualizado sobre a tabela 'vehicles'.
+
+    As linhas são lidas da base de dados por blocos (fetchMore/canFetchMore) e apenas
+    um número limitado de blocos fica em memória. Para cada bloco guarda-se um marcador
+    (o último id lido, a chave da ordenação escolhida em sort() ou, numa pesquisa ordenada
+    por relevância, a posição seguinte), o que permite voltar a ler um bloco descartado.
+    A ordenação é feita pelo SQLite sobre os índices de cada coluna, nunca em Python.
+
+    Depois de adicionar, alterar ou apagar um veículo, os métodos vehicle_added/
+    vehicle_updated/vehicle_deleted corrigem só a linha afetada (os blocos passam a
+    ter tamanho variável), preservando seleção, posição de scroll e pesquisa. Fora da
+    ordem por id, um veículo novo aparece no fim da grelha até à próxima releitura.
+
+    Com asynchronous=True (o padrão) os blocos são lidos no pool de async_db: a grelha
+    mostra células vazias até o bloco chegar e loadingChanged indica se há leituras em
+    curso. Leituras pedidas antes de um reload ou de uma correção incremental são
+    descartadas quando chegam.
+
+    Numa pesquisa, o resultado completo é lido de uma vez e guardado em search_cache (se
+    não for grande demais); os blocos passam a ser fatias dessa lista e uma pesquisa que
+    a estreite ("MER" -> "MERC") é resolvida em memória.
+    """
+
+    CHUNK_SIZE = 256
+    MAX_CACHED_CHUNKS = 8
+
+    loadingChanged = pyqtSignal(bool)
+
+    def __init__(self, parent=None, asynchronous=True):
+        super().__init__(parent)
+        self.show_sold = True
+        self.show_stock = True
+        self.search_text = ""
+        self.criteria = {}  # critérios do painel de filtros (queries.CRITERIA), só os preenchidos
+        self.order_by = None  # ordenação de sort() ("campo" ou "-campo"); None = ordem por omissão
+        self.asynchronous = asynchronous
+        self._generation = 0
+        self._tasks = {}  # leituras em curso: índice do bloco (ou "append"/"search") -> QueryTask
+        self.search_cache = SearchCache()
+        self._reset_state()
+        self._exhausted = True  # Nada é lido até ao primeiro set_filters/reload (a janela pinta antes)
+
+    def _reset_state(self):
+        self._chunks = OrderedDict()  # índice do bloco -> lista de linhas (LRU)
+        self._bookmarks = []  # _bookmarks[k] = marcador do fim do bloco k
+        self._sizes = []  # número de linhas de cada bloco
+        self._starts = []  # primeira linha de cada bloco
+        self._row_count = 0
+        self._exhausted = not self.show_sold and not self.show_stock
+        self._results = None  # resultado completo da pesquisa atual, quando está em memória
+        # Ordem pedida a fetch_expenses_page; None na ordem por id (sem pesquisa) ou por relevância
+        by_id = self.order_by is None or (self.order_by == "id" and not self.search_text)
+        self._key_order = None if by_id else self.order_by
+
+    def _ordered_by_id(self):
+        """Blocos por id crescente: os marcadores são o último id de cada bloco."""
+        return self._key_order is None and not self.search_text
+
+    def _by_relevance(self):
+        """Pesquisa por relevância: os marcadores são posições no resultado."""
+        return self._key_order is None and bool(self.search_text)
+
+    # --- Filtros ---
+
+    def set_filters(self, show_sold=None, show_stock=None, search_text=None, criteria=None):
+        """Altera os filtros ativos e recomeça a leitura desde o início.
+
+        Os critérios do painel de filtros (criteria) são todos aplicados pelo SQLite, na mesma
+        cláusula WHERE que os restantes filtros.
+        """
+        if show_sold is not None:
+            self.show_sold = show_sold
+        if show_stock is not None:
+            self.show_stock = show_stock
+        if search_text is not None:
+            self.search_text = search_text.strip()
+        if criteria is not None:
+            self.criteria = {key: value for key, value in criteria.items() if value is not None and value != ""}
+        self.reload()
+
+    def reload(self):
+        self.beginResetModel()
+        self._cancel_reads()
+        self._reset_state()
+        if self._by_relevance() and not self._exhausted:
+            self._results = self.search_cache.lookup(self.search_text, self._cache_filters())
+            if self._results is None and is_cacheable(self.search_text):
+                self._search_all()
+        self.endResetModel()
+
+    def can_search_from_cache(self, search_text):
+        """Indica se a pesquisa pode ser resolvida em search_cache, sem ir à base de dados."""
+        search_text = search_text.strip()
+        return (bool(search_text) and self.order_by is None
+                and self.search_cache.can_answer(search_text, self._cache_filters()))
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Ordena pela coluna indicada (clique no cabeçalho); column < 0 repõe a ordem por omissão.
+
+        O ORDER BY corre no SQLite (fetch_expenses_page) e a leitura continua por blocos.
+        """
+        if column < 0:
+            order_by = None
+        else:
+            field = COLUMNS[column][1]
+            order_by = field if order == Qt.SortOrder.AscendingOrder else f"-{field}"
+        if order_by != self.order_by:
+            self.order_by = order_by
+            self.reload()
+
+    def sold_filter(self):
+        """Traduz as caixas "Vendidos"/"Em stock" para o parâmetro 'sold' de fetch_expenses."""
+        if self.show_sold and self.show_stock:
+            return None
+        return self.show_sold
+
+    def _cache_filters(self):
+        """Filtros que acompanham o texto pesquisado nas entradas de search_cache."""
+        return self.sold_filter(), tuple(sorted(self.criteria.items()))
+
+    # --- Leitura por blocos ---
+
+    def _read_chunk(self, bookmark, limit=None):
+        """Lê o bloco que começa no marcador indicado (None = início).
+
+        Devolve (linhas, marcador do fim do bloco, esgotado).
+        """
+        limit = self.CHUNK_SIZE if limit is None else limit
+        if not self.show_sold and not self.show_stock:
+            return [], bookmark, True
+        if limit == 0:
+            return [], bookmark, False
+        if self._results is not None:
+            offset = bookmark or 0
+            rows = self._results[offset:offset + limit]
+            return rows, offset + len(rows), offset + len(rows) >= len(self._results)
+        return read_block(self.search_text, self.sold_filter(), bookmark, limit, self._key_order, self.criteria)
+
+    def _search_all(self):
+        """Lê o resultado completo da pesquisa atual para search_cache.
+
+        Se tiver mais de search_cache.max_rows linhas, a pesquisa é lida por blocos como antes.
+        """
+        search_text, sold, criteria = self.search_text, self.sold_filter(), self.criteria
+        cache_filters = self._cache_filters()
+        limit = self.search_cache.max_rows + 1
+        if not self.asynchronous:
+            rows = repository().search_vehicles(search_text, limit=limit, sold=sold, with_search_text=True,
+                                                criteria=criteria)
+            self._results = self.search_cache.store(search_text, cache_filters, rows)
+            return
+
+        def loaded(rows):
+            self._results = self.search_cache.store(search_text, cache_filters, rows)
+            self.fetchMore()
+
+        self._read_async("search", loaded, repository().search_vehicles, search_text, limit=limit, sold=sold,
+                         with_search_text=True, criteria=criteria)
+
+    # --- Leituras em segundo plano ---
+
+    def is_loading(self):
+        return bool(self._tasks)
+
+    def _read_async(self, slot, on_result, fn, *args, **kwargs):
+        """Corre fn no pool; on_result só é chamado se o estado do modelo não mudou entretanto."""
+        generation = self._generation
+
+        def deliver(result):
+            if self._tasks.get(slot) is not task:
+                return
+            self._set_done(slot)
+            if generation == self._generation:
+                on_result(result)
+
+        def failed(message):
+            if self._tasks.get(slot) is task:
+                self._set_done(slot)
+            print(f"Erro ao ler bloco da grelha: {message}")
+
+        was_loading = self.is_loading()
+        task = database_executor().submit(fn, *args, on_result=deliver, on_error=failed, **kwargs)
+        self._tasks[slot] = task
+        if not was_loading:
+            self.loadingChanged.emit(True)
+
+    def _set_done(self, slot):
+        del self._tasks[slot]
+        if not self._tasks:
+            self.loadingChanged.emit(False)
+
+    def _cancel_reads(self):
+        """Descarta as leituras em curso (os marcadores em que se basearam deixaram de ser válidos)."""
+        self._generation += 1
+        if not self._tasks:
+            return
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self.loadingChanged.emit(False)
+
+    def _store_chunk(self, index, rows):
+        self._chunks[index] = rows
+        self._chunks.move_to_end(index)
+        while len(self._chunks) > self.MAX_CACHED_CHUNKS:
+            self._chunks.popitem(last=False)
+
+    def _chunk(self, index):
+        rows = self._chunks.get(index)
+        if rows is not None:
+            self._chunks.move_to_end(index)
+            return rows
+        bookmark = self._bookmarks[index - 1] if index > 0 else None
+        rows, _, _ = self._read_chunk(bookmark, limit=self._sizes[index])
+        rows = self._trim_chunk(index, rows)
+        self._store_chunk(index, rows)
+        return rows
+
+    def _trim_chunk(self, index, rows):
+        """Descarta as linhas relidas que já pertencem ao bloco seguinte.
+
+        Acontece quando uma linha do bloco foi apagada (ou deixou de passar nos filtros)
+        enquanto o bloco não estava em memória: a releitura com o tamanho antigo avança
+        para lá do marcador. Só se deteta na ordem por id: nas outras os marcadores são
+        posições ou chaves de ordenação.
+        """
+        if not self._ordered_by_id() or not rows or rows[-1][0] <= self._bookmarks[index]:
+            return rows
+        last = self._bookmarks[index]
+        return [expense for expense in rows if expense[0] <= last]
+
+    def _cached_row(self, row):
+        """Como row_data, mas nunca bloqueia: se o bloco não estiver em memória pede-o ao pool e devolve None."""
+        if not self.asynchronous or self._results is not None:
+            return self.row_data(row)
+        if row < 0 or row >= self._row_count:
+            return None
+        index, offset = self._locate(row)
+        rows = self._chunks.get(index)
+        if rows is None:
+            if index not in self._tasks:
+                bookmark = self._bookmarks[index - 1] if index > 0 else None
+                self._read_async(index, lambda result: self._chunk_loaded(index, result[0]),
+                                 read_block, self.search_text, self.sold_filter(), bookmark, self._sizes[index],
+                                 self._key_order, self.criteria)
+            return None
+        self._chunks.move_to_end(index)
+        return rows[offset] if offset < len(rows) else None
+
+    def _chunk_loaded(self, index, rows):
+        if index not in self._chunks:
+            self._store_chunk(index, self._trim_chunk(index, rows))
+        first = self._starts[index]
+        last = first + self._sizes[index] - 1
+        if last >= first:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def _locate(self, row):
+        """Converte uma linha da grelha em (índice do bloco, posição dentro do bloco)."""
+        # O último bloco que começa antes da linha é o que a contém (blocos vazios ficam para trás)
+        index = bisect_right(self._starts, row) - 1
+        return index, row - self._starts[index]
+
+    def row_data(self, row):
+        """Devolve a linha completa (tal como vem de fetch_expenses) ou None."""
+        if row < 0 or row >= self._row_count:
+            return None
+        index, offset = self._locate(row)
+        rows = self._chunk(index)
+        return rows[offset] if offset < len(rows) else None
+
+    def vehicle_id(self, row):
+        expense = self.row_data(row)
+        return expense[0] if expense else None
+
+    # --- Atualizações incrementais ---
+
+    def _find_vehicle(self, vehicle_id):
+        """Procura a linha da grelha que mostra o veículo indicado, ou None se não estiver carregada.
+
+        Na ordem por id os marcadores permitem ir direto ao bloco certo; nas outras ordens
+        (pesquisa por relevância ou sort()) só se procura nos blocos em memória.
+        """
+        if not self._ordered_by_id():
+            candidates = list(self._chunks.keys())
+        else:
+            index = bisect_right(self._bookmarks, vehicle_id - 1)
+            candidates = [index] if index < len(self._bookmarks) else []
+
+        for index in candidates:
+            for offset, expense in enumerate(self._chunk(index)):
+                if expense[0] == vehicle_id:
+                    return self._starts[index] + offset
+        return None
+
+    def _vanished_row(self, vehicle_id):
+        """Linha de um veículo que já não vem na releitura do seu bloco (ver _trim_chunk), ou None."""
+        if not self._ordered_by_id():
+            return None
+        index = bisect_right(self._bookmarks, vehicle_id - 1)
+        if index >= len(self._bookmarks):
+            return None
+        rows = self._chunk(index)
+        if len(rows) >= self._sizes[index]:
+            return None
+        return self._starts[index] + bisect_left([expense[0] for expense in rows], vehicle_id)
+
+    def _resize_chunk(self, index, delta):
+        # As leituras em curso usam marcadores/tamanhos anteriores a esta alteração
+        appending = "append" in self._tasks
+        self._cancel_reads()
+        self._sizes[index] += delta
+        for k in range(index + 1, len(self._starts)):
+            self._starts[k] += delta
+        if self._by_relevance():
+            # Na pesquisa os marcadores são posições: as seguintes deslocam-se
+            for k in range(index, len(self._bookmarks)):
+                self._bookmarks[k] += delta
+        self._row_count += delta
+        if appending:
+            self.fetchMore()
+
+    def _data_changed(self):
+        """Chamado antes de cada correção incremental: os dados na base de dados mudaram."""
+        self.search_cache.clear()
+        # Uma leitura do fim da grelha em curso pode ter sido feita antes da alteração: repete-a
+        for slot, restart in (("search", self._search_all), ("append", self.fetchMore)):
+            task = self._tasks.get(slot)
+            if task is not None:
+                task.cancel()
+                self._set_done(slot)
+                restart()
+
+    def _matching_row(self, vehicle_id):
+        if not self.show_sold and not self.show_stock:
+            return None
+        return repository().fetch_expense_row(vehicle_id, sold=self.sold_filter(), search_text=self.search_text,
+                                              criteria=self.criteria)
+
+    def vehicle_added(self, vehicle_id):
+        """Mostra um veículo acabado de inserir, se passar nos filtros."""
+        self._data_changed()
+        if not self._exhausted:
+            # Ainda há linhas por ler: o novo veículo aparece quando a vista pedir mais
+            return
+        expense = self._matching_row(vehicle_id)
+        if expense is None:
+            return
+        if not self._bookmarks:
+            self._bookmarks.append(0 if self._by_relevance() else None)
+            self._sizes.append(0)
+            self._starts.append(0)
+        index = len(self._bookmarks) - 1
+        rows = self._chunk(index)
+        row = self._row_count
+        self.beginInsertRows(QModelIndex(), row, row)
+        rows.append(expense)
+        if self._results is not None:
+            self._results.append(expense)
+        self._resize_chunk(index, 1)
+        if self._ordered_by_id():
+            self._bookmarks[index] = vehicle_id
+        self.endInsertRows()
+
+    def vehicle_updated(self, vehicle_id):
+        """Atualiza a linha de um veículo editado, ou remove-a se deixou de passar nos filtros."""
+        self._data_changed()
+        row = self._find_vehicle(vehicle_id)
+        if row is None:
+            row = self._vanished_row(vehicle_id)
+            if row is not None:
+                self._remove_row(row, vanished=True)
+            return
+        expense = self._matching_row(vehicle_id)
+        if expense is None:
+            self._remove_row(row)
+            return
+        index, offset = self._locate(row)
+        self._chunk(index)[offset] = expense
+        if self._results is not None:
+            self._results[row] = expense
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def vehicle_deleted(self, vehicle_id):
+        """Retira da grelha a linha de um veículo apagado."""
+        self._data_changed()
+        row = self._find_vehicle(vehicle_id)
+        if row is not None:
+            self._remove_row(row)
+            return
+        row = self._vanished_row(vehicle_id)
+        if row is not None:
+            self._remove_row(row, vanished=True)
+
+    def _remove_row(self, row, vanished=False):
+        index, offset = self._locate(row)
+        rows = self._chunk(index)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        if not vanished:
+            del rows[offset]
+            if self._results is not None:
+                del self._results[row]
+        self._resize_chunk(index, -1)
+        self.endRemoveRows()
+
+    # --- API QAbstractTableModel ---
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or "append" in self._tasks or "search" in self._tasks:
+            return
+        bookmark = self._bookmarks[-1] if self._bookmarks else None
+        if self.asynchronous and self._results is None:
+            self._read_async("append", lambda result: self._append_chunk(*result),
+                             read_block, self.search_text, self.sold_filter(), bookmark, self.CHUNK_SIZE,
+                             self._key_order, self.criteria)
+        else:
+            self._append_chunk(*self._read_chunk(bookmark))
+
+    def _append_chunk(self, rows, bookmark, exhausted):
+        index = len(self._bookmarks)
+        self._exhausted = exhausted
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+        self._bookmarks.append(bookmark)
+        self._sizes.append(len(rows))
+        self._starts.append(self._row_count)
+        self._store_chunk(index, rows)
+        self._row_count += len(rows)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        expense = self._cached_row(index.row())
+        if expense is None:
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.format_cell(expense, index.column())
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return SOLD_BACKGROUND if is_sold(expense) else None
+        if role == Qt.ItemDataRole.UserRole:
+            return is_sold(expense)
+        return None
+
+    def format_cell(self, expense, column):
+        """Formata o valor de uma célula apenas quando é necessário (pintura)."""
+        value = expense[_POSITIONS[column]]
+        if column in MONEY_COLUMNS:
+            return format_cents(value)
+        if column in DATE_COLUMNS:
+            return format_date(value)
+        return str(value)